@@ -0,0 +1,229 @@
+'''Cooperative path finding, many units moving at once without collisions.
+
+Silver's Hierarchical Cooperative A*.  Units are planned one at a time in
+priority order, each with A* through space and time (hex, impulse) that
+avoids hexes and impulses already reserved by units planned before it.
+Heuristic is each goal's FlowField, the true cost ignoring other units.  A
+unit moves one hex or waits each impulse, and stays on its goal once there.
+'''
+import heapq
+
+from .pathfinding import INFINITY
+
+
+class ReservationTable:
+    '''Number of units in each hex at each impulse.
+
+    Units parked on a hex (arrived at their goal) count from the impulse
+    they arrived on, forever after.
+    '''
+    def __init__(self, limit=1):
+        '''
+        :param limit: stacking limit, most units in one hex at one impulse.
+        '''
+        self.limit = limit
+        self._counts = dict()  # (index, time) -> units
+        self._moves = set()  # (from index, to index, time leaving)
+        self._parked = dict()  # index -> list of times parked from
+        self._latest = dict()  # index -> latest time with a count
+        self.end = 0  # Nothing changes after this impulse.
+
+    def count(self, hex, time):
+        '''Units in hex at impulse time.'''
+        return self._count(hex.index, time)
+
+    def is_free(self, hex, time):
+        '''True if another unit fits in hex at impulse time.'''
+        return self._count(hex.index, time) < self.limit
+
+    def reserve(self, path, park=True):
+        '''Reserve path for a unit.
+        :param path: hexes unit is in at impulse 0, 1, ...
+        :param park: unit stays on last hex for good.
+        '''
+        self._reserve([h.index for h in path], park)
+
+    def _count(self, index, time):
+        count = self._counts.get((index, time), 0)
+        parked = self._parked.get(index)
+        if parked:
+            count += sum(1 for since in parked if since <= time)
+        return count
+
+    def _can_park(self, index, time):
+        # Room on index from time on, for good.
+        limit = self.limit
+        end = max([self._latest.get(index, time)] + self._parked.get(index, []))
+        for t in range(time, end + 1):
+            if self._count(index, t) >= limit:
+                return False
+        return True
+
+    def _reserve(self, indexes, park, sign=1):
+        counts, latest = self._counts, self._latest
+        last = len(indexes) - 1
+        for time, index in enumerate(indexes):
+            if sign > 0 and time > self.end:
+                self.end = time
+            if park and time == last:
+                parked = self._parked.setdefault(index, list())
+                if sign > 0:
+                    parked.append(time)
+                else:
+                    parked.remove(time)
+                break
+            counts[(index, time)] = counts.get((index, time), 0) + sign
+            if sign > 0 and time > latest.get(index, -1):
+                latest[index] = time
+            if time < last:
+                move = (index, indexes[time + 1], time)
+                if sign > 0:
+                    self._moves.add(move)
+                else:
+                    self._moves.discard(move)
+
+    def _release(self, indexes, park):
+        self._reserve(indexes, park, -1)
+
+
+class CooperativePlanner:
+    '''Plans many units over one PathFinder's map and costs together.
+
+        planner = CooperativePlanner(finder, limit=2)
+        paths = planner.plan([(unit.hex, unit.goal) for unit in formation])
+
+    paths[n][t] is unit n's hex at impulse t.  Cost of a path is the usual
+    cost to enter each hex, plus wait_cost for each impulse spent waiting.
+    '''
+    def __init__(self, finder, limit=1, horizon=None, wait_cost=1):
+        '''
+        :param finder: PathFinder, map and costs.
+        :param limit: stacking limit, most units in one hex at one impulse.
+          With a limit of 1 units also can't swap hexes head on.
+        :param horizon: give up on a unit not at its goal by this impulse,
+          default is twice map width plus height.
+        :param wait_cost: cost of staying put one impulse.
+        '''
+        self.finder = finder
+        self.limit = limit
+        if horizon is None:
+            horizon = 2 * (finder.width + finder.hexclass.ymax - finder.hexclass.ymin + 1)
+        self.horizon = horizon
+        self.wait_cost = wait_cost
+        self.table = ReservationTable(limit)
+        self.expanded = 0  # (hex, impulse) states expanded by last plan().
+
+    def plan(self, units):
+        '''Route units together, highest priority first.
+        :param units: sequence of (start hex, goal hex).
+        :return: List of paths, one per unit, list of hexes unit is in at
+          each impulse.  Empty if unit found no way to its goal, it stays at
+          start and others route around it, those planned before it through
+          its start are re-planned.  Units parked early can wall in later
+          goals, put units bound deepest into a formation first.
+        '''
+        self.table = table = ReservationTable(self.limit)
+        self.expanded = 0
+        units = [(start.index, goal.index) for start, goal in units]
+        # Units not yet planned are still on their start hexes.
+        for start, goal in units:
+            table._reserve([start], False)
+        paths = list()
+        for start, goal in units:
+            table._release([start], False)
+            path = self._search(start, goal)
+            table._reserve(path or [start], True)
+            paths.append(path)
+            if not path:
+                self._make_way(units, paths, start)
+        return [[self.finder.hex(i) for i in path] for path in paths]
+
+    def _make_way(self, units, paths, index):
+        '''Unit failed and stays on index for good.  Re-plan units planned
+        before it that were routed through index, they may fail in turn.
+        '''
+        table = self.table
+        failed = [index]
+        while failed:
+            index = failed.pop()
+            n = self._crossing(paths, index)
+            while n is not None:
+                start, goal = units[n]
+                table._release(paths[n], True)
+                path = paths[n] = self._search(start, goal)
+                table._reserve(path or [start], True)
+                if not path:
+                    failed.append(start)
+                n = self._crossing(paths, index)
+
+    def _crossing(self, paths, index):
+        '''Lowest priority unit in index when it is over the limit, or None.'''
+        table = self.table
+        for time in range(table.end + 1):
+            if table._count(index, time) > self.limit:
+                for n in range(len(paths) - 1, -1, -1):
+                    path = paths[n]
+                    if path and path[min(time, len(path) - 1)] == index:
+                        return n
+        return None
+
+    def _search(self, start, goal):
+        '''Space time A*, list of indexes per impulse.'''
+        finder, table, limit = self.finder, self.table, self.limit
+        neighbors, step_cost = finder.neighbors, finder.step_cost
+        wait_cost, horizon = self.wait_cost, self.horizon
+        moves = table._moves
+        h = finder.flow_field([finder.hex(goal)]).costs
+        if h[start] == INFINITY or len(table._parked.get(goal, ())) >= limit:
+            return []
+        # After table's last change every impulse looks the same, so times
+        # are capped there.  Search is then finite, fails without running
+        # to horizon when goal is walled in for good.
+        static = table.end + 1
+        g = {(start, 0): 0}
+        parent = {(start, 0): None}
+        heap = [(h[start], h[start], 0, start)]
+        closed = set()
+        found = None
+        while heap:
+            f, _, time, index = heapq.heappop(heap)
+            key = (index, time)
+            if key in closed:
+                continue
+            if index == goal and table._can_park(goal, time):
+                found = key
+                break
+            closed.add(key)
+            self.expanded += 1
+            if time >= horizon:
+                continue
+            base = g[key]
+            later = min(time + 1, static)
+            for n in list(neighbors[index * 6:index * 6 + 6]) + [index]:
+                if n < 0 or (n, later) in closed:
+                    continue
+                if n == index:
+                    if time == static:
+                        continue
+                    step = wait_cost
+                else:
+                    step = step_cost(index, n)
+                    if step is None:
+                        continue
+                    if limit == 1 and (n, index, time) in moves:
+                        continue  # Head on swap.
+                if table._count(n, later) >= limit:
+                    continue
+                cost = base + step
+                if h[n] < INFINITY and cost < g.get((n, later), INFINITY):
+                    g[(n, later)] = cost
+                    parent[(n, later)] = key
+                    heapq.heappush(heap, (cost + h[n], h[n], later, n))
+        if found is None:
+            return []
+        path = list()
+        while found is not None:
+            path.append(found[0])
+            found = parent[found]
+        path.reverse()
+        return path
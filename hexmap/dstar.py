@@ -0,0 +1,185 @@
+'''Incremental replanning, D* Lite, over BoundedHex maps.
+
+Koenig & Likhachev's D* Lite searches backward from the goal and keeps its
+search state between calls.  When hex costs change only hexes whose cost to
+goal is affected are re-expanded, instead of a full replan.
+'''
+import array
+import heapq
+
+from .hexagon import BoundedHex
+from .pathfinding import INFINITY, PathFinder
+
+
+class DStarLite:
+    '''Path from a (moving) start to a fixed goal on one BoundedHex map, kept
+    up to date as hex costs change.
+
+        planner = DStarLite(Map, start, goal, costs)
+        path = planner.next_path()
+        planner.update_cost(bridge, -1)  # bridge blown
+        planner.move_to(path[1])         # unit moved on
+        path = planner.next_path()       # repaired, not replanned
+
+    Costs are cost to enter each hex, indexed by BoundedHex.index, negative is
+    impassable.  Same model as pathfinding.PathFinder.
+    '''
+    def __init__(self, hexclass, start, goal, costs=None):
+        '''
+        :param hexclass: BoundedHex subclass, the map.
+        :param start: hex path starts from.
+        :param goal: hex path goes to.
+        :param costs: sequence of cost to enter each map hex, negative is
+          impassable.  Default is 1 everywhere.
+        '''
+        if not (isinstance(hexclass, type) and issubclass(hexclass, BoundedHex)):
+            raise TypeError('DStarLite needs a BoundedHex class not %r.' % (hexclass, ))
+        self.finder = finder = PathFinder(hexclass, costs)
+        self.hexclass = hexclass
+        self.cells = finder.cells
+        self.width = finder.width
+        self.neighbors = finder.neighbors
+        self.costs = finder.costs
+        self.start = start.index
+        self.goal = goal.index
+        self.expanded = 0  # Hexes expanded by last next_path().
+        self.total_expanded = 0
+        self._reset()
+
+    def _reset(self):
+        passable = [c for c in self.costs if c >= 0]
+        self.min_cost = min(passable) if passable else 0
+        self._g = array.array('d', [INFINITY]) * self.cells
+        self._rhs = array.array('d', [INFINITY]) * self.cells
+        self._km = 0.0
+        self._last = self.start
+        self._open = dict()
+        self._heap = list()
+        self._rhs[self.goal] = 0.0
+        self._push(self.goal)
+
+    def hex(self, index):
+        '''Map hex at index.'''
+        return self.finder.hex(index)
+
+    def _h(self, a, b):
+        return self.finder.distance(a, b) * self.min_cost
+
+    def _key(self, index):
+        best = min(self._g[index], self._rhs[index])
+        return (best + self._h(self.start, index) + self._km, best)
+
+    def _push(self, index):
+        key = self._key(index)
+        self._open[index] = key
+        heapq.heappush(self._heap, (key, index))
+
+    def _top(self):
+        # Drop stale heap entries, lazy deletion.
+        heap, open = self._heap, self._open
+        while heap and open.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0] if heap else ((INFINITY, INFINITY), -1)
+
+    def _cost(self, index):
+        cost = self.costs[index]
+        return INFINITY if cost < 0 else cost
+
+    def _update(self, index):
+        g, rhs, neighbors, costs = self._g, self._rhs, self.neighbors, self.costs
+        if index != self.goal:
+            best = INFINITY
+            i = index * 6
+            for n in neighbors[i:i + 6]:
+                if n >= 0 and costs[n] >= 0:
+                    cost = costs[n] + g[n]
+                    if cost < best:
+                        best = cost
+            rhs[index] = best
+        self._open.pop(index, None)
+        if g[index] != rhs[index]:
+            self._push(index)
+
+    def _compute(self):
+        g, rhs, neighbors, start = self._g, self._rhs, self.neighbors, self.start
+        expanded = 0
+        while True:
+            key, u = self._top()
+            if not (key < self._key(start) or rhs[start] != g[start]):
+                break
+            if u < 0:
+                break
+            new = self._key(u)
+            if key < new:
+                self._push(u)
+                continue
+            heapq.heappop(self._heap)
+            del self._open[u]
+            expanded += 1
+            i = u * 6
+            if g[u] > rhs[u]:
+                g[u] = rhs[u]
+                for n in neighbors[i:i + 6]:
+                    if n >= 0:
+                        self._update(n)
+            else:
+                g[u] = INFINITY
+                self._update(u)
+                for n in neighbors[i:i + 6]:
+                    if n >= 0:
+                        self._update(n)
+        self.expanded = expanded
+        self.total_expanded += expanded
+
+    def update_cost(self, hex, cost):
+        '''Change cost to enter hex, negative is impassable.  Only hexes
+        affected are re-expanded, on next next_path().
+        '''
+        index = hex.index
+        self.finder.set_cost(hex, cost)
+        if 0 <= cost < self.min_cost:
+            # Heuristic would overestimate, start over.
+            self._reset()
+            return
+        # Hex's cost is part of the edge from each neighbor into it.
+        i = index * 6
+        for n in self.neighbors[i:i + 6]:
+            if n >= 0:
+                self._update(n)
+
+    def move_to(self, hex):
+        '''Path now starts from hex, usually next hex along last path.'''
+        self.start = hex.index
+        self._km += self._h(self._last, self.start)
+        self._last = self.start
+
+    def cost(self):
+        '''Cost of current path, None if goal unreachable.'''
+        self._compute()
+        cost = self._g[self.start]
+        return None if cost == INFINITY else cost
+
+    def next_path(self):
+        '''Cheapest path from start to goal, after repairing search for cost
+        changes since last call.
+        :return: List of hexes, start to goal inclusive.  Empty if no path.
+        '''
+        self._compute()
+        g, costs, neighbors = self._g, self.costs, self.neighbors
+        current = self.start
+        if g[current] == INFINITY:
+            return []
+        path = [current]
+        while current != self.goal:
+            best, best_cost = -1, INFINITY
+            i = current * 6
+            for n in neighbors[i:i + 6]:
+                if n >= 0 and costs[n] >= 0:
+                    cost = costs[n] + g[n]
+                    if cost < best_cost:
+                        best, best_cost = n, cost
+            if best < 0 or len(path) > self.cells:
+                return []
+            current = best
+            path.append(current)
+        return [self.hex(i) for i in path]
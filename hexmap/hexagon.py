@@ -21,7 +21,17 @@ __doc__ = '''Paper war game style hexes.
 import logging
 log = logging.getLogger(__name__)
 
-import math
+import array
+import functools
+
+# Cube (q, r) step for each hexside 1-6, index 0 unused so hexsides index
+# directly.  Offset x, y <-> cube is q = x, r = y - (x + (x & 1)) // 2.
+CUBE_DIRECTIONS = ((0, 0), (0, -1), (1, -1), (1, 0), (0, 1), (-1, 1), (-1, 0))
+# Offset (dx, dy) step for each hexside 1-6, [even, odd] column, index 0 unused.
+OFFSETS = (
+    ((0, 0), (0, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0)),
+    ((0, 0), (0, -1), (1, -1), (1, 0), (0, 1), (-1, 0), (-1, -1)),
+    )
 
 
 class OffMapError(ValueError):
@@ -38,12 +48,12 @@ class Hex:
      - If x or y > 99, string value value padding expands as needed "012156",
        "00001234".
 
-    Note:  Consider Hex instances to be "immutable", although this is not
-    currently enforced.
+    Hex instances are immutable, x and y can't be changed after creation.
     '''
     digits = 2  # x, y portions of string value are zero padded this many digits minimum.
+    interning = False  # Hexes made by methods are shared instances, see interned().
 
-    __slots__ = ('x', 'y', '_value')
+    __slots__ = ('x', 'y', '_value', '_hash')
 
     def __init__(self, x=None, y=None):
         '''Following constructions are supported.
@@ -68,19 +78,127 @@ class Hex:
         if x is None:
             x, y = 0, 0
         elif y is None:
-            x, y = self.split(x)
-        self.x = int(x)  # read-only
-        self.y = int(y)  # read-only
+            if isinstance(x, Hex):
+                x, y = x.x, x.y
+            else:
+                x, y = self.split(x)
+        x, y = int(x), int(y)
+        setter = object.__setattr__
+        setter(self, 'x', x)
+        setter(self, 'y', y)
+        setter(self, '_value', None)
+        # Same as tuple's so Hex and (x, y) are interchangeable dict keys.
+        setter(self, '_hash', hash((x, y)))
+
+    def __setattr__(self, name, value):
+        if name in Hex.__slots__:
+            raise AttributeError('Hex is immutable, can not set %s.' % (name, ))
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        if name in Hex.__slots__:
+            raise AttributeError('Hex is immutable, can not delete %s.' % (name, ))
+        object.__delattr__(self, name)
+
+    @classmethod
+    def interned(cls, x=None, y=None):
+        '''Shared instance, same constructions as Hex().  Instances come from a
+        bounded LRU cache (INTERN_CACHE_SIZE), so repeatedly used hexes are
+        made once.  Set class attribute 'interning' True to have neighbor,
+        arc and math methods return interned instances.
+        '''
+        if x is None:
+            x, y = cls()
+        elif y is None:
+            x, y = cls.split(x)
+        return _intern(cls, int(x), int(y))
+
+    @classmethod
+    def intern_info(cls):
+        '''Intern cache (hits, misses, maxsize, currsize), shared by all classes.'''
+        return _intern.cache_info()
+
+    @classmethod
+    def _maker(cls, checked=True):
+        '''Callable(x, y) that makes instances, interned ones if interning.
+        :param checked: False for coordinates already known to be valid.
+        '''
+        if cls.interning:
+            return functools.partial(_intern, cls)
+        return cls if checked else cls._unchecked
+
+    @classmethod
+    def _unchecked(cls, x, y):
+        return cls(x, y)
 
     @property
     def value(self):
         # moved out of constructor for lazy eval.
-        if not hasattr(self, '_value'):
-            digits = max(self.digits, len(str(abs(self.x))), len(str(abs(self.y))))
-            # Annoying that sign is factored into padding.  -2,4 is '-204' not '-0204'.
-            self._value = ('{:0%id}{:=0%id}' % (digits + (self.x < 0), digits + (self.y < 0))).format(self.x, self.y)
+        if self._value is None:
+            object.__setattr__(self, '_value', self.format(self.x, self.y))
         return self._value
 
+    @classmethod
+    def format(cls, x, y):
+        '''String value of hex at x, y.'''
+        digits = cls.digits
+        if 0 <= x < 10 ** digits and 0 <= y < 10 ** digits:
+            return '%0*d%0*d' % (digits, x, digits, y)
+        digits = max(digits, len(str(abs(x))), len(str(abs(y))))
+        # Annoying that sign is factored into padding.  -2,4 is '-204' not '-0204'.
+        return ('{:0%id}{:=0%id}' % (digits + (x < 0), digits + (y < 0))).format(x, y)
+
+    @classmethod
+    def format_many(cls, xys):
+        '''List of string values, format() of each hex or (x, y) pair in xys.'''
+        digits = cls.digits
+        limit = 10 ** digits
+        if limit <= 10000:
+            # Zero padded strings of every in range part, looked up not formatted.
+            padded = _padded(digits)
+        else:
+            padded = None
+        fmt = cls.format
+        labels = list()
+        append = labels.append
+        for xy in xys:
+            if xy.__class__ is tuple:
+                x, y = xy
+            else:
+                x, y = xy[0], xy[1]
+            if 0 <= x < limit and 0 <= y < limit:
+                append(padded[x] + padded[y] if padded else '%0*d%0*d' % (digits, x, digits, y))
+            else:
+                append(fmt(x, y))
+        return labels
+
+    @classmethod
+    def parse_many(cls, values, packed=False):
+        '''Coordinates of string/int hex values, same rules as split(),
+        without making hexes.
+        :param values: iterable of str or int hex values, "0142", 142.
+        :param packed: return array of pack() keys instead.
+        :return: (x array, y array), array.array('q') each.
+        '''
+        xs, ys = array.array('q'), array.array('q')
+        add_x, add_y = xs.append, ys.append
+        split = cls.split
+        for value in values:
+            if value.__class__ is not str:
+                value = str(value)
+            half = len(value) >> 1
+            if len(value) & 1 or '-' in value:
+                x, y = split(value)
+                add_x(int(x))
+                add_y(int(y))
+            else:
+                add_x(int(value[:half]))
+                add_y(int(value[half:]))
+        if packed:
+            pack = cls.pack
+            return array.array('q', [pack(x, y) for x, y in zip(xs, ys)])
+        return xs, ys
+
     def __str__(self):
         return self.value
 
@@ -95,50 +213,67 @@ class Hex:
         raise IndexError
 
     def __hash__(self):
-        return hash((self.x, self.y))
+        return self._hash
 
     def __eq__(self, other):
-        print('comp', other)
+        if isinstance(other, Hex):
+            # Compare this and not .value, much faster.
+            return self.x == other.x and self.y == other.y
         try:
-            if isinstance(other, self.__class__):
-                # Compare this and not .value, much faster.
-                return self.x == other.x and self.y == other.y
-            elif isinstance(other, str):
-                x, y = self.split(other)
-            elif isinstance(other, int):
-                x, y = self.split(other)
+            if isinstance(other, (str, int)):
+                x, y = _split_ints(other)
             elif len(other) == 2:
-                x, y = other[0], other[1]
-            return self.x == int(x) and self.y == int(y)
-        except (TypeError, IndexError, ValueError):
-            print('dick')
+                x, y = int(other[0]), int(other[1])
+            else:
+                return False
+        except (TypeError, ValueError):
             return False
+        return self.x == x and self.y == y
 
     def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __reduce__(self):
+        # Pickle/copy through constructor, default slots restore would setattr.
+        return (self.__class__, (self.x, self.y))
+
+    @staticmethod
+    def _pair(other):
+        # Other as x, y, None if it isn't a two item sequence of integers.
         try:
-            if isinstance(other, str):
-                other = self.__class__(other)
-            elif isinstance(other, int):
-                return str(self) != str(other)
-            return len(other) != 2 or self.x != other[0] or self.y != other[1]
-        except (TypeError, IndexError, OffMapError):
-            return False
+            if len(other) != 2:
+                return None
+            return int(other[0]), int(other[1])
+        except (TypeError, ValueError):
+            return None
 
     def __add__(self, other):
         '''Hex + any two item sequence.'''
-        return self.__class__(self.x + int(other[0]), self.y + int(other[1]))
+        pair = self._pair(other)
+        if pair is None:
+            return NotImplemented
+        return self._maker()(self.x + pair[0], self.y + pair[1])
 
     def __radd__(self, other):
         '''Any two item sequence + Hex.'''
-        return self.__class__(self.x + int(other[0]), self.y + int(other[1]))
+        pair = self._pair(other)
+        if pair is None:
+            return NotImplemented
+        return self._maker()(self.x + pair[0], self.y + pair[1])
 
     def __sub__(self, other):
         '''Hex - any two item sequence.'''
-        return self.__class__(self.x - int(other[0]), self.y - int(other[1]))
+        pair = self._pair(other)
+        if pair is None:
+            return NotImplemented
+        return self._maker()(self.x - pair[0], self.y - pair[1])
 
     def __rsub__(self, other):
         '''Any two item sequence - Hex'''
-        return self.__class__(self.x - int(other[0]), self.y - int(other[1]))
+        pair = self._pair(other)
+        if pair is None:
+            return NotImplemented
+        return self._maker()(self.x - pair[0], self.y - pair[1])
 
     @classmethod
     def split(cls, value):
@@ -154,6 +289,28 @@ class Hex:
             x, y = value[:digits], value[digits:]
         return x, y
 
+    @property
+    def key(self):
+        '''Packed integer key, see pack().'''
+        return self.pack(self.x, self.y)
+
+    @staticmethod
+    def pack(x, y):
+        '''Pack x, y into one integer.  x is unbounded, y must fit in signed 32
+        bits, ValueError if it doesn't.
+        '''
+        if not -0x80000000 <= y <= 0x7FFFFFFF:
+            raise ValueError('y %s does not fit in a packed key, signed 32 bits.' % (y, ))
+        return (x << 32) | (y & 0xFFFFFFFF)
+
+    @staticmethod
+    def unpack(key):
+        '''Unpack integer key into x, y.'''
+        y = key & 0xFFFFFFFF
+        if y & 0x80000000:
+            y -= 0x100000000
+        return key >> 32, y
+
     @classmethod
     def delta(cls, start, end):
         '''How many hexsides(0-5) between start(exclusive) and end(inclusive).'''
@@ -183,80 +340,52 @@ class Hex:
 
     def distance_to(self, to_hex):
         '''
-        :return: Distance in hexes to hex.
+        :param to_hex: Hex or any two item sequence.
+        :return: Integer distance in hexes to hex.
         '''
-        if to_hex == self:
-            return 0
-        # if in either triangle formed by extending left/right hexsides to
-        # infinity then distance is abs(a-b)
-        # in triangle if (rounding up) abs(a1-b1) b2
-        (a1, a2) = (self[0], self[1])
-        (b1, b2) = (to_hex[0], to_hex[1])
-        d1 = abs(b1 - a1)
-        d2 = abs(b2 - a2)
-        offset = d1 / 2
-        if (a1 % 2) and ((b1 + 1) % 2):  # if a is odd and b even
-            offset += 1
-        triMin = a2 - offset
-        triMax = triMin + d1
-        # in triangles d1 is the distance.
-        distance = d1
-        # outside of triangles must add more.
-        if b2 < triMin:
-                distance += (triMin - b2)
-        if b2 > triMax:
-            distance += (b2 - triMax)
-        return distance
+        if isinstance(to_hex, Hex):
+            bx, by = to_hex.x, to_hex.y
+        else:
+            bx, by = int(to_hex[0]), int(to_hex[1])
+        ax = self.x
+        # Cube coordinates, distance is largest of q, r, s deltas (s = -q - r).
+        dq = bx - ax
+        dr = by - ((bx + (bx & 1)) >> 1) - self.y + ((ax + (ax & 1)) >> 1)
+        return max(abs(dq), abs(dr), abs(dq + dr))
 
     def hexsides_to(self, to_hex):
         '''Tuple of 1, 2, or 6(same hex) hexsides passed through on way to_hex.
-        Accurate for distances up to about 10000 hexes.
+        Two hexsides when heading exactly along the vertex between them.
+        Integer arithmetic, exact at any distance.
         :return: Tuple of integer hexsides.
         '''
-        if self == to_hex:
-            return (1, 2, 3, 4, 5, 6)
-        d_x = to_hex.x - self.x
-        d_y = to_hex.y - self.y
-        # Same hex column.
-        if d_x == 0:
-            if d_y < 0:
-                return (1,)
-            else:
-                return (4,)
-        # Even / odd columns need a nudge.
-        if (self.x % 2) and not (to_hex.x % 2):
-            d_y += .5
-        if not (self.x % 2) and (to_hex.x % 2):
-            d_y -= .5
-        # Hexes are wider than tall.
-        d_y *= -20.0  # Negative cause math origin is lower left not upper left.
-        d_x *= 17.32
-        angle = round(math.degrees(math.atan2(d_y, d_x)), 2)
-        if angle > 0 and angle < 60:
-            answer = (2, )
-        elif angle > 60 and angle < 120:
-            answer = (1, )
-        elif angle > 120 and angle < 180:
-            answer = (6, )
-        elif angle < 0 and angle > -60:
-            answer = (3, )
-        elif angle < -60 and angle > -120:
-            answer = (4, )
-        elif angle < -120 and angle > -180:
-            answer = (5, )
-        elif angle == 60:
-            answer = (1, 2)
-        elif angle == 0:
-            answer = (2, 3)
-        elif angle == -60:
-            answer = (3, 4)
-        elif angle == -120:
-            answer = (4, 5)
-        elif abs(angle) == 180:
-            answer = (5, 6)
-        elif angle == 120:
-            answer = (6, 1)
-        return answer
+        ax, bx = self.x, to_hex.x
+        return _hexsides(bx - ax, to_hex.y - ((bx + (bx & 1)) >> 1) - self.y + ((ax + (ax & 1)) >> 1))
+
+    def hexsides_to_many(self, to_hexes):
+        '''List of hexsides_to() for each hex in to_hexes.'''
+        ax = self.x
+        ar = self.y - ((ax + (ax & 1)) >> 1)
+        return [_hexsides(h.x - ax, h.y - ((h.x + (h.x & 1)) >> 1) - ar) for h in to_hexes]
+
+    def line_to(self, to_hex):
+        '''Hexes a line from center of self to center of to_hex passes
+        through, self and to_hex included.  Integer arithmetic, exact at any
+        distance, hexes line only touches a corner of are left out.
+        :return: List of tuples, in order.  1 hex, or 2 hexes (in hexside
+          order, like hexsides_to()) where line runs exactly along the
+          hexside between them.  Off map hexes of a BoundedHex are dropped.
+        '''
+        make = self._maker(checked=False)
+        return [tuple(make(x, y) for x, y in xys) for xys in self._line(to_hex)]
+
+    def _line(self, to_hex):
+        '''line_to() steps as tuples of (x, y).'''
+        ax, bx = self.x, to_hex.x
+        ar = self.y - ((ax + (ax & 1)) >> 1)
+        dr = to_hex.y - ((bx + (bx & 1)) >> 1) - ar
+        for step in line_template(bx - ax, dr):
+            yield tuple((ax + q, ar + r + ((ax + q + ((ax + q) & 1)) >> 1)) for q, r in step)
 
     def hex_in_direction(self, direction):
         '''
@@ -279,21 +408,21 @@ class Hex:
             x += 1
         if direction in (5, 6):
             x -= 1
-        return self.__class__(x, y)
+        return self._maker()(x, y)
 
-    def sixpack(self, distance=1, include_self=False):
+    def neighbors(self):
+        '''List of adjacent hexes, in hexside order.'''
+        make, x, y = self._maker(checked=False), self.x, self.y
+        return [make(x + dx, y + dy) for dx, dy in OFFSETS[x & 1][1:]]
+
+    def sixpack(self, distance=1, include_self=False, hexset=False):
         '''Surrounding hexes to distance.
+        :param hexset: return HexSet instead of set.
         :return: set of Hex instances.
         '''
-        if distance == 1:
-            hexes = set([self.hex_in_direction(x) for x in (1, 2, 3, 4, 5, 6)])
-        else:
-            hexes = self.arc(1, 6, distance, include_self, full_circle=True)
-        if include_self:
-            hexes.add(self)
-        return hexes
+        return self._translate(arc_template(1, 6, distance, self.x & 1, include_self, True), hexset)
 
-    def arc(self, start, end, distance=1, include_self=False, full_circle=False):
+    def arc(self, start, end, distance=1, include_self=False, full_circle=False, hexset=False):
         '''Hexes in arc defined by hexsides (clockwise, inclusive).
         NOTE: The arc 1,6 is not all surrounding hexes. It does not include the
         hexes beyond range 1 between the hex rows heading out direction 1 and 6.
@@ -302,62 +431,233 @@ class Hex:
         :param distance: how far out to walk.
         :param include_self: include origin hex.
         :param full_circle: all hexes within x distance (prevents having to repeat walking logic in sixpack).
+        :param hexset: return HexSet instead of set.
         :return: set of Hex instances.
+
+        Shapes are cached per origin column parity, see arc_template().
+        '''
+        return self._translate(arc_template(start, end, distance, self.x & 1, include_self, full_circle), hexset)
+
+    def iter_arc(self, start, end, distance=1, include_self=False, full_circle=False, raw=False):
+        '''Generator, same hexes as arc(), ring by ring outward, no duplicates.
+        :param raw: yield (x, y) tuples instead of Hex instances.
         '''
-        # Go out 1 in 'start' direction,
-        # Walk clockwise around ring until we get to a hex in 'end' direction,
-        # Repeat 'distance' times.
-        hexes = set()
+        xys = self._walk(start, end, range(1, distance + 1), include_self, full_circle)
+        return xys if raw else self._hexes(xys)
+
+    def ring(self, radius, raw=False):
+        '''Generator, hexes exactly radius away, clockwise from hexside 1.
+        Radius 0 is just self.
+        :param raw: yield (x, y) tuples instead of Hex instances.
+        '''
+        xys = self._walk(1, 6, range(radius, radius + 1), radius == 0, True)
+        return xys if raw else self._hexes(xys)
+
+    def spiral(self, radius, raw=False):
+        '''Generator, self then each ring out to radius.
+        :param raw: yield (x, y) tuples instead of Hex instances.
+        '''
+        xys = self._walk(1, 6, range(1, radius + 1), True, True)
+        return xys if raw else self._hexes(xys)
+
+    def _hexes(self, xys):
+        make = self._maker(checked=False)
+        for x, y in xys:
+            yield make(x, y)
+
+    def _walk(self, start, end, rings, include_self, full_circle):
+        '''Generator of (x, y) in arc start -> end for each ring in rings.'''
+        # Go out 'ring' in 'start' direction, walk clockwise around ring until
+        # we get to hex in 'end' direction.  Ring hexes are calculated directly
+        # in cube coordinates, corner + steps * direction, no neighbor walking.
         if include_self:
-            hexes.add(self)
-        # Rotations we use to walk *around* ring.
-        if full_circle:
-            path = [self.rotate(h, 2) for h in self.rotator(start, end)]
-        else:
-            path = [self.rotate(h, 2) for h in self.rotator(start, end)][:-1]
-        start_row = self
-        for ring in range(1, distance + 1):
-            start_row = start_row.hex_in_direction(start)
-            hexes.add(start_row)
-            #log.debug('start:%s ring:%i\t%s' % (start_row, ring, [str(h) for h in hexes]))
-            current = start_row
-            for direction in path:
+            yield (self.x, self.y)
+        sides = list(self.rotator(start, end))
+        if not full_circle:
+            sides.pop()
+        arrive = CUBE_DIRECTIONS[self.rotate(start, len(sides))]
+        walks = [(CUBE_DIRECTIONS[h], CUBE_DIRECTIONS[self.rotate(h, 2)]) for h in sides]
+        q = self.x
+        r = self.y - ((q + (q & 1)) >> 1)
+        for ring in rings:
+            for (cq, cr), (dq, dr) in walks:
+                hq = q + cq * ring
+                hr = r + cr * ring
                 for i in range(ring):
-                    prev = current
-                    current = current.hex_in_direction(direction)
-                    hexes.add(current)
-                    #log.debug('step:%i in directo %i %s -> %s\t%s' % (i + 1, direction, prev, current, [str(h) for h in hexes]))
-        return hexes
-
-    def half_arc(self, hexsides, distance=1, include_self=False):
+                    yield (hq, hr + ((hq + (hq & 1)) >> 1))
+                    hq += dq
+                    hr += dr
+            if len(sides) < 6 and ring:
+                hq = q + arrive[0] * ring
+                yield (hq, r + arrive[1] * ring + ((hq + (hq & 1)) >> 1))
+
+    def half_arc(self, hexsides, distance=1, include_self=False, hexset=False):
         '''180deg 'half' arc'''
-        # TODO: not really sure what this is...
-        # go straight adding (left/rigt) sides
-        hexes = set()
-        if include_self:
-            hexes.add(self)
-        straight = hexsides[1]
-        left = hexsides[0] - 1
-        if left < 1:
-            left += 6
-        right = hexsides[2] + 1
-        if right > 6:
-            right -= 6
-        center_hex = self.hex_in_direction(straight)
-        side = 2
-        while distance > 0:
-            left_hex = center_hex
-            right_hex = center_hex
-            for i in range(side):
-                left_hex = left_hex.hex_in_direction(left)
-                hexes.add(left_hex)
-                right_hex = right_hex.hex_in_direction(right)
-                hexes.add(right_hex)
-            hexes.add(center_hex)
-            center_hex = center_hex.hex_in_direction(straight)
-            distance -= 1
-            side += 2
-        return hexes
+        return self._translate(half_arc_template(tuple(hexsides), distance, self.x & 1, include_self), hexset)
+
+    def _translate(self, offsets, hexset=False):
+        '''Set (or HexSet) of hexes at self + each (dx, dy) in offsets.'''
+        xys = self._shift(offsets)
+        if hexset:
+            from .hexset import HexSet
+            return HexSet.from_xy(xys, self.__class__)
+        make = self._maker(checked=False)
+        return set(make(x, y) for x, y in xys)
+
+    def _shift(self, offsets):
+        x, y = self.x, self.y
+        return ((x + dx, y + dy) for dx, dy in offsets)
+
+
+def _hexsides(dq, dr):
+    '''Hexsides heading along cube delta dq, dr passes through.'''
+    # Hexside is the one whose direction has largest projection of delta,
+    # ties are exactly along the vertex between two hexsides.  Projections
+    # onto hexsides 1-6 are a, a + c, c, -a, -a - c, -c so signs of a and c
+    # (and which of a, c is bigger) decide.
+    a = -dq - dr - dr
+    c = dq + dq + dr
+    if a > 0:
+        if c > 0:
+            return (2, )
+        if c == 0:
+            return (1, 2)
+        if a > -c:
+            return (1, )
+        if a < -c:
+            return (6, )
+        return (6, 1)
+    if a < 0:
+        if c < 0:
+            return (5, )
+        if c == 0:
+            return (4, 5)
+        if c > -a:
+            return (3, )
+        if c < -a:
+            return (4, )
+        return (3, 4)
+    if c > 0:
+        return (2, 3)
+    if c < 0:
+        return (5, 6)
+    return (1, 2, 3, 4, 5, 6)
+
+
+@functools.lru_cache(maxsize=4096)
+def line_template(dq, dr):
+    '''Hexes a line from origin to cube delta dq, dr passes through.
+    Tuple of steps, each a tuple of cube (dq, dr) offsets from origin, one
+    hex, or two hexes in hexside order where line runs exactly along the
+    hexside between them.  LRU cached, see line_template.cache_info().
+    '''
+    # Walk hex to hex.  Hex h's cell is where dot(p - h, e) <= 1 for each of
+    # the six cube directions e, line p(t) = t * delta leaves it through
+    # the side reached at smallest t = (1 + dot(h, e)) / dot(delta, e).
+    # Fractions compared by cross multiplying, all integer.
+    ds = -dq - dr
+    dots = [None] + [dq * eq + dr * er + ds * (-eq - er) for eq, er in CUBE_DIRECTIONS[1:]]
+    # Only sides line heads toward (dot > 0) can be left through.
+    ahead = [(side, eq, er, -eq - er, dots[side]) for side, (eq, er) in enumerate(CUBE_DIRECTIONS) if side and dots[side] > 0]
+    steps = [((0, 0), )]
+    q, r = 0, 0
+    while q != dq or r != dr:
+        s = -q - r
+        exits = None
+        for side, eq, er, es, rate in ahead:
+            n = 1 + q * eq + r * er + s * es
+            if exits is None or n * den < num * rate:
+                exits, num, den = [side], n, rate
+            elif n * den == num * rate:
+                exits.append(side)
+        if len(exits) == 1:
+            eq, er = CUBE_DIRECTIONS[exits[0]]
+            q, r = q + eq, r + er
+        else:
+            # Leaves through a vertex, into whichever of the two hexes past
+            # it line leans toward, or along the hexside between them.
+            first, second = exits if exits != [1, 6] else (6, 1)
+            aq, ar = CUBE_DIRECTIONS[first]
+            bq, br = CUBE_DIRECTIONS[second]
+            lean = dots[second] - dots[first]
+            if lean > 0:
+                q, r = q + bq, r + br
+            elif lean < 0:
+                q, r = q + aq, r + ar
+            else:
+                steps.append(((q + aq, r + ar), (q + bq, r + br)))
+                q, r = q + aq + bq, r + ar + br
+        steps.append(((q, r), ))
+    return tuple(steps)
+
+
+@functools.lru_cache(maxsize=4096)
+def _split_ints(value):
+    # Comparing to str/int values, keep the string munging out of the hot path.
+    x, y = Hex.split(value)
+    return int(x), int(y)
+
+
+@functools.lru_cache(maxsize=8)
+def _padded(digits):
+    return ['%0*d' % (digits, i) for i in range(10 ** digits)]
+
+
+INTERN_CACHE_SIZE = 65536
+
+
+@functools.lru_cache(maxsize=INTERN_CACHE_SIZE)
+def _intern(klas, x, y):
+    return klas(x, y)
+
+
+# Arc shapes depend only on origin column parity, not position.  Templates
+# are (dx, dy) offsets from origin (parity, 0), translated to real origin.
+TEMPLATE_CACHE_SIZE = 512
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def arc_template(start, end, distance, parity, include_self, full_circle):
+    '''Tuple of (dx, dy) offsets of Hex.arc() from origin with column parity.
+    LRU cached, see arc_template.cache_info().
+    '''
+    origin = Hex(parity, 0)
+    return tuple((x - parity, y) for x, y in Hex._walk(origin, start, end, range(1, distance + 1), include_self, full_circle))
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def half_arc_template(hexsides, distance, parity, include_self):
+    '''Tuple of (dx, dy) offsets of Hex.half_arc() from origin with column parity.
+    LRU cached, see half_arc_template.cache_info().
+    '''
+    # TODO: not really sure what this is...
+    # go straight adding (left/rigt) sides
+    origin = Hex(parity, 0)
+    hexes = set()
+    if include_self:
+        hexes.add(origin)
+    straight = hexsides[1]
+    left = hexsides[0] - 1
+    if left < 1:
+        left += 6
+    right = hexsides[2] + 1
+    if right > 6:
+        right -= 6
+    center_hex = origin.hex_in_direction(straight)
+    side = 2
+    while distance > 0:
+        left_hex = center_hex
+        right_hex = center_hex
+        for i in range(side):
+            left_hex = left_hex.hex_in_direction(left)
+            hexes.add(left_hex)
+            right_hex = right_hex.hex_in_direction(right)
+            hexes.add(right_hex)
+        hexes.add(center_hex)
+        center_hex = center_hex.hex_in_direction(straight)
+        distance -= 1
+        side += 2
+    return tuple((h.x - parity, h.y) for h in hexes)
 
 
 class BoundedHex(Hex):
@@ -378,6 +678,73 @@ class BoundedHex(Hex):
         if not self._valid(self):
             raise OffMapError(f'"{self}" Out of bounds [{self.xmin} - {self.xmax}, {self.ymin} - {self.ymax}].')
 
+    @property
+    def index(self):
+        '''Position of hex in row major ordering of map, 0 to cells() - 1.'''
+        return (self.y - self.ymin) * (self.xmax - self.xmin + 1) + self.x - self.xmin
+
+    @classmethod
+    def from_index(cls, index):
+        '''Hex at index, see index.'''
+        y, x = divmod(index, cls.xmax - cls.xmin + 1)
+        return cls(x + cls.xmin, y + cls.ymin)
+
+    @classmethod
+    def cells(cls):
+        '''Number of hexes on map.'''
+        return (cls.xmax - cls.xmin + 1) * (cls.ymax - cls.ymin + 1)
+
+    @classmethod
+    def neighbor_table(cls):
+        '''Dense neighbor index, array('i') of 6 ints per map hex.
+        table[index * 6 + hexside - 1] is index of neighbor, -1 if off map.
+        Built on first use, once per class.  Don't change bounds after.
+        '''
+        table = cls.__dict__.get('_neighbor_table')
+        if table is None:
+            width = cls.xmax - cls.xmin + 1
+            height = cls.ymax - cls.ymin + 1
+            table = array.array('i', [-1]) * (6 * width * height)
+            # Every hex in a column has same neighbor steps, fill whole
+            # column for one hexside per slice assignment.
+            for col in range(width):
+                offsets = OFFSETS[(col + cls.xmin) & 1]
+                for side in range(1, 7):
+                    dx, dy = offsets[side]
+                    if not 0 <= col + dx < width:
+                        continue
+                    first, last = max(0, -dy), min(height, height - dy)
+                    if first >= last:
+                        continue
+                    table[(first * width + col) * 6 + side - 1:(last * width + col) * 6:width * 6] = array.array(
+                            'i', range((first + dy) * width + col + dx, (last + dy) * width + col + dx, width))
+            cls._neighbor_table = table
+        return table
+
+    def neighbors(self):
+        '''List of adjacent on map hexes, in hexside order.'''
+        i = self.index * 6
+        make = self._maker(checked=False)
+        width, xmin, ymin = self.xmax - self.xmin + 1, self.xmin, self.ymin
+        return [make(n % width + xmin, n // width + ymin) for n in self.neighbor_table()[i:i + 6] if n >= 0]
+
+    def sixpack(self, distance=1, include_self=False, hexset=False):
+        if distance != 1 or hexset:
+            return super().sixpack(distance, include_self, hexset)
+        hexes = set(self.neighbors())
+        if include_self:
+            hexes.add(self)
+        return hexes
+
+    @classmethod
+    def _unchecked(cls, x, y):
+        # Skip bounds check, unless subclass has its own constructor.
+        if cls.__init__ is not BoundedHex.__init__:
+            return cls(x, y)
+        self = cls.__new__(cls)
+        Hex.__init__(self, x, y)
+        return self
+
     @classmethod
     def _valid(klas, hex):
         return not (
@@ -387,14 +754,23 @@ class BoundedHex(Hex):
                 hex.y > klas.ymax
                 )
 
-    def sixpack(self, *args, **kwargs):
-        # Kind of hackish, inefficient. Use unbounded Hex() to do sixpack.  Then
-        # loop over and strip out the out of bounds hexes.
-        proxy = Hex(self)
-        hexes = proxy.sixpack(*args, **kwargs)
-        return set(self.__class__(h) for h in hexes if self._valid(h))
-
-    def arc(self, *args, **kwargs):
-        proxy = Hex(self.x, self.y)
-        hexes = proxy.arc(*args, **kwargs)
-        return set(self.__class__(h) for h in hexes if self._valid(h))
+    def _walk(self, *args):
+        # Drop off map hexes before they're ever made.
+        xmin, xmax, ymin, ymax = self.xmin, self.xmax, self.ymin, self.ymax
+        for x, y in super()._walk(*args):
+            if xmin <= x <= xmax and ymin <= y <= ymax:
+                yield (x, y)
+
+    def _line(self, to_hex):
+        # Line between map hexes only grazes off map hexes along the edge.
+        xmin, xmax, ymin, ymax = self.xmin, self.xmax, self.ymin, self.ymax
+        for xys in super()._line(to_hex):
+            xys = tuple((x, y) for x, y in xys if xmin <= x <= xmax and ymin <= y <= ymax)
+            if xys:
+                yield xys
+
+    def _shift(self, offsets):
+        # Translate and filter, off map hexes are never made.
+        x, y = self.x, self.y
+        xmin, xmax, ymin, ymax = self.xmin - x, self.xmax - x, self.ymin - y, self.ymax - y
+        return ((x + dx, y + dy) for dx, dy in offsets if xmin <= dx <= xmax and ymin <= dy <= ymax)
@@ -0,0 +1,263 @@
+'''NumPy backed arrays of hexes, for batch coordinate math.
+
+Requires numpy, which is otherwise not a hexmap dependency.
+'''
+import functools
+
+import numpy
+
+from .hexagon import Hex, OFFSETS
+from .los import line_offsets
+
+# (dx, dy) step for each hexside 1-6, indexed [column parity][hexside].
+STEPS = numpy.array(OFFSETS, dtype=numpy.int64)
+
+
+def cube(x, y):
+    '''Convert offset x, y arrays to cube q, r, s arrays.'''
+    r = y - ((x + (x & 1)) >> 1)
+    return x, r, -x - r
+
+
+def hexsides(dq, dr, ds):
+    '''Hexsides passed through heading along cube deltas.
+    :return: (n, 2) int8 array. Row is [side, 0] for one hexside, [side, side]
+      when heading along a vertex, [0, 0] when delta is zero (same hex).
+    '''
+    # Projection onto each hexside's direction, largest is the hexside heading
+    # through.  Ties are exactly along a vertex.
+    dots = numpy.stack((ds - dr, dq - dr, dq - ds, dr - ds, dr - dq, ds - dq), axis=-1)
+    best = dots.max(axis=-1, keepdims=True)
+    hits = dots == best
+    first = hits.argmax(axis=-1)
+    # Only pair that wraps is (6, 1), argmax finds 1 so check it explicitly.
+    wrap = hits[..., 0] & hits[..., 5]
+    second = numpy.where(wrap, 0, first + 1)
+    first = numpy.where(wrap, 5, first)
+    paired = hits.sum(axis=-1) == 2
+    result = numpy.zeros(dq.shape + (2, ), dtype=numpy.int8)
+    result[..., 0] = first + 1
+    result[..., 1] = numpy.where(paired, second + 1, 0)
+    result[best[..., 0] == 0] = 0
+    return result
+
+
+def distance_matrix(hexes_a, hexes_b, dtype=numpy.int32):
+    '''Distances between every pair of hexes.
+    :param hexes_a: HexArray or sequence of hexes, rows.
+    :param hexes_b: HexArray or sequence of hexes, columns.
+    :param dtype: integer type of result, int16 halves memory for maps under
+      32767 hexes across.
+    :return: (len(hexes_a), len(hexes_b)) integer array.
+    '''
+    if not isinstance(hexes_a, HexArray):
+        hexes_a = HexArray.from_hexes(hexes_a)
+    if not isinstance(hexes_b, HexArray):
+        hexes_b = HexArray.from_hexes(hexes_b)
+    aq, ar, _ = cube(hexes_a.x, hexes_a.y)
+    bq, br, _ = cube(hexes_b.x, hexes_b.y)
+    dq = bq[numpy.newaxis, :] - aq[:, numpy.newaxis]
+    dr = br[numpy.newaxis, :] - ar[:, numpy.newaxis]
+    # max(|dq|, |dr|, |ds|) == (|dq| + |dr| + |dq + dr|) / 2
+    result = abs(dq)
+    result += abs(dr)
+    dq += dr
+    result += abs(dq)
+    result >>= 1
+    return result.astype(dtype, copy=False)
+
+
+def visibility_matrix(los, shooters, targets):
+    '''los.matrix() as an array, every pair's line checked at once.  Faster
+    than matrix() on open maps, where few lines are cut short by blocking.
+    :param los: hexmap.los.LineOfSight.
+    :return: (len(shooters), len(targets)) bool array, True where visible.
+    '''
+    width, height, xmin = los.width, los.height, los.hexclass.xmin
+    a = numpy.fromiter((h.index for h in shooters), dtype=numpy.int64)
+    b = numpy.fromiter((h.index for h in targets), dtype=numpy.int64)
+    a, b = numpy.broadcast_arrays(a[:, numpy.newaxis], b[numpy.newaxis, :])
+    a, b = a.ravel(), b.ravel()
+    if not len(a):
+        return numpy.ones((len(shooters), len(targets)), dtype=bool)
+    ax, ay = a % width, a // width
+    aq, ar, _ = cube(ax + xmin, ay)
+    bq, br, _ = cube(b % width + xmin, b // width)
+    dq, dr, parity = bq - aq, br - ar, (ax + xmin) & 1
+    # Only distinct lines are traced, code is one integer per line.
+    span = width + height
+    codes = ((dq + span) * (2 * span + 1) + dr + span) * 2 + parity
+    codes, first, inverse = numpy.unique(codes, return_index=True, return_inverse=True)
+    inverse = inverse.ravel()
+    lines = [_line_steps(*key) for key in zip(dq[first].tolist(), dr[first].tolist(), parity[first].tolist())]
+    lengths = numpy.array([len(line) for line in lines], dtype=numpy.int64)
+    starts = numpy.cumsum(lengths) - lengths
+    steps = numpy.concatenate(lines)
+    # Flatten every pair's steps, owner is pair each step belongs to.
+    counts = lengths[inverse]
+    owner = numpy.repeat(numpy.arange(len(a)), counts)
+    within = numpy.arange(len(owner)) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+    steps = steps[starts[inverse][owner] + within]
+    x = ax[owner, numpy.newaxis] + steps[..., 0]
+    y = ay[owner, numpy.newaxis] + steps[..., 1]
+    inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+    blocking = numpy.frombuffer(bytes(los.blocking), dtype=numpy.uint8).astype(bool)
+    blocks = blocking[numpy.where(inside, y * width + x, 0)]
+    # Off map hex beside a hexside stands in for the on map one.
+    one = numpy.where(inside[:, 0], blocks[:, 0], blocks[:, 1])
+    two = numpy.where(inside[:, 1], blocks[:, 1], one)
+    blocked = (one | two) if los.graze == 'either' else (one & two)
+    result = numpy.bincount(owner[blocked], minlength=len(a)) == 0
+    return result.reshape(len(shooters), len(targets))
+
+
+@functools.lru_cache(maxsize=4096)
+def _line_steps(dq, dr, parity):
+    '''los.line_offsets() as (steps, 2, 2) array.'''
+    return numpy.array(line_offsets(dq, dr, parity), dtype=numpy.int64).reshape(-1, 2, 2)
+
+
+class HexArray:
+    '''Fixed length array of hexes stored as parallel x, y integer arrays.
+
+    Operations are done on the whole array at once, see Hex for their
+    meanings.  Indexing with an integer returns a Hex (of hexclass), indexing
+    with a slice or mask returns a HexArray.
+    '''
+    __slots__ = ('x', 'y', 'hexclass')
+
+    def __init__(self, x=(), y=(), hexclass=Hex):
+        self.x = numpy.asarray(x, dtype=numpy.int64)
+        self.y = numpy.asarray(y, dtype=numpy.int64)
+        if self.x.shape != self.y.shape:
+            raise ValueError('x and y shapes differ %s != %s.' % (self.x.shape, self.y.shape))
+        self.hexclass = hexclass
+
+    @classmethod
+    def from_hexes(cls, hexes, hexclass=None):
+        '''HexArray from sequence of Hex instances (or anything with x, y).'''
+        hexes = list(hexes)
+        if hexclass is None:
+            hexclass = hexes[0].__class__ if hexes else Hex
+        x = numpy.fromiter((h.x for h in hexes), dtype=numpy.int64, count=len(hexes))
+        y = numpy.fromiter((h.y for h in hexes), dtype=numpy.int64, count=len(hexes))
+        return cls(x, y, hexclass)
+
+    @classmethod
+    def from_values(cls, values, hexclass=Hex):
+        '''HexArray from string/int hex values, see Hex.parse_many().  When all
+        are strings of same even length without signs, digits are converted
+        as one array.
+        '''
+        values = values if isinstance(values, list) else list(values)
+        if values and all(v.__class__ is str for v in values):
+            text = numpy.array(values)
+            length = text.dtype.itemsize // 4
+            if length and not length & 1 and (numpy.char.str_len(text) == length).all():
+                digits = text.view(numpy.uint32).reshape(len(values), length).astype(numpy.int64) - ord('0')
+                if ((digits >= 0) & (digits <= 9)).all():
+                    powers = 10 ** numpy.arange(length // 2 - 1, -1, -1, dtype=numpy.int64)
+                    return cls(digits[:, :length // 2] @ powers, digits[:, length // 2:] @ powers, hexclass)
+        x, y = hexclass.parse_many(values)
+        return cls(numpy.frombuffer(x, dtype=numpy.int64), numpy.frombuffer(y, dtype=numpy.int64), hexclass)
+
+    def to_hexes(self):
+        '''List of hexclass instances.  BoundedHex raises OffMapError as usual.'''
+        return [self.hexclass(x, y) for x, y in zip(self.x.tolist(), self.y.tolist())]
+
+    def on_map(self):
+        '''Boolean mask of hexes within BoundedHex bounds, all True for Hex.'''
+        klas = self.hexclass
+        if not hasattr(klas, 'xmin'):
+            return numpy.ones(self.x.shape, dtype=bool)
+        return (self.x >= klas.xmin) & (self.x <= klas.xmax) & (self.y >= klas.ymin) & (self.y <= klas.ymax)
+
+    @property
+    def value(self):
+        '''List of string values.'''
+        return self.hexclass.format_many(zip(self.x.tolist(), self.y.tolist()))
+
+    def __len__(self):
+        return len(self.x)
+
+    def __iter__(self):
+        return iter(self.to_hexes())
+
+    def __getitem__(self, idx):
+        if isinstance(idx, (int, numpy.integer)):
+            return self.hexclass(int(self.x[idx]), int(self.y[idx]))
+        return self.__class__(self.x[idx], self.y[idx], self.hexclass)
+
+    def __eq__(self, other):
+        if not isinstance(other, HexArray):
+            return NotImplemented
+        return numpy.array_equal(self.x, other.x) and numpy.array_equal(self.y, other.y)
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, self.value)
+
+    def _xy(self, other):
+        # Other as broadcastable x, y.
+        if isinstance(other, HexArray):
+            return other.x, other.y
+        return int(other[0]), int(other[1])
+
+    def __add__(self, other):
+        '''HexArray + HexArray, Hex or any two item sequence.'''
+        x, y = self._xy(other)
+        return self.__class__(self.x + x, self.y + y, self.hexclass)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        '''HexArray - HexArray, Hex or any two item sequence.'''
+        x, y = self._xy(other)
+        return self.__class__(self.x - x, self.y - y, self.hexclass)
+
+    def __rsub__(self, other):
+        x, y = self._xy(other)
+        return self.__class__(x - self.x, y - self.y, self.hexclass)
+
+    def distance_to(self, to_hex):
+        '''
+        :param to_hex: Hex or HexArray (same length).
+        :return: int array of distances in hexes.
+        '''
+        x, y = self._xy(to_hex)
+        aq, ar, as_ = cube(self.x, self.y)
+        bq, br, bs = cube(numpy.asarray(x), numpy.asarray(y))
+        return numpy.maximum(numpy.maximum(abs(bq - aq), abs(br - ar)), abs(bs - as_))
+
+    def hex_in_direction(self, direction):
+        '''
+        :param direction: hexside 1-6, or int array of hexsides.
+        :return: HexArray.
+        '''
+        direction = numpy.asarray(direction)
+        if ((direction < 1) | (direction > 6)).any():
+            raise ValueError('Invalid direction %s.' % (direction, ))
+        steps = STEPS[self.x & 1, direction]
+        return self.__class__(self.x + steps[..., 0], self.y + steps[..., 1], self.hexclass)
+
+    def hexsides_to(self, to_hex):
+        '''Hexsides passed through on way to_hex, exact at any distance.
+        :param to_hex: Hex or HexArray (same length).
+        :return: (n, 2) int8 array, see hexsides().
+        '''
+        x, y = self._xy(to_hex)
+        aq, ar, as_ = cube(self.x, self.y)
+        bq, br, bs = cube(numpy.asarray(x), numpy.asarray(y))
+        return hexsides(bq - aq, br - ar, bs - as_)
+
+    @staticmethod
+    def hexsides_tuples(sides):
+        '''Convert hexsides_to() result into Hex.hexsides_to() style tuples.'''
+        result = list()
+        for first, second in sides.tolist():
+            if first == 0:
+                result.append((1, 2, 3, 4, 5, 6))
+            elif second == 0:
+                result.append((first, ))
+            else:
+                result.append((first, second))
+        return result
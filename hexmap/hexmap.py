@@ -0,0 +1,384 @@
+'''Per hex data.  HexMap is dense, for BoundedHex maps.  ChunkedHexMap is
+dense chunks allocated as written, for unbounded Hex maps.
+'''
+import array
+import collections
+import collections.abc
+import os
+
+from .hexagon import Hex, BoundedHex, OffMapError
+
+
+class HexMap:
+    '''Named layers of per hex values over one BoundedHex map.  Each layer
+    is a typed array.array, one item per map hex indexed by BoundedHex.index,
+    no Hex keys or per hex objects.
+
+        board = HexMap(Campaign, cost='d', woods='B', owner='b')
+        board[hex, 'cost'] = 2.5
+        board[hex]                              # {'cost': 2.5, 'woods': 0, 'owner': 0}
+        board[hex.sixpack(2), 'owner'] = 1      # sets, HexSets, any iterable of hexes
+        board.array('cost')[board.array('woods') == 1] = 3   # numpy view
+        finder = board.path_finder('cost')
+
+    Layers are plain arrays, board.layers[name][index], for code that
+    works on indexes.  Memory mapped layers of mapfile.load() are read only
+    memoryviews, writing them raises TypeError.
+    '''
+    def __init__(self, hexclass, **layers):
+        '''
+        :param hexclass: BoundedHex subclass, the map.
+        :param layers: name=typecode or name=(typecode, fill) of each layer,
+          typecodes as array.array.  fill default is 0.
+        '''
+        if not (isinstance(hexclass, type) and issubclass(hexclass, BoundedHex)):
+            raise TypeError('HexMap needs a BoundedHex class not %r.' % (hexclass, ))
+        self.hexclass = hexclass
+        self.cells = hexclass.cells()
+        self.width = hexclass.xmax - hexclass.xmin + 1
+        self.height = hexclass.ymax - hexclass.ymin + 1
+        self.layers = dict()
+        for name, typecode in layers.items():
+            if isinstance(typecode, str):
+                self.add_layer(name, typecode)
+            else:
+                self.add_layer(name, *typecode)
+
+    def add_layer(self, name, typecode='d', fill=0):
+        '''Add layer name, every hex set to fill.
+        :return: The layer's array.
+        '''
+        if name in self.layers:
+            raise ValueError('Layer %r already exists.' % (name, ))
+        layer = self.layers[name] = array.array(typecode, [fill]) * self.cells
+        return layer
+
+    def index(self, hex):
+        '''Map index of hex or any (x, y) pair.'''
+        if isinstance(hex, self.hexclass):
+            return hex.index
+        x, y = (hex.x, hex.y) if isinstance(hex, Hex) else (int(hex[0]), int(hex[1]))
+        klas = self.hexclass
+        if not (klas.xmin <= x <= klas.xmax and klas.ymin <= y <= klas.ymax):
+            raise OffMapError('(%s, %s) Out of bounds.' % (x, y))
+        return (y - klas.ymin) * self.width + x - klas.xmin
+
+    def indexes(self, hexes):
+        '''List of map indexes of hexes, HexSets of the map's class without
+        making hexes.
+        '''
+        from .hexset import HexSet
+        if isinstance(hexes, HexSet) and hexes.hexclass is self.hexclass:
+            return list(hexes.iter_index())
+        index = self.index
+        return [index(h) for h in hexes]
+
+    def _split(self, key):
+        if isinstance(key, tuple) and len(key) == 2 and isinstance(key[1], str):
+            hexes, name = key
+            if name not in self.layers:
+                raise KeyError(name)
+            return hexes, name
+        return key, None
+
+    def __getitem__(self, key):
+        '''board[hex] dict of every layer's value.  board[hex, name] value.
+        board[hexes, name] list of values, in hexes' order.  hex is a Hex or
+        (x, y) pair, but with a layer name only a Hex, pairs are hexes.
+        '''
+        hexes, name = self._split(key)
+        if name is None:
+            i = self.index(hexes)
+            return dict((name, layer[i]) for name, layer in self.layers.items())
+        layer = self.layers[name]
+        if isinstance(hexes, Hex):
+            return layer[self.index(hexes)]
+        return [layer[i] for i in self.indexes(hexes)]
+
+    def __setitem__(self, key, value):
+        '''board[hex] = mapping of layer values.  board[hex, name] = value.
+        board[hexes, name] = value, or sequence of values in hexes' order.
+        '''
+        hexes, name = self._split(key)
+        if name is None:
+            i = self.index(hexes)
+            layers = [(self._writable(name), v) for name, v in value.items()]
+            for layer, v in layers:
+                layer[i] = v
+            return
+        layer = self._writable(name)
+        if isinstance(hexes, Hex):
+            layer[self.index(hexes)] = value
+            return
+        indexes = self.indexes(hexes)
+        if isinstance(value, collections.abc.Iterable):
+            value = list(value)
+            if len(value) != len(indexes):
+                raise ValueError('Need %i values, one per hex, not %i.' % (len(indexes), len(value)))
+            for i, v in zip(indexes, value):
+                layer[i] = v
+        else:
+            for i in indexes:
+                layer[i] = value
+
+    def fill(self, name, value):
+        '''Set every hex of layer name to value.'''
+        layer = self._writable(name)
+        layer[:] = array.array(_typecode(layer), [value]) * self.cells
+
+    def _writable(self, name):
+        if name not in self.layers:
+            raise KeyError(name)
+        layer = self.layers[name]
+        if isinstance(layer, memoryview) and layer.readonly:
+            raise TypeError('Layer %r is read only, memory mapped by mapfile.load().' % (name, ))
+        return layer
+
+    def array(self, name):
+        '''numpy view of layer name, (height, width) array indexed [row, column],
+        row major like BoundedHex.index.  Shares memory with the layer, writes
+        show up in it, read only for memory mapped layers.  Needs numpy.
+        '''
+        import numpy
+        layer = self.layers[name]
+        return numpy.frombuffer(layer, dtype=_typecode(layer)).reshape(self.height, self.width)
+
+    def path_finder(self, name, **kwargs):
+        '''pathfinding.PathFinder with costs from layer name, negative is
+        impassable.  Costs are copied, later layer changes need set_cost().
+        :param kwargs: other PathFinder arguments.
+        '''
+        from .pathfinding import PathFinder
+        return PathFinder(self.hexclass, self.layers[name], **kwargs)
+
+    def line_of_sight(self, name, **kwargs):
+        '''los.LineOfSight with blocking from layer name, non zero blocks.
+        Copied, later layer changes need set_blocking().
+        :param kwargs: other LineOfSight arguments.
+        '''
+        from .los import LineOfSight
+        return LineOfSight(self.hexclass, self.layers[name], **kwargs)
+
+
+class ChunkedHexMap:
+    '''Named layers of per hex values over an unbounded Hex map, stored in
+    square chunks of chunk_size by chunk_size hexes.  A chunk is allocated,
+    each layer a typed array.array, the first time a hex in it is written.
+    Hexes never written read as their layer's fill value.
+
+        world = ChunkedHexMap(cost=('d', 1), explored='B', max_chunks=256, store=ChunkDirectory('world'))
+        world[hex, 'explored'] = 1
+        world[hex]                              # {'cost': 1.0, 'explored': 1}
+
+    With max_chunks, least recently used chunks past that many are written
+    to store and dropped from memory, read back on next use.  Store is any
+    mutable mapping of chunk key to bytes, a dict or a ChunkDirectory.
+    '''
+    def __init__(self, hexclass=Hex, chunk_size=64, max_chunks=None, store=None, **layers):
+        '''
+        :param hexclass: Hex class made when iterating hexes.
+        :param chunk_size: chunk width and height, power of two.
+        :param max_chunks: most chunks kept in memory, default no limit.
+        :param store: mapping evicted chunks are saved in, needed with
+          max_chunks.
+        :param layers: name=typecode or name=(typecode, fill) of each layer,
+          typecodes as array.array.  fill default is 0.
+        '''
+        if chunk_size < 1 or chunk_size & (chunk_size - 1):
+            raise ValueError('chunk_size must be a power of two, not %r.' % (chunk_size, ))
+        if max_chunks is not None and store is None:
+            raise ValueError('max_chunks needs a store to evict chunks to.')
+        if not layers:
+            raise ValueError('Need at least one layer.')
+        self.hexclass = hexclass
+        self.chunk_size = chunk_size
+        self._shift = chunk_size.bit_length() - 1
+        self._mask = chunk_size - 1
+        self.max_chunks = max_chunks
+        self.store = store
+        self.fills = dict()
+        self.typecodes = dict()
+        for name, typecode in layers.items():
+            typecode, fill = (typecode, 0) if isinstance(typecode, str) else typecode
+            self.typecodes[name] = typecode
+            self.fills[name] = array.array(typecode, [fill])[0]
+        self._chunks = collections.OrderedDict()  # key -> {name: array}, least recently used first.
+        self.loads = 0  # Chunks read back from store.
+        self.evictions = 0  # Chunks written to store and dropped.
+
+    def key(self, hex):
+        '''Key (x, y) of the chunk hex is in, chunk's first hex is key * chunk_size.'''
+        x, y = (hex.x, hex.y) if isinstance(hex, Hex) else (int(hex[0]), int(hex[1]))
+        return (x >> self._shift, y >> self._shift)
+
+    def _locate(self, hex):
+        x, y = (hex.x, hex.y) if isinstance(hex, Hex) else (int(hex[0]), int(hex[1]))
+        shift, mask = self._shift, self._mask
+        return (x >> shift, y >> shift), ((y & mask) << shift) | (x & mask)
+
+    def _chunk(self, key, create):
+        '''Layers of chunk key, from memory, store, or new if create.
+        None if chunk doesn't exist and not create.
+        '''
+        chunks = self._chunks
+        chunk = chunks.get(key)
+        if chunk is not None:
+            if self.max_chunks is not None:
+                chunks.move_to_end(key)
+            return chunk
+        data = self.store.get(key) if self.store is not None else None
+        if data is not None:
+            chunk = self.unpack_chunk(data)
+            self.loads += 1
+        elif create:
+            cells = self.chunk_size * self.chunk_size
+            chunk = dict((name, array.array(self.typecodes[name], [fill]) * cells) for name, fill in self.fills.items())
+        else:
+            return None
+        chunks[key] = chunk
+        if self.max_chunks is not None:
+            while len(chunks) > self.max_chunks:
+                self.evict(next(iter(chunks)))
+        return chunk
+
+    def __getitem__(self, key):
+        '''world[hex] dict of every layer's value.  world[hex, name] value.'''
+        if isinstance(key, tuple) and len(key) == 2 and isinstance(key[1], str):
+            hex, name = key
+            if name not in self.fills:
+                raise KeyError(name)
+            key, offset = self._locate(hex)
+            chunk = self._chunk(key, False)
+            return self.fills[name] if chunk is None else chunk[name][offset]
+        key, offset = self._locate(key)
+        chunk = self._chunk(key, False)
+        if chunk is None:
+            return dict(self.fills)
+        return dict((name, layer[offset]) for name, layer in chunk.items())
+
+    def __setitem__(self, key, value):
+        '''world[hex] = mapping of layer values.  world[hex, name] = value.'''
+        if isinstance(key, tuple) and len(key) == 2 and isinstance(key[1], str):
+            hex, name = key
+            value = {name: value}
+        else:
+            hex = key
+        for name in value:
+            if name not in self.fills:
+                raise KeyError(name)
+        key, offset = self._locate(hex)
+        chunk = self._chunk(key, True)
+        for name, v in value.items():
+            chunk[name][offset] = v
+
+    def __len__(self):
+        '''Number of chunks, in memory and in store.'''
+        return len(self.chunk_keys())
+
+    def chunk_keys(self):
+        '''Set of keys of all chunks, in memory and in store.'''
+        keys = set(self._chunks)
+        if self.store is not None:
+            keys.update(self.store.keys())
+        return keys
+
+    def resident(self):
+        '''Keys of chunks in memory, least recently used first.'''
+        return list(self._chunks)
+
+    def iter_chunks(self):
+        '''Generator of (key, {name: array}) of every chunk.  Stored chunks
+        are loaded, and evicted as usual, so change a chunk's arrays before
+        moving to the next.  Array offset of hex (x, y) is
+        (y % chunk_size) * chunk_size + x % chunk_size.
+        '''
+        for key in sorted(self.chunk_keys()):
+            yield key, self._chunk(key, False)
+
+    def chunk_hexes(self, key):
+        '''Generator of the chunk's hexes, in array offset order.'''
+        size, make = self.chunk_size, self.hexclass._maker(checked=False)
+        x0, y0 = key[0] * size, key[1] * size
+        for y in range(y0, y0 + size):
+            for x in range(x0, x0 + size):
+                yield make(x, y)
+
+    def evict(self, key):
+        '''Write chunk key to store and drop it from memory.'''
+        if self.store is None:
+            raise ValueError('No store to evict chunk %s to.' % (key, ))
+        self.store[key] = self.pack_chunk(self._chunks.pop(key))
+        self.evictions += 1
+
+    def discard(self, key):
+        '''Drop chunk key from memory and store, its hexes read as fill again.'''
+        self._chunks.pop(key, None)
+        if self.store is not None and key in self.store:
+            del self.store[key]
+
+    def flush(self):
+        '''Write every chunk in memory to store, keeping them in memory.'''
+        for key, chunk in self._chunks.items():
+            self.store[key] = self.pack_chunk(chunk)
+
+    def pack_chunk(self, chunk):
+        '''Bytes of chunk's layers, in layer order, machine byte order.'''
+        return b''.join(chunk[name].tobytes() for name in self.fills)
+
+    def unpack_chunk(self, data):
+        '''Chunk layers from pack_chunk() bytes.'''
+        cells = self.chunk_size * self.chunk_size
+        chunk = dict()
+        start = 0
+        for name, typecode in self.typecodes.items():
+            layer = chunk[name] = array.array(typecode)
+            end = start + cells * layer.itemsize
+            layer.frombytes(data[start:end])
+            start = end
+        if start != len(data):
+            raise ValueError('Chunk is %i bytes, layers need %i.' % (len(data), start))
+        return chunk
+
+
+class ChunkDirectory(collections.abc.MutableMapping):
+    '''ChunkedHexMap store, one file per chunk in a directory.'''
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key):
+        return os.path.join(self.path, '%i_%i.chunk' % key)
+
+    def __getitem__(self, key):
+        try:
+            with open(self._file(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            raise KeyError(key)
+
+    def __setitem__(self, key, data):
+        # Write whole file then rename, a crash never leaves half a chunk.
+        name = self._file(key)
+        with open(name + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(name + '.tmp', name)
+
+    def __delitem__(self, key):
+        try:
+            os.remove(self._file(key))
+        except FileNotFoundError:
+            raise KeyError(key)
+
+    def __iter__(self):
+        for name in os.listdir(self.path):
+            if name.endswith('.chunk'):
+                x, y = name[:-len('.chunk')].split('_')
+                yield (int(x), int(y))
+
+    def __len__(self):
+        return sum(1 for key in self)
+
+
+def _typecode(layer):
+    # Layers of memory mapped files are memoryviews, see mapfile.load().
+    return layer.typecode if isinstance(layer, array.array) else layer.format
@@ -0,0 +1,224 @@
+'''Compact sets of hexes.'''
+import collections.abc
+
+from .hexagon import Hex, BoundedHex, OffMapError
+
+
+class HexSet(collections.abc.MutableSet):
+    '''Set of hexes, all of one hexclass, stored without Hex instances.
+
+     - BoundedHex classes are a bitmap, one bit per map hex, see
+       BoundedHex.index.
+     - Unbounded Hex classes are a set of packed integer keys, see Hex.pack().
+       Adding a hex whose y doesn't fit in a key raises ValueError.
+
+    Members can be added/tested as Hex instances or (x, y) pairs.  Iterating
+    makes hexclass instances.  Set algebra between HexSets of same hexclass
+    works directly on the bitmaps/keys.
+    '''
+    __slots__ = ('hexclass', '_bits', '_len', '_keys')
+
+    def __init__(self, hexes=(), hexclass=Hex):
+        self.hexclass = hexclass
+        if issubclass(hexclass, BoundedHex):
+            self._bits = bytearray((hexclass.cells() + 7) // 8)
+            self._len = 0
+            self._keys = None
+        else:
+            self._bits = None
+            self._keys = set()
+        for h in hexes:
+            self.add(h)
+
+    @classmethod
+    def from_xy(cls, xys, hexclass=Hex):
+        '''HexSet from iterable of (x, y) pairs.'''
+        self = cls(hexclass=hexclass)
+        if self._bits is None:
+            pack = hexclass.pack
+            self._keys.update(pack(x, y) for x, y in xys)
+        else:
+            for x, y in xys:
+                self._add(x, y)
+        return self
+
+    def _from_iterable(self, hexes):
+        # Used by Set mixin methods.
+        return self.__class__(hexes, self.hexclass)
+
+    def _from_bits(self, bits):
+        result = self.__class__(hexclass=self.hexclass)
+        result._bits[:] = bits.to_bytes(len(self._bits), 'little')
+        result._len = bin(bits).count('1')
+        return result
+
+    def _same(self, other):
+        return isinstance(other, HexSet) and other.hexclass is self.hexclass
+
+    def _index(self, x, y):
+        klas = self.hexclass
+        if x < klas.xmin or x > klas.xmax or y < klas.ymin or y > klas.ymax:
+            return None
+        return (y - klas.ymin) * (klas.xmax - klas.xmin + 1) + x - klas.xmin
+
+    @staticmethod
+    def _coords(h):
+        if isinstance(h, Hex):
+            return h.x, h.y
+        return int(h[0]), int(h[1])
+
+    def _add(self, x, y):
+        i = self._index(x, y)
+        if i is None:
+            raise OffMapError('(%s, %s) Out of bounds.' % (x, y))
+        mask = 1 << (i & 7)
+        if not self._bits[i >> 3] & mask:
+            self._bits[i >> 3] |= mask
+            self._len += 1
+
+    def add(self, h):
+        x, y = self._coords(h)
+        if self._bits is None:
+            self._keys.add(self.hexclass.pack(x, y))
+        else:
+            self._add(x, y)
+
+    def discard(self, h):
+        x, y = self._coords(h)
+        if self._bits is None:
+            try:
+                self._keys.discard(self.hexclass.pack(x, y))
+            except ValueError:
+                pass  # Can't pack, can't be a member.
+            return
+        i = self._index(x, y)
+        if i is not None:
+            mask = 1 << (i & 7)
+            if self._bits[i >> 3] & mask:
+                self._bits[i >> 3] &= ~mask
+                self._len -= 1
+
+    def __contains__(self, h):
+        try:
+            x, y = self._coords(h)
+            if self._bits is None:
+                return self.hexclass.pack(x, y) in self._keys
+        except (TypeError, ValueError, IndexError):
+            return False
+        i = self._index(x, y)
+        return i is not None and bool(self._bits[i >> 3] & (1 << (i & 7)))
+
+    def __len__(self):
+        if self._bits is None:
+            return len(self._keys)
+        return self._len
+
+    def iter_xy(self):
+        '''Generator of member (x, y) pairs, without making hexes.'''
+        if self._bits is None:
+            unpack = self.hexclass.unpack
+            for key in self._keys:
+                yield unpack(key)
+            return
+        klas = self.hexclass
+        width = klas.xmax - klas.xmin + 1
+        for index in self.iter_index():
+            y, x = divmod(index, width)
+            yield x + klas.xmin, y + klas.ymin
+
+    def iter_index(self):
+        '''Generator of member BoundedHex.index values, in index order.'''
+        if self._bits is None:
+            raise TypeError('%s has no index, not a BoundedHex class.' % (self.hexclass.__name__, ))
+        for byte, bits in enumerate(self._bits):
+            while bits:
+                low = bits & -bits
+                yield (byte << 3) + low.bit_length() - 1
+                bits ^= low
+
+    def __iter__(self):
+        klas = self.hexclass
+        for x, y in self.iter_xy():
+            yield klas(x, y)
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, sorted(h.value for h in self))
+
+    def copy(self):
+        result = self.__class__(hexclass=self.hexclass)
+        if self._bits is None:
+            result._keys = set(self._keys)
+        else:
+            result._bits[:] = self._bits
+            result._len = self._len
+        return result
+
+    def clear(self):
+        if self._bits is None:
+            self._keys.clear()
+        else:
+            self._bits[:] = bytes(len(self._bits))
+            self._len = 0
+
+    def _binary(self, other, keys_op, bits_op, fallback):
+        if not self._same(other):
+            return fallback(self, other)
+        if self._bits is None:
+            result = self.__class__(hexclass=self.hexclass)
+            result._keys = keys_op(self._keys, other._keys)
+            return result
+        return self._from_bits(bits_op(int.from_bytes(self._bits, 'little'), int.from_bytes(other._bits, 'little')))
+
+    def __or__(self, other):
+        return self._binary(other, set.__or__, int.__or__, collections.abc.Set.__or__)
+
+    def __and__(self, other):
+        return self._binary(other, set.__and__, int.__and__, collections.abc.Set.__and__)
+
+    def __sub__(self, other):
+        return self._binary(other, set.__sub__, lambda a, b: a & ~b, collections.abc.Set.__sub__)
+
+    def __xor__(self, other):
+        return self._binary(other, set.__xor__, int.__xor__, collections.abc.Set.__xor__)
+
+    __ror__ = __or__
+    __rand__ = __and__
+    __rxor__ = __xor__
+
+    def _inplace(self, other, op):
+        result = op(self, other)
+        if self._bits is None:
+            self._keys = result._keys
+        else:
+            self._bits[:] = result._bits
+            self._len = result._len
+        return self
+
+    def __ior__(self, other):
+        if not self._same(other):
+            return super().__ior__(other)
+        return self._inplace(other, HexSet.__or__)
+
+    def __iand__(self, other):
+        if not self._same(other):
+            return super().__iand__(other)
+        return self._inplace(other, HexSet.__and__)
+
+    def __isub__(self, other):
+        if not self._same(other):
+            return super().__isub__(other)
+        return self._inplace(other, HexSet.__sub__)
+
+    def __ixor__(self, other):
+        if not self._same(other):
+            return super().__ixor__(other)
+        return self._inplace(other, HexSet.__xor__)
+
+    def __eq__(self, other):
+        if self._same(other):
+            if self._bits is None:
+                return self._keys == other._keys
+            return self._bits == other._bits
+        return super().__eq__(other)
+
+    __hash__ = None
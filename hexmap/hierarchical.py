@@ -0,0 +1,310 @@
+'''Hierarchical path finding, HPA*, for large BoundedHex maps.
+
+Map is cut into square clusters of hexes.  Where passable hexes face each
+other across a cluster border an entrance is made, a pair of abstract nodes
+one on each side.  Cheapest paths between nodes of the same cluster are
+precomputed.  Long queries search the small abstract graph of nodes, then
+refine each abstract step into hexes with a search confined to one cluster.
+
+Paths are near optimal, not exact.  Queries shorter than a couple of
+clusters are handed to an exact pathfinding.PathFinder, where the abstract
+graph's detours would show most.
+'''
+import array
+import heapq
+
+from .hexagon import BoundedHex
+from .pathfinding import PathFinder
+
+INFINITY = float('inf')
+
+
+class HierarchicalPathFinder:
+    '''HPA* over one BoundedHex map.
+
+        finder = HierarchicalPathFinder(Campaign, costs)
+        path = finder.find(start, end)
+        finder.update_cost(bridge, -1)  # only bridge's clusters rebuilt
+
+    Costs are cost to enter each hex, indexed by BoundedHex.index, negative is
+    impassable.  Same model as pathfinding.PathFinder.  update_cost() only
+    marks the hex's cluster dirty, dirty clusters are rebuilt on next query.
+    '''
+    def __init__(self, hexclass, costs=None, cluster_size=16, near=None):
+        '''
+        :param hexclass: BoundedHex subclass, the map.
+        :param costs: sequence of cost to enter each map hex, negative is
+          impassable.  Default is 1 everywhere.
+        :param cluster_size: cluster width and height in hexes.
+        :param near: queries this many hexes or less apart are searched
+          exactly, default is twice cluster_size.
+        '''
+        if not (isinstance(hexclass, type) and issubclass(hexclass, BoundedHex)):
+            raise TypeError('HierarchicalPathFinder needs a BoundedHex class not %r.' % (hexclass, ))
+        self.finder = finder = PathFinder(hexclass, costs)
+        self.hexclass = hexclass
+        self.cells = finder.cells
+        self.width = finder.width
+        self.height = hexclass.ymax - hexclass.ymin + 1
+        self.neighbors = finder.neighbors
+        self.costs = finder.costs
+        self.regions = finder.regions()
+        self.cluster_size = cluster_size
+        self.near = 2 * cluster_size if near is None else near
+        self.cluster_columns = -(-self.width // cluster_size)
+        self.clusters = self.cluster_columns * -(-self.height // cluster_size)
+        width, columns = self.width, self.cluster_columns
+        self.cluster_of = array.array('i', ((i // width // cluster_size) * columns + i % width // cluster_size for i in range(self.cells)))
+        # (cluster, cluster) -> list of (index, index) transitions, lower cluster first.
+        self._transitions = dict()
+        # cluster -> {node: {node: cost}} cheapest paths inside cluster.
+        self._intra = dict()
+        self._graph = None
+        self._dirty = set(range(self.clusters))
+        self.expanded = 0  # Abstract nodes expanded by last query.
+        self.refined = 0  # Hexes expanded refining last query.
+        self.rebuilds = 0  # Clusters rebuilt, ever.
+
+    def hex(self, index):
+        '''Map hex at index.'''
+        return self.finder.hex(index)
+
+    def update_cost(self, hex, cost):
+        '''Change cost to enter hex, negative is impassable.'''
+        self.finder.set_cost(hex, cost)
+        self._dirty.add(self.cluster_of[hex.index])
+
+    def _cluster_neighbors(self, cluster):
+        columns = self.cluster_columns
+        row, col = divmod(cluster, columns)
+        for dr, dc in ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)):
+            r, c = row + dr, col + dc
+            if 0 <= c < columns and 0 <= r * columns < self.clusters:
+                yield r * columns + c
+
+    def _members(self, cluster):
+        size, width = self.cluster_size, self.width
+        row, col = divmod(cluster, self.cluster_columns)
+        for y in range(row * size, min(self.height, (row + 1) * size)):
+            for x in range(col * size, min(width, (col + 1) * size)):
+                yield y * width + x
+
+    def _find_transitions(self, a, b):
+        '''Transitions across border of clusters a < b.'''
+        cluster_of, neighbors, costs = self.cluster_of, self.neighbors, self.costs
+        crossings = list()
+        for i in self._members(a):
+            if costs[i] < 0:
+                continue
+            for n in neighbors[i * 6:i * 6 + 6]:
+                if n >= 0 and cluster_of[n] == b and costs[n] >= 0:
+                    crossings.append((i, n))
+        # Runs of crossings whose hexes touch, on both sides, are one entrance,
+        # use middle one.  Run is connected within each cluster so nothing is
+        # lost by dropping the rest.
+        transitions = list()
+        run = list()
+        touch = lambda a, b: a == b or a in neighbors[b * 6:b * 6 + 6]
+        for crossing in crossings:
+            if run and not (touch(crossing[0], run[-1][0]) and touch(crossing[1], run[-1][1])):
+                transitions.append(run[len(run) // 2])
+                run = list()
+            run.append(crossing)
+        if run:
+            transitions.append(run[len(run) // 2])
+        return transitions
+
+    def _search(self, sources, cluster, reverse=False, goals=None):
+        '''Dijkstra confined to cluster.
+        :param sources: {index: starting cost}.
+        :param reverse: costs are from each hex to sources, not sources to.
+        :param goals: set of indexes, stop once all are settled.
+        :return: (cost dict, parent dict).
+        '''
+        cluster_of, neighbors, costs = self.cluster_of, self.neighbors, self.costs
+        best = dict(sources)
+        parent = dict((s, -1) for s in sources)
+        heap = [(c, s) for s, c in sources.items()]
+        heapq.heapify(heap)
+        remaining = set(goals) if goals else None
+        done = set()
+        while heap:
+            base, current = heapq.heappop(heap)
+            if current in done:
+                continue
+            done.add(current)
+            if remaining is not None:
+                remaining.discard(current)
+                if not remaining:
+                    break
+            step = costs[current]
+            if reverse and step < 0:
+                continue
+            for n in neighbors[current * 6:current * 6 + 6]:
+                if n < 0 or cluster_of[n] != cluster or n in done:
+                    continue
+                cost = base + (step if reverse else costs[n])
+                if not reverse and costs[n] < 0:
+                    continue
+                if cost < best.get(n, INFINITY):
+                    best[n] = cost
+                    parent[n] = current
+                    heapq.heappush(heap, (cost, n))
+        self.refined += len(done)
+        return best, parent
+
+    def _nodes(self, cluster):
+        nodes = set()
+        for neighbor in self._cluster_neighbors(cluster):
+            pair = (cluster, neighbor) if cluster < neighbor else (neighbor, cluster)
+            for a, b in self._transitions.get(pair, ()):
+                nodes.add(a if self.cluster_of[a] == cluster else b)
+        return nodes
+
+    def _rebuild(self):
+        '''Rebuild entrances and intra cluster paths of dirty clusters.'''
+        if not self._dirty:
+            return
+        affected = set(self._dirty)
+        for cluster in self._dirty:
+            for neighbor in self._cluster_neighbors(cluster):
+                pair = (cluster, neighbor) if cluster < neighbor else (neighbor, cluster)
+                self._transitions[pair] = self._find_transitions(*pair)
+                affected.add(neighbor)
+        costs = self.costs
+        for cluster in affected:
+            intra = self._intra[cluster] = dict()
+            nodes = sorted(self._nodes(cluster))
+            for node in nodes:
+                intra[node] = dict()
+            # Reversed path costs the same less the hex left plus the hex
+            # entered, so one search covers both directions of each pair.
+            for i, node in enumerate(nodes[:-1]):
+                later = nodes[i + 1:]
+                best, parent = self._search({node: 0.0}, cluster, goals=later)
+                for other in later:
+                    if other in best:
+                        intra[node][other] = best[other]
+                        intra[other][node] = best[other] - costs[other] + costs[node]
+        self.rebuilds += len(affected)
+        self._dirty.clear()
+        # Whole abstract graph, intra cluster plus transition edges.
+        graph = self._graph = dict()
+        for intra in self._intra.values():
+            for node, edges in intra.items():
+                graph.setdefault(node, dict()).update(edges)
+        for transitions in self._transitions.values():
+            for a, b in transitions:
+                graph.setdefault(a, dict())[b] = costs[b]
+                graph.setdefault(b, dict())[a] = costs[a]
+
+    def abstract_path(self, start, goal):
+        '''Waypoints, start, entrance hexes, goal, of cheapest abstract path.
+        :return: (list of indexes, cost), ([], None) if no path.
+        '''
+        self._rebuild()
+        self.refined = 0
+        s, t = start.index, goal.index
+        if s == t:
+            return [s], 0.0
+        if not self.regions.can_reach(s, t):
+            self.expanded = 0
+            return [], None
+        cluster_of, q, r, min_cost = self.cluster_of, self.finder._q, self.finder._r, self.finder.min_cost
+        ct = cluster_of[t]
+        # Temporary edges, start out to nodes, nodes in goal's cluster in to goal.
+        start_edges = dict()
+        for cluster, sources in self._origins(s).items():
+            from_start, _ = self._search(sources, cluster)
+            for n in self._nodes(cluster) | set([t]):
+                if n in from_start and n != s and from_start[n] < start_edges.get(n, INFINITY):
+                    start_edges[n] = from_start[n]
+        to_goal, _ = self._search({t: 0.0}, ct, reverse=True)
+        graph = self._graph
+        gq, gr = q[t], r[t]
+        best = {s: 0.0}
+        parent = {s: -1}
+        heap = [(0.0, s)]
+        done = set()
+        while heap:
+            f, current = heapq.heappop(heap)
+            if current in done:
+                continue
+            done.add(current)
+            if current == t:
+                break
+            edges = dict(graph.get(current, ()))
+            if current == s:
+                edges.update(start_edges)
+            if cluster_of[current] == ct and current in to_goal:
+                edges[t] = min(edges.get(t, INFINITY), to_goal[current])
+            base = best[current]
+            for n, cost in edges.items():
+                cost += base
+                if n not in done and cost < best.get(n, INFINITY):
+                    best[n] = cost
+                    parent[n] = current
+                    dq, dr = q[n] - gq, r[n] - gr
+                    heapq.heappush(heap, (cost + max(abs(dq), abs(dr), abs(dq + dr)) * min_cost, n))
+        self.expanded = len(done)
+        if t not in done:
+            return [], None
+        path = [t]
+        while parent[path[-1]] >= 0:
+            path.append(parent[path[-1]])
+        path.reverse()
+        return path, best[t]
+
+    def iter_path(self, start, goal):
+        '''Generator of hexes start to goal, refining one abstract step at a
+        time, so a unit can start moving before the whole path is known.
+        Yields nothing if no path.
+        '''
+        if start.distance_to(goal) <= self.near:
+            self.expanded = self.refined = 0
+            for i in self.finder.search(start.index, goal.index)[0]:
+                yield self.hex(i)
+            return
+        waypoints, cost = self.abstract_path(start, goal)
+        if not waypoints:
+            return
+        yield self.hex(waypoints[0])
+        for a, b in zip(waypoints, waypoints[1:]):
+            for i in self._refine(a, b)[1:]:
+                yield self.hex(i)
+
+    def find(self, start, goal):
+        '''Near cheapest path from start to goal.
+        :return: List of hexes, start to goal inclusive.  Empty if no path.
+        '''
+        return list(self.iter_path(start, goal))
+
+    def _origins(self, index):
+        '''Search sources leaving hex, {cluster: {index: cost}}.  Passable hex
+        is its own source, impassable start leaves straight to its neighbors.
+        '''
+        costs = self.costs
+        if costs[index] >= 0:
+            return {self.cluster_of[index]: {index: 0.0}}
+        origins = dict()
+        for n in self.neighbors[index * 6:index * 6 + 6]:
+            if n >= 0 and costs[n] >= 0:
+                origins.setdefault(self.cluster_of[n], dict())[n] = costs[n]
+        return origins
+
+    def _refine(self, a, b):
+        '''Indexes a to b, abstract edge is within b's cluster once a is left.'''
+        cluster = self.cluster_of[b]
+        if self.cluster_of[a] == cluster and self.costs[a] >= 0:
+            sources = {a: 0.0}
+        else:
+            costs = self.costs
+            sources = dict((n, costs[n]) for n in self.neighbors[a * 6:a * 6 + 6] if n >= 0 and self.cluster_of[n] == cluster and costs[n] >= 0)
+        best, parent = self._search(sources, cluster, goals=(b, ))
+        path = [b]
+        while parent[path[-1]] >= 0:
+            path.append(parent[path[-1]])
+        if path[-1] != a:
+            path.append(a)
+        path.reverse()
+        return path
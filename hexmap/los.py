@@ -0,0 +1,290 @@
+'''Line of sight over BoundedHex maps with blocking terrain.
+
+Line between two hex centers is Hex.line_to(), it is blocked by any hex
+along it that blocks, except the two end hexes themselves.  Where the line
+runs exactly along a hexside it is blocked only when both hexes beside it
+block, or, graze='either', when either does.
+
+Field of view casts shadows ring by ring out from the viewer instead of
+tracing a line to each hex, the same rules decide what is shadowed.
+'''
+import bisect
+import collections
+import fractions
+import functools
+
+from .hexagon import BoundedHex, CUBE_DIRECTIONS, line_template
+
+GRAZE_RULES = ('both', 'either')
+
+
+class LineOfSight:
+    '''Visibility between hexes of one BoundedHex map.
+
+        los = LineOfSight(Map, [terrain[i] in ('woods', 'town') for i in range(Map.cells())])
+        los.visible(shooter, target)
+        los.check([(s, t) for s in shooters for t in targets])
+
+    Lines are line_offsets(), cached per cube delta and column parity,
+    shared by every pair of hexes the same distance and direction apart.  Results are cached per
+    pair of hexes until blocking changes, up to max_pairs, so checking every
+    shooter against every target each turn only traces new pairs.
+    See hexarray.visibility_matrix() for the numpy version of matrix().
+
+    field_of_view() is every hex visible from one hex, in one sweep out from
+    it, same answer as visible() to each.  side_view() combines them.
+    '''
+    def __init__(self, hexclass, blocking=None, graze='both', max_pairs=65536, max_views=256):
+        '''
+        :param hexclass: BoundedHex subclass, the map.
+        :param blocking: sequence of true/false per map hex index, true
+          blocks sight.  Default is nothing blocks.
+        :param graze: 'both' or 'either' hex beside a hexside the line runs
+          along must block to block it.
+        :param max_pairs: most pair results kept, least recently used
+          dropped first.
+        :param max_views: most field_of_view() results kept, same.
+        '''
+        if not (isinstance(hexclass, type) and issubclass(hexclass, BoundedHex)):
+            raise TypeError('LineOfSight needs a BoundedHex class not %r.' % (hexclass, ))
+        if graze not in GRAZE_RULES:
+            raise ValueError('Unknown graze rule %r, use one of %s.' % (graze, ', '.join(GRAZE_RULES)))
+        self.hexclass = hexclass
+        self.cells = hexclass.cells()
+        self.width = hexclass.xmax - hexclass.xmin + 1
+        self.height = hexclass.ymax - hexclass.ymin + 1
+        if blocking is None:
+            self.blocking = bytearray(self.cells)
+        else:
+            if len(blocking) != self.cells:
+                raise ValueError('Need %s blocking values, one per map hex, not %s.' % (self.cells, len(blocking)))
+            self.blocking = bytearray(1 if b else 0 for b in blocking)
+        self.graze = graze
+        self.max_pairs = max_pairs
+        self.max_views = max_views
+        self._seen = collections.OrderedDict()  # (index, index), lower first -> visible.
+        self._views = collections.OrderedDict()  # (index, radius) -> field_of_view() bitmask.
+
+    def set_blocking(self, hex, blocks):
+        '''Change whether hex blocks sight, forgets cached results.'''
+        blocks = 1 if blocks else 0
+        if self.blocking[hex.index] != blocks:
+            self.blocking[hex.index] = blocks
+            self.clear()
+
+    def clear(self):
+        '''Forget cached results, call after changing blocking directly.'''
+        self._seen.clear()
+        self._views.clear()
+
+    def visible(self, a, b):
+        '''True if nothing blocks sight between hex a and hex b.'''
+        return self._visible(a.index, b.index)
+
+    def check(self, pairs):
+        '''List of visible() for each (a, b) hex pair.'''
+        visible = self._visible
+        return [visible(a.index, b.index) for a, b in pairs]
+
+    def matrix(self, shooters, targets):
+        '''List of rows, visible() of each shooter to each target.'''
+        visible = self._visible
+        targets = [t.index for t in targets]
+        return [[visible(s, t) for t in targets] for s in (s.index for s in shooters)]
+
+    def field_of_view(self, hex, radius, hexset=False):
+        '''Hexes within radius visible from hex, hex included.
+        :param hexset: return a HexSet instead of a set.
+        '''
+        bits = self._view(hex.index, radius)
+        if hexset:
+            return self._hexset(bits)
+        return set(self._hexset(bits))
+
+    def side_view(self, hexes, radius):
+        '''HexSet of hexes within radius visible from any of hexes, all a
+        side's units at once.  Units sharing a hex are swept once, unmoved
+        units' views are cached, up to max_views, until blocking changes.
+        '''
+        bits = 0
+        for index in set(h.index for h in hexes):
+            bits |= self._view(index, radius)
+        return self._hexset(bits)
+
+    def _hexset(self, bits):
+        from .hexset import HexSet
+        return HexSet(hexclass=self.hexclass)._from_bits(bits)
+
+    def _view(self, origin, radius):
+        '''field_of_view() as bitmask of indexes, cached.'''
+        key = (origin, radius)
+        views = self._views
+        bits = views.get(key)
+        if bits is None:
+            bits = views[key] = self._sweep(origin, radius)
+            if len(views) > self.max_views:
+                views.popitem(last=False)
+        else:
+            views.move_to_end(key)
+        return bits
+
+    def _sweep(self, origin, radius):
+        '''Shadow casting, ring by ring out from origin.  Angles are ranks,
+        see fov_template().  Blocking hexes shadow the open interval of
+        angles they cover, which only hexes on farther rings fall in (lines
+        only pass hexes on nearer rings).  Lines along a hexside are shadowed
+        at one angle, by the graze rule.
+        '''
+        blocking, width, height = self.blocking, self.width, self.height
+        either = self.graze == 'either'
+        ox, oy = origin % width, origin // width
+        starts, ends = list(), list()  # Disjoint shadow intervals, sorted.
+        points = set()
+        bits = 1 << origin
+        for ring in fov_template(radius, (ox + self.hexclass.xmin) & 1):
+            casts = list()
+            for dx, dy, angle, turned, low, high, edges in ring:
+                x, y = ox + dx, oy + dy
+                if not (0 <= x < width and 0 <= y < height):
+                    continue
+                index = y * width + x
+                if not (angle in points or _shadowed(starts, ends, angle) or _shadowed(starts, ends, turned)):
+                    bits |= 1 << index
+                if blocking[index]:
+                    casts.append((low, high, x, y, edges))
+            for low, high, x, y, edges in casts:
+                _shadow(starts, ends, low, high)
+                for angle, pdx, pdy in edges:
+                    px, py = ox + pdx, oy + pdy
+                    # Off map hex beside a hexside stands in for this one.
+                    if either or not (0 <= px < width and 0 <= py < height) or blocking[py * width + px]:
+                        points.add(angle)
+        return bits
+
+    def _key(self, a, b):
+        '''(cube dq, cube dr, column parity of a) of map indexes a to b.'''
+        width, xmin = self.width, self.hexclass.xmin
+        ax, bx = a % width + xmin, b % width + xmin
+        dq = bx - ax
+        dr = b // width - ((bx + (bx & 1)) >> 1) - a // width + ((ax + (ax & 1)) >> 1)
+        return dq, dr, ax & 1
+
+    def _visible(self, a, b):
+        key = (a, b) if a < b else (b, a)
+        cache = self._seen
+        seen = cache.get(key)
+        if seen is None:
+            seen = cache[key] = self._trace(*key)
+            if len(cache) > self.max_pairs:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(key)
+        return seen
+
+    def _trace(self, a, b):
+        blocking, width, height = self.blocking, self.width, self.height
+        ax, ay = a % width, a // width
+        either = self.graze == 'either'
+        for (dx1, dy1), (dx2, dy2) in line_offsets(*self._key(a, b)):
+            x1, y1, x2, y2 = ax + dx1, ay + dy1, ax + dx2, ay + dy2
+            first = 0 <= x1 < width and 0 <= y1 < height
+            second = 0 <= x2 < width and 0 <= y2 < height
+            # Off map hexes only ever appear beside a hexside, there is
+            # just the one on map hex there.
+            first = blocking[y1 * width + x1] if first else blocking[y2 * width + x2]
+            second = blocking[y2 * width + x2] if second else first
+            if (first or second) if either else (first and second):
+                return False
+        return True
+
+
+@functools.lru_cache(maxsize=4096)
+def line_offsets(dq, dr, parity):
+    '''Steps strictly between ends of line from a hex of column parity to
+    cube delta dq, dr from it.  Each is the two hexes beside a hexside line
+    runs along, or one hex twice, as ((dx, dy), (dx, dy)) offset from start.
+    LRU cached, see line_offsets.cache_info().
+    '''
+    # Template is cube offsets, dy from them only depends on parity.
+    xy = lambda q, r: (q, r + ((parity + q + ((parity + q) & 1)) >> 1) - parity)
+    return tuple((xy(*step[0]), xy(*step[-1])) for step in line_template(dq, dr)[1:-1])
+
+
+def _shadowed(starts, ends, angle):
+    i = bisect.bisect_left(starts, angle) - 1
+    return i >= 0 and angle < ends[i]
+
+
+def _shadow(starts, ends, low, high):
+    '''Add open interval low, high to disjoint sorted intervals.  Intervals
+    that only share an end stay apart, angle between them isn't shadowed.
+    '''
+    first = bisect.bisect_left(ends, low + 1)
+    last = bisect.bisect_left(starts, high)
+    if first < last:
+        low = min(low, starts[first])
+        high = max(high, ends[last - 1])
+    starts[first:last] = [low]
+    ends[first:last] = [high]
+
+
+def _angle(q, r):
+    '''Direction of cube q, r as exact position around a hex ring, 0 <= angle
+    < 6, 0 is hexside 1, clockwise.  Orders directions same as true angle.
+    '''
+    for side in range(1, 7):
+        q1, r1 = CUBE_DIRECTIONS[side]
+        q2, r2 = CUBE_DIRECTIONS[side % 6 + 1]
+        # q, r = a * side's direction + b * next side's, a and b >= 0 in
+        # the sector between them.  Determinant is always 1.
+        a = q * r2 - q2 * r
+        b = q1 * r - q * r1
+        if a > 0 and b >= 0:
+            return side - 1 + fractions.Fraction(b, a + b)
+
+
+@functools.lru_cache(maxsize=64)
+def fov_template(radius, parity):
+    '''Rings 1 to radius out from origin column parity, for field of view.
+    Each hex is (dx, dy, angle, angle + 6, low, high, edges).  Angles are
+    integer ranks of _angle() of all of template's angles, so comparable.
+    low, high are angles of hex's extreme corners, high + 6 if they wrap
+    past 0.  edges are hexsides lying along a line from origin, as (angle,
+    dx, dy) of hex across them.
+    '''
+    # Everything scaled by 3 so corners are integer, corner between hexside
+    # i and i + 1 is at direction i + direction i + 1.
+    corners = [(CUBE_DIRECTIONS[i][0] + CUBE_DIRECTIONS[i % 6 + 1][0], CUBE_DIRECTIONS[i][1] + CUBE_DIRECTIONS[i % 6 + 1][1]) for i in range(1, 7)]
+    xy = lambda q, r: (q, r + ((parity + q + ((parity + q) & 1)) >> 1) - parity)
+    rings = list()
+    for distance in range(1, radius + 1):
+        ring = list()
+        q, r = CUBE_DIRECTIONS[5][0] * distance, CUBE_DIRECTIONS[5][1] * distance
+        for side in range(1, 7):
+            for step in range(distance):
+                points = [(3 * q + cq, 3 * r + cr) for cq, cr in corners]
+                angles = [_angle(*p) for p in points]
+                low, high = min(angles), max(angles)
+                if high - low > 3:
+                    low, high = min(a for a in angles if a > 3), max(a for a in angles if a < 3) + 6
+                edges = list()
+                # Hexside i lies between corners i - 1 and i.
+                for i in range(1, 7):
+                    (aq, ar), (bq, br) = points[i - 2], points[i - 1]
+                    if aq * br - ar * bq == 0:
+                        eq, er = CUBE_DIRECTIONS[i]
+                        edges.append((angles[i - 1], ) + xy(q + eq, r + er))
+                angle = _angle(q, r)
+                ring.append(xy(q, r) + (angle, angle + 6, low, high, tuple(edges)))
+                q, r = q + CUBE_DIRECTIONS[side][0], r + CUBE_DIRECTIONS[side][1]
+        rings.append(ring)
+    ranks = set()
+    for ring in rings:
+        for hex in ring:
+            ranks.update(hex[2:6])
+            ranks.update(edge[0] for edge in hex[6])
+    ranks = dict((angle, rank) for rank, angle in enumerate(sorted(ranks)))
+    return tuple(
+            tuple((dx, dy, ranks[a], ranks[t], ranks[low], ranks[high], tuple((ranks[e], ex, ey) for e, ex, ey in edges))
+                  for dx, dy, a, t, low, high, edges in ring)
+            for ring in rings)
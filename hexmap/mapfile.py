@@ -0,0 +1,158 @@
+'''Binary files of HexMap layers, and converting text hex lists to them.
+
+File is a header then each layer's raw array, so loading is a memory map,
+no parsing.  Header, all little endian:
+
+  - 8 bytes b'HEXMAP\0\0', magic.
+  - uint16 format version, VERSION.
+  - uint8 byte order of layer data, 0 little, 1 big.
+  - uint8 Hex.digits of map's class.
+  - int32 xmin, xmax, ymin, ymax map bounds.
+  - uint16 number of layers.
+  - per layer, uint16 name length, utf-8 name, typecode byte, uint8 item
+    size, uint64 offset of layer's data from start of file.
+
+Layer data is one item per map hex in BoundedHex.index order, each layer
+starts on a 16 byte boundary.
+'''
+import array
+import mmap as _mmap
+import struct
+import sys
+
+from .hexmap import HexMap, _typecode
+
+MAGIC = b'HEXMAP\0\0'
+VERSION = 1
+HEADER = struct.Struct('<8sHBBiiiiH')
+LAYER = struct.Struct('<cBQ')
+ALIGN = 16
+
+
+def save(board, path):
+    '''Write HexMap board to file at path.'''
+    klas = board.hexclass
+    names = list(board.layers)
+    header = bytearray(HEADER.pack(MAGIC, VERSION, sys.byteorder == 'big', klas.digits, klas.xmin, klas.xmax, klas.ymin, klas.ymax, len(names)))
+    # Offsets depend on header size, which doesn't depend on offsets.
+    size = len(header) + sum(2 + len(name.encode('utf-8')) + LAYER.size for name in names)
+    offsets = list()
+    for name in names:
+        size += -size % ALIGN
+        offsets.append(size)
+        size += len(board.layers[name]) * board.layers[name].itemsize
+    for name, offset in zip(names, offsets):
+        encoded = name.encode('utf-8')
+        layer = board.layers[name]
+        header += struct.pack('<H', len(encoded)) + encoded + LAYER.pack(_typecode(layer).encode('ascii'), layer.itemsize, offset)
+    with open(path, 'wb') as f:
+        f.write(header)
+        for name, offset in zip(names, offsets):
+            f.write(bytes(offset - f.tell()))
+            f.write(memoryview(board.layers[name]).cast('B'))
+
+
+def load(path, hexclass, mmap=True):
+    '''HexMap from file at path.
+    :param hexclass: BoundedHex subclass, must have file's bounds and
+      digits.  Not made from the file, a class made at load time can't be
+      pickled, to batch_paths() workers say.
+    :param mmap: layers are read only memoryviews of the memory mapped file,
+      paged in as used.  False reads them into array.arrays.  Files in other
+      byte order are always read and swapped.
+    :return: HexMap.
+    '''
+    with open(path, 'rb') as f:
+        data = _mmap.mmap(f.fileno(), 0, access=_mmap.ACCESS_READ) if mmap else f.read()
+    try:
+        magic, version, big, digits, xmin, xmax, ymin, ymax, count = HEADER.unpack_from(data)
+    except struct.error:
+        raise ValueError('%s is not a hex map file.' % (path, ))
+    if magic != MAGIC:
+        raise ValueError('%s is not a hex map file.' % (path, ))
+    if version > VERSION:
+        raise ValueError('%s is version %i, newer than supported %i.' % (path, version, VERSION))
+    if (hexclass.xmin, hexclass.xmax, hexclass.ymin, hexclass.ymax) != (xmin, xmax, ymin, ymax):
+        raise ValueError('%s bounds %s are not %s bounds.' % (path, (xmin, xmax, ymin, ymax), hexclass.__name__))
+    if hexclass.digits != digits:
+        raise ValueError('%s digits %i are not %s digits %i.' % (path, digits, hexclass.__name__, hexclass.digits))
+    board = HexMap(hexclass)
+    swap = big != (sys.byteorder == 'big')
+    position = HEADER.size
+    view = memoryview(data)
+    for i in range(count):
+        length, = struct.unpack_from('<H', data, position)
+        name = bytes(data[position + 2:position + 2 + length]).decode('utf-8')
+        typecode, itemsize, offset = LAYER.unpack_from(data, position + 2 + length)
+        position += 2 + length + LAYER.size
+        typecode = typecode.decode('ascii')
+        if array.array(typecode).itemsize != itemsize:
+            raise ValueError('%s layer %s items are %i bytes, %r is %i here.' % (path, name, itemsize, typecode, array.array(typecode).itemsize))
+        raw = view[offset:offset + board.cells * itemsize]
+        if len(raw) != board.cells * itemsize:
+            raise ValueError('%s layer %s is truncated.' % (path, name))
+        if mmap and not swap:
+            board.layers[name] = raw.cast(typecode)
+        else:
+            layer = board.layers[name] = array.array(typecode)
+            layer.frombytes(raw)
+            if swap:
+                layer.byteswap()
+    return board
+
+
+def from_text(lines, hexclass, **layers):
+    '''HexMap from text lines, each a hex's string value then its value in
+    each layer, whitespace separated.
+
+        board = from_text(f, Campaign, cost='d', terrain=('B', 0, TERRAIN.index))
+
+        0142 2.5 woods
+        0143 1   clear
+
+    Blank lines and lines starting with # are skipped, hexes not listed keep
+    their layer's fill.
+    :param lines: iterable of str, an open text file.
+    :param hexclass: BoundedHex subclass, the map.
+    :param layers: name=typecode or name=(typecode, fill) like HexMap, or
+      name=(typecode, fill, convert), convert is callable(str) -> value.
+      Default convert is int, float for 'f' and 'd'.
+    :return: HexMap.
+    '''
+    converts = list()
+    typecodes = dict()
+    for name, spec in layers.items():
+        if isinstance(spec, str):
+            spec = (spec, )
+        typecode = spec[0]
+        typecodes[name] = spec[:2]
+        converts.append(spec[2] if len(spec) > 2 else (float if typecode in 'fd' else int))
+    board = HexMap(hexclass, **typecodes)
+    columns = [board.layers[name] for name in layers]
+    width, xmin, xmax, ymin, ymax = board.width, hexclass.xmin, hexclass.xmax, hexclass.ymin, hexclass.ymax
+    split = hexclass.split
+    for number, line in enumerate(lines, 1):
+        fields = line.split()
+        if not fields or fields[0].startswith('#'):
+            continue
+        if len(fields) != len(columns) + 1:
+            raise ValueError('Line %i has %i fields, need hex and %i values.' % (number, len(fields), len(columns)))
+        value = fields[0]
+        half = len(value) >> 1
+        if '-' in value or len(value) & 1:
+            x, y = split(value)
+            x, y = int(x), int(y)
+        else:
+            x, y = int(value[:half]), int(value[half:])
+        if not (xmin <= x <= xmax and ymin <= y <= ymax):
+            raise ValueError('Line %i hex %s is off map.' % (number, value))
+        index = (y - ymin) * width + x - xmin
+        for column, convert, field in zip(columns, converts, fields[1:]):
+            column[index] = convert(field)
+    return board
+
+
+def convert(text_path, path, hexclass, **layers):
+    '''Text hex list file at text_path, see from_text(), to map file at path.'''
+    with open(text_path) as f:
+        save(from_text(f, hexclass, **layers), path)
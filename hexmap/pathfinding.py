@@ -0,0 +1,1015 @@
+'''Path finding over BoundedHex maps.
+
+Searches work on map indexes (BoundedHex.index) and the class's
+neighbor_table(), hexes are only made for the returned path and for cost
+callbacks.  Movement cost is the cost to *enter* a hex, either from a per hex
+costs sequence (negative is impassable) or a cost(from_hex, to_hex) callback
+(None is impassable).
+'''
+import array
+import collections
+import heapq
+import multiprocessing
+import os
+
+from .hexagon import BoundedHex, CUBE_DIRECTIONS
+
+INFINITY = float('inf')
+
+# Search strategies.  astar, A* with cube distance heuristic.  bidirectional,
+# A* from both ends meeting in the middle, fewer expansions when the goal is
+# walled in.  jump, jump point search, uniform cost maps only, expands a
+# fraction of the hexes A* does once its table is built.
+STRATEGIES = ('astar', 'bidirectional', 'jump')
+
+
+class PathFinder:
+    '''A* search over one BoundedHex map.
+
+    Keeps per map bookkeeping arrays between searches, so each search only
+    touches the hexes it expands.  Not thread safe, use one per thread.
+
+    Ties are broken on fewest estimated steps to go, then lowest index, so
+    results don't depend on neighbor or insertion order.
+
+    Search strategy, see STRATEGIES, is picked per PathFinder or per search.
+    All find the same cheapest cost, paths may differ between equal cost
+    alternatives.
+    '''
+    def __init__(self, hexclass, costs=None, cost=None, passable=None, min_cost=1, strategy='astar'):
+        '''
+        :param hexclass: BoundedHex subclass, the map.
+        :param costs: sequence of cost to enter each map hex, indexed by
+          BoundedHex.index, negative is impassable.  Default is 1 everywhere.
+        :param cost: callable(from_hex, to_hex) cost to enter to_hex, None is
+          impassable.  Used instead of costs.
+        :param passable: callable(hex) False for impassable hexes, checked in
+          addition to costs/cost.
+        :param min_cost: lowest cost callback will return, keeps A*
+          heuristic admissible.  Worked out from costs when given.
+        :param strategy: default search strategy, one of STRATEGIES.
+        '''
+        if strategy not in STRATEGIES:
+            raise ValueError('Unknown strategy %r, not one of %s.' % (strategy, ', '.join(STRATEGIES)))
+        if not (isinstance(hexclass, type) and issubclass(hexclass, BoundedHex)):
+            raise TypeError('PathFinder needs a BoundedHex class not %r.' % (hexclass, ))
+        self.hexclass = hexclass
+        self.cells = hexclass.cells()
+        self.width = hexclass.xmax - hexclass.xmin + 1
+        self.neighbors = hexclass.neighbor_table()
+        self.cost = cost
+        self.passable = passable
+        if cost is None:
+            if costs is None:
+                costs = array.array('d', [1.0]) * self.cells
+            elif len(costs) != self.cells:
+                raise ValueError('Need %i costs, one per map hex, not %i.' % (self.cells, len(costs)))
+            self.costs = array.array('d', costs)
+            passable_costs = [c for c in self.costs if c >= 0]
+            min_cost = min(passable_costs) if passable_costs else 0
+        else:
+            self.costs = None
+        self.min_cost = min_cost
+        # Cube coordinates of each index, for the heuristic.
+        xmin, ymin, width = hexclass.xmin, hexclass.ymin, self.width
+        self._q = array.array('i', (i % width + xmin for i in range(self.cells)))
+        self._r = array.array('i', (i // width + ymin - ((q + (q & 1)) >> 1) for i, q in enumerate(self._q)))
+        # Search bookkeeping, entry only valid if its stamp is current search.
+        self._g = array.array('d', [INFINITY]) * self.cells
+        self._parent = array.array('i', [-1]) * self.cells
+        self._stamp = array.array('I', [0]) * self.cells
+        self._closed = array.array('I', [0]) * self.cells
+        self._search_id = 0
+        self._back = None  # Bidirectional's backward bookkeeping.
+        self._uniform = None  # Jump's cached tables, see _jump_table().
+        self.strategy = strategy
+        self.expanded = 0  # Hexes expanded by last search.
+        self.searches = 0
+        self.total_expanded = 0
+        self.version = 0  # Bumped on every cost change.
+        self._fields = dict()
+        self._regions = None
+
+    def hex(self, index):
+        '''Map hex at index.'''
+        return self.hexclass._unchecked(index % self.width + self.hexclass.xmin, index // self.width + self.hexclass.ymin)
+
+    def set_cost(self, hex, cost):
+        '''Change cost to enter hex, negative is impassable.'''
+        if self.costs is None:
+            raise TypeError('PathFinder uses cost callback, not costs.')
+        self.costs[hex.index] = cost
+        if 0 <= cost < self.min_cost:
+            self.min_cost = cost
+        self.version += 1
+        self._fields.clear()
+        if self._regions is not None:
+            self._regions.update(hex.index)
+
+    def changed(self):
+        '''Note costs (or what callbacks return) changed, drops cached
+        flow fields and regions.'''
+        self.version += 1
+        self._fields.clear()
+        self._regions = None
+
+    def regions(self):
+        '''Regions of this map, built on first call.  From then on searches
+        between regions are rejected without expanding anything, and
+        set_cost() keeps regions up to date.
+        '''
+        if self._regions is None:
+            self._regions = Regions(self)
+        return self._regions
+
+    def step_cost(self, frm, to):
+        '''Cost to enter index to from index frm, None if impassable.'''
+        if self.costs is None:
+            to_hex = self.hex(to)
+            if self.passable is not None and not self.passable(to_hex):
+                return None
+            return self.cost(self.hex(frm), to_hex)
+        cost = self.costs[to]
+        if cost < 0:
+            return None
+        if self.passable is not None and not self.passable(self.hex(to)):
+            return None
+        return cost
+
+    def distance(self, a, b):
+        '''Distance in hexes between indexes a and b.'''
+        dq = self._q[b] - self._q[a]
+        dr = self._r[b] - self._r[a]
+        return max(abs(dq), abs(dr), abs(dq + dr))
+
+    def find(self, start, end, maxsteps=None, strategy=None):
+        '''Cheapest path from start to end.
+        :param maxsteps: give up after expanding this many hexes.
+        :param strategy: one of STRATEGIES, default is self.strategy.
+        :return: List of hexes, start to end inclusive.  Empty if no path.
+        '''
+        return self.route(start, end, maxsteps, strategy)[0]
+
+    def route(self, start, end, maxsteps=None, strategy=None):
+        '''Same as find() but returns (path, cost), cost None if no path.'''
+        indexes, cost = self.search(start.index, end.index, maxsteps, strategy)
+        return [self.hex(i) for i in indexes], cost
+
+    def search(self, start, goal, maxsteps=None, strategy=None):
+        '''Search on indexes.
+        :return: (list of indexes start to goal, cost), ([], None) if no path.
+        '''
+        strategy = strategy or self.strategy
+        if self._regions is not None and not self._regions.can_reach(start, goal):
+            result, expanded = ([], None), 0
+        elif strategy == 'astar':
+            result, expanded = self._astar(start, goal, maxsteps)
+        elif strategy == 'bidirectional':
+            result, expanded = self._bidirectional(start, goal, maxsteps)
+        elif strategy == 'jump':
+            result, expanded = self._jump(start, goal, maxsteps)
+        else:
+            raise ValueError('Unknown strategy %r, not one of %s.' % (strategy, ', '.join(STRATEGIES)))
+        self.expanded = expanded
+        self.searches += 1
+        self.total_expanded += expanded
+        return result
+
+    def _astar(self, start, goal, maxsteps):
+        self._search_id += 1
+        search_id = self._search_id
+        g, parent, stamp, closed = self._g, self._parent, self._stamp, self._closed
+        neighbors, q, r = self.neighbors, self._q, self._r
+        costs, passable, step_cost = self.costs, self.passable, self.step_cost
+        min_cost = self.min_cost
+        gq, gr = q[goal], r[goal]
+        expanded = 0
+        g[start] = 0.0
+        parent[start] = -1
+        stamp[start] = search_id
+        dq, dr = q[start] - gq, r[start] - gr
+        h = max(abs(dq), abs(dr), abs(dq + dr))
+        heap = [(h * min_cost, h, start)]
+        result = ([], None)
+        while heap:
+            f, h, current = heapq.heappop(heap)
+            if closed[current] == search_id:
+                continue
+            if current == goal:
+                result = (self._retrace(goal), g[goal])
+                break
+            if maxsteps is not None and expanded >= maxsteps:
+                break
+            closed[current] = search_id
+            expanded += 1
+            base = g[current]
+            i = current * 6
+            for n in neighbors[i:i + 6]:
+                if n < 0 or closed[n] == search_id:
+                    continue
+                if costs is not None and passable is None:
+                    step = costs[n]
+                    if step < 0:
+                        continue
+                else:
+                    step = step_cost(current, n)
+                    if step is None:
+                        continue
+                cost = base + step
+                if stamp[n] == search_id and g[n] <= cost:
+                    continue
+                stamp[n] = search_id
+                g[n] = cost
+                parent[n] = current
+                dq, dr = q[n] - gq, r[n] - gr
+                h = max(abs(dq), abs(dr), abs(dq + dr))
+                heapq.heappush(heap, (cost + h * min_cost, h, n))
+        return result, expanded
+
+    def _bidirectional(self, start, goal, maxsteps):
+        # A* forward from start and backward from goal, alternating on the
+        # smaller frontier.  Cheapest meeting cost found is final once it is
+        # no more than either frontier's lowest f, both f are lower bounds.
+        if start == goal:
+            return ([start], 0.0), 0
+        self._search_id += 1
+        search_id = self._search_id
+        if self._back is None:
+            self._back = (array.array('d', [INFINITY]) * self.cells, array.array('i', [-1]) * self.cells,
+                          array.array('I', [0]) * self.cells, array.array('I', [0]) * self.cells)
+        g, parent, stamp, closed = self._g, self._parent, self._stamp, self._closed
+        g_back, parent_back, stamp_back, closed_back = self._back
+        neighbors, q, r = self.neighbors, self._q, self._r
+        costs, passable, step_cost = self.costs, self.passable, self.step_cost
+        fast = costs is not None and passable is None
+        min_cost = self.min_cost
+        for index, gs, parents, stamps in ((start, g, parent, stamp), (goal, g_back, parent_back, stamp_back)):
+            gs[index] = 0.0
+            parents[index] = -1
+            stamps[index] = search_id
+        h = self.distance(start, goal)
+        forward = [(h * min_cost, h, start)]
+        backward = [(h * min_cost, h, goal)]
+        best, meet = INFINITY, -1
+        expanded = 0
+        proven = True
+        while forward and backward:
+            if best <= max(forward[0][0], backward[0][0]):
+                break
+            if maxsteps is not None and expanded >= maxsteps:
+                proven = False
+                break
+            if len(forward) <= len(backward):
+                f, h, current = heapq.heappop(forward)
+                if closed[current] == search_id:
+                    continue
+                closed[current] = search_id
+                expanded += 1
+                base = g[current]
+                gq, gr = q[goal], r[goal]
+                i = current * 6
+                for n in neighbors[i:i + 6]:
+                    if n < 0 or closed[n] == search_id:
+                        continue
+                    if fast:
+                        step = costs[n]
+                        if step < 0:
+                            continue
+                    else:
+                        step = step_cost(current, n)
+                        if step is None:
+                            continue
+                    cost = base + step
+                    if stamp[n] == search_id and g[n] <= cost:
+                        continue
+                    stamp[n] = search_id
+                    g[n] = cost
+                    parent[n] = current
+                    if stamp_back[n] == search_id and cost + g_back[n] < best:
+                        best, meet = cost + g_back[n], n
+                    dq, dr = q[n] - gq, r[n] - gr
+                    h = max(abs(dq), abs(dr), abs(dq + dr))
+                    heapq.heappush(forward, (cost + h * min_cost, h, n))
+            else:
+                f, h, current = heapq.heappop(backward)
+                if closed_back[current] == search_id:
+                    continue
+                closed_back[current] = search_id
+                expanded += 1
+                base = g_back[current]
+                if fast:
+                    step = costs[current]
+                    if step < 0:
+                        continue
+                sq, sr = q[start], r[start]
+                i = current * 6
+                for n in neighbors[i:i + 6]:
+                    if n < 0 or closed_back[n] == search_id:
+                        continue
+                    # Reverse edge, cost is n entering current.
+                    if not fast:
+                        step = step_cost(n, current)
+                        if step is None:
+                            continue
+                    cost = base + step
+                    if stamp_back[n] == search_id and g_back[n] <= cost:
+                        continue
+                    stamp_back[n] = search_id
+                    g_back[n] = cost
+                    parent_back[n] = current
+                    if stamp[n] == search_id and g[n] + cost < best:
+                        best, meet = g[n] + cost, n
+                    dq, dr = q[n] - sq, r[n] - sr
+                    h = max(abs(dq), abs(dr), abs(dq + dr))
+                    heapq.heappush(backward, (cost + h * min_cost, h, n))
+        if meet < 0 or not proven:
+            return ([], None), expanded
+        path = self._retrace(meet)
+        index = meet
+        while parent_back[index] >= 0:
+            index = parent_back[index]
+            path.append(index)
+        return (path, best), expanded
+
+    def _jump_table(self):
+        '''(uniform cost, jump point table, turned jump, turned clear), cached
+        until costs change.  Table byte index * 6 + hexside index is bit 1 if
+        hex is a jump point for a straight ray heading that way, bit 2 if for
+        a turned ray.  Turned jump is steps from index along hexside to first
+        turned ray jump point, 0 if blocked first.  Turned clear is steps
+        before blocked or map edge.
+        '''
+        if self._uniform is not None and self._uniform[0] == self.version:
+            return self._uniform[1:]
+        costs, neighbors = self.costs, self.neighbors
+        if costs is None or self.passable is not None:
+            raise ValueError('Jump strategy needs uniform costs, not callbacks.')
+        uniform = set(c for c in costs if c >= 0)
+        if len(uniform) > 1:
+            raise ValueError('Jump strategy needs uniform costs, not %s.' % (sorted(uniform), ))
+        cost = uniform.pop() if uniform else 1.0
+        table = bytearray(self.cells * 6)
+        for index in range(self.cells):
+            i = index * 6
+            around = [n < 0 or costs[n] < 0 for n in neighbors[i:i + 6]]
+            for side in range(6):
+                # Hex one side counterclockwise can't be reached the canonical
+                # way, through the blocked hex two sides counterclockwise.
+                if around[side - 2] and not around[side - 1]:
+                    table[i + side] = 3
+                # Turned rays also lose the hex one side clockwise.
+                elif around[(side + 2) % 6] and not around[(side + 1) % 6]:
+                    table[i + side] = 2
+        jump = array.array('i', [-1]) * (self.cells * 6)
+        clear = array.array('i', [0]) * (self.cells * 6)
+        for side in range(6):
+            for index in range(self.cells):
+                # Walk ray to a hex already done, then fill in backward.
+                chain = list()
+                while jump[index * 6 + side] < 0:
+                    n = neighbors[index * 6 + side]
+                    if n < 0 or costs[n] < 0:
+                        jump[index * 6 + side] = 0
+                        break
+                    chain.append(index)
+                    index = n
+                for index in reversed(chain):
+                    i = index * 6 + side
+                    j = neighbors[i] * 6 + side
+                    clear[i] = clear[j] + 1
+                    jump[i] = 1 if table[j] & 2 else (jump[j] + 1 if jump[j] else 0)
+        self._uniform = (self.version, cost, table, jump, clear)
+        return cost, table, jump, clear
+
+    def _jump(self, start, goal, maxsteps):
+        # Jump point search for uniform cost maps.  In open terrain every
+        # cheapest path can be reordered into straight along one hexside
+        # then straight along the next hexside clockwise.  So only those
+        # rays are followed, without queueing the hexes along them.  Rays
+        # stop at jump points, where a blocked hex beside the ray means a
+        # neighbor can only be reached the other way round, and at the goal.
+        # Jump points are expanded in all directions.  Straight ray also
+        # stops where its clockwise turn would find a jump point.
+        cost, table, turned_jump, turned_clear = self._jump_table()
+        costs, neighbors, q, r = self.costs, self.neighbors, self._q, self._r
+        gq, gr = q[goal], r[goal]
+        # State is hexside index * 2 + turned, ALL for every direction.
+        ALL = 12
+        g = {(start, ALL): 0}
+        parent = {(start, ALL): None}
+        h = self.distance(start, goal)
+        heap = [(h, h, start, ALL)]
+        closed = set()
+        expanded = 0
+        found = None
+        while heap:
+            f, h, current, state = heapq.heappop(heap)
+            key = (current, state)
+            if current in closed:
+                continue
+            if current == goal:
+                found = key
+                break
+            if maxsteps is not None and expanded >= maxsteps:
+                break
+            closed.add(current)
+            expanded += 1
+            if state == ALL:
+                rays = ((0, 0), (1, 0), (2, 0), (3, 0), (4, 0), (5, 0))
+            elif state & 1:
+                rays = ((state >> 1, 1), )
+            else:
+                rays = ((state >> 1, 0), (((state >> 1) + 1) % 6, 1))
+            base = g[key]
+            for side, turned in rays:
+                # Follow ray to a jump point.
+                mask = 2 if turned else 1
+                n, steps, jump = current, 0, False
+                while True:
+                    n = neighbors[n * 6 + side]
+                    if n < 0 or costs[n] < 0:
+                        n = -1
+                        break
+                    steps += 1
+                    if n == goal or table[n * 6 + side] & mask:
+                        jump = True
+                        break
+                    if not turned:
+                        # Would turn find a jump point, or the goal?
+                        i = n * 6 + (side + 1) % 6
+                        if turned_jump[i]:
+                            break
+                        dq, dr = gq - q[n], gr - r[n]
+                        k = max(abs(dq), abs(dr), abs(dq + dr))
+                        tq, tr = CUBE_DIRECTIONS[(side + 1) % 6 + 1]
+                        if 0 < k <= turned_clear[i] and dq == k * tq and dr == k * tr:
+                            break
+                if n < 0:
+                    continue
+                next_state = ALL if jump else side * 2 + turned
+                next_key = (n, next_state)
+                total = base + steps
+                if n in closed or g.get(next_key, INFINITY) <= total:
+                    continue
+                g[next_key] = total
+                parent[next_key] = (key, side)
+                dq, dr = q[n] - gq, r[n] - gr
+                h = max(abs(dq), abs(dr), abs(dq + dr))
+                heapq.heappush(heap, (total + h, h, n, next_state))
+        if found is None:
+            return ([], None), expanded
+        # Fill in straight runs between jump points.
+        path = list()
+        key = found
+        while parent[key] is not None:
+            (previous, side) = parent[key]
+            index = key[0]
+            while index != previous[0]:
+                path.append(index)
+                index = neighbors[index * 6 + (side + 3) % 6]
+            key = previous
+        path.append(start)
+        path.reverse()
+        return (path, g[found] * cost), expanded
+
+    def flood(self, start, budget=None):
+        '''Dijkstra flood fill from index start.
+        :param budget: most cost to spend, None for no limit.
+        :return: List of (index, cost, parent index) for every index reachable
+          within budget, in settled (non-decreasing cost) order.  First is
+          (start, 0, -1).
+        '''
+        self._search_id += 1
+        search_id = self._search_id
+        g, parent, stamp, closed = self._g, self._parent, self._stamp, self._closed
+        neighbors, costs, passable, step_cost = self.neighbors, self.costs, self.passable, self.step_cost
+        if budget is None:
+            budget = INFINITY
+        g[start] = 0.0
+        parent[start] = -1
+        stamp[start] = search_id
+        heap = [(0.0, start)]
+        reached = list()
+        while heap:
+            base, current = heapq.heappop(heap)
+            if closed[current] == search_id:
+                continue
+            closed[current] = search_id
+            reached.append((current, base, parent[current]))
+            i = current * 6
+            for n in neighbors[i:i + 6]:
+                if n < 0 or closed[n] == search_id:
+                    continue
+                if costs is not None and passable is None:
+                    step = costs[n]
+                    if step < 0:
+                        continue
+                else:
+                    step = step_cost(current, n)
+                    if step is None:
+                        continue
+                cost = base + step
+                if cost > budget or (stamp[n] == search_id and g[n] <= cost):
+                    continue
+                stamp[n] = search_id
+                g[n] = cost
+                parent[n] = current
+                heapq.heappush(heap, (cost, n))
+        self.expanded = len(reached)
+        self.searches += 1
+        self.total_expanded += len(reached)
+        return reached
+
+    def reachable(self, origin, budget=None):
+        '''Every hex reachable from origin spending at most budget.
+        :return: dict of {hex: (cost, predecessor hex)}, origin is (0, None).
+        '''
+        reached = self.flood(origin.index, budget)
+        hexes = dict((i, self.hex(i)) for i, cost, parent in reached)
+        return dict((hexes[i], (cost, hexes.get(parent))) for i, cost, parent in reached)
+
+    def batch_paths(self, queries, workers=None, chunksize=None, strategy=None):
+        '''Many independent searches, spread over worker processes.
+
+        Costs are copied once into shared memory, each worker makes its own
+        PathFinder from it.  Queries and results cross between processes as
+        indexes, in chunks.  Cost callbacks can't be shared, raises
+        TypeError.
+        :param queries: sequence of (start hex, end hex).
+        :param workers: number of processes, default os.cpu_count().  1 or
+          fewer searches here, in this process.
+        :param chunksize: queries sent to a worker at a time, default splits
+          queries into about four chunks per worker.
+        :param strategy: one of STRATEGIES, default is self.strategy.
+        :return: List of (path, cost), same order as queries, see route().
+        '''
+        if self.costs is None or self.passable is not None:
+            raise TypeError('batch_paths() needs PathFinder with costs only, no callbacks.')
+        strategy = strategy or self.strategy
+        pairs = [(start.index, end.index) for start, end in queries]
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers <= 1 or len(pairs) < 2:
+            results = [self.search(start, end, strategy=strategy) for start, end in pairs]
+        else:
+            if chunksize is None:
+                chunksize = max(1, -(-len(pairs) // (workers * 4)))
+            chunks = [pairs[i:i + chunksize] for i in range(0, len(pairs), chunksize)]
+            from multiprocessing import shared_memory
+            memory = shared_memory.SharedMemory(create=True, size=self.cells * self.costs.itemsize)
+            try:
+                memory.buf[:] = self.costs.tobytes()
+                init = (memory.name, self.hexclass, self.min_cost, strategy)
+                with multiprocessing.Pool(min(workers, len(chunks)), _batch_init, init) as pool:
+                    results = [result for chunk in pool.map(_batch_search, chunks) for result in chunk]
+            finally:
+                memory.close()
+                memory.unlink()
+        hexes = self.hex
+        return [([hexes(i) for i in indexes], cost) for indexes, cost in results]
+
+    def flow_field(self, goals):
+        '''FlowField toward nearest of goals.  Cached per set of goals until
+        costs change, see changed().
+        '''
+        key = frozenset(h.index for h in goals)
+        field = self._fields.get(key)
+        if field is None:
+            field = self._fields[key] = FlowField(self, key)
+        return field
+
+    def _retrace(self, index):
+        parent = self._parent
+        path = [index]
+        while parent[index] >= 0:
+            index = parent[index]
+            path.append(index)
+        path.reverse()
+        return path
+
+
+# Worker process state for PathFinder.batch_paths().
+_batch = dict()
+
+
+def _batch_init(name, hexclass, min_cost, strategy):
+    from multiprocessing import shared_memory
+    memory = shared_memory.SharedMemory(name=name)
+    costs = memory.buf.cast('d')
+    finder = PathFinder(hexclass, costs, strategy=strategy)
+    finder.min_cost = min_cost
+    costs.release()
+    memory.close()
+    _batch['finder'] = finder
+
+
+def _batch_search(pairs):
+    search = _batch['finder'].search
+    return [search(start, end) for start, end in pairs]
+
+
+class FlowField:
+    '''Cost to nearest goal, and hexside to head out of, for every map hex.
+    Built by one reverse Dijkstra from all goals, after that any unit's next
+    step is an array lookup.  See PathFinder.flow_field().
+
+    costs[index] is cost from index to nearest goal, INFINITY if no goal
+    reachable.  hexsides[index] is hexside 1-6 to step through, 0 at goals
+    and where no goal is reachable.  Impassable hexes get values too, for
+    units that start on them.
+    '''
+    def __init__(self, finder, goals):
+        '''
+        :param finder: PathFinder, map and costs.
+        :param goals: iterable of goal indexes.
+        '''
+        self.finder = finder
+        self.goals = frozenset(goals)
+        self.version = finder.version
+        cells, neighbors = finder.cells, finder.neighbors
+        costs, passable, step_cost = finder.costs, finder.passable, finder.step_cost
+        self.costs = cost_to = array.array('d', [INFINITY]) * cells
+        self.hexsides = hexsides = array.array('b', [0]) * cells
+        heap = list()
+        for goal in self.goals:
+            cost_to[goal] = 0.0
+            heap.append((0.0, goal))
+        heapq.heapify(heap)
+        done = bytearray(cells)
+        expanded = 0
+        while heap:
+            base, current = heapq.heappop(heap)
+            if done[current]:
+                continue
+            done[current] = 1
+            expanded += 1
+            i = current * 6
+            for side in range(6):
+                n = neighbors[i + side]
+                if n < 0 or done[n]:
+                    continue
+                # Reverse edge, cost is n entering current.
+                if costs is not None and passable is None:
+                    step = costs[current]
+                    if step < 0:
+                        continue
+                else:
+                    step = step_cost(n, current)
+                    if step is None:
+                        continue
+                cost = base + step
+                if cost < cost_to[n]:
+                    cost_to[n] = cost
+                    # n heads back out the opposite hexside.
+                    hexsides[n] = (side + 3) % 6 + 1
+                    heapq.heappush(heap, (cost, n))
+        self.expanded = expanded
+
+    def cost(self, hex):
+        '''Cost from hex to nearest goal, INFINITY if none reachable.'''
+        return self.costs[hex.index]
+
+    def next_hex(self, hex):
+        '''Hex to step to from hex, None at goal or if no goal reachable.'''
+        side = self.hexsides[hex.index]
+        if not side:
+            return None
+        return self.finder.hex(self.finder.neighbors[hex.index * 6 + side - 1])
+
+    def path(self, hex):
+        '''List of hexes from hex to nearest goal inclusive, empty if none
+        reachable.
+        '''
+        index = hex.index
+        if self.costs[index] == INFINITY:
+            return []
+        hexsides, neighbors = self.hexsides, self.finder.neighbors
+        path = [index]
+        while hexsides[index]:
+            index = neighbors[index * 6 + hexsides[index] - 1]
+            path.append(index)
+        return [self.finder.hex(i) for i in path]
+
+
+class Regions:
+    '''Connected regions of passable hexes, answers "is there any path" in
+    O(1).  See PathFinder.regions().
+
+    labels[index] is -1 for impassable hexes, otherwise a region label.  Two
+    hexes are connected if their labels have the same root, see label().
+    Opening a hex merges the regions around it by union, closing one only
+    searches when the hexes around it don't touch each other, and then only
+    as far as the smaller pieces.
+    '''
+    def __init__(self, finder):
+        '''
+        :param finder: PathFinder, map and costs.  Cost callbacks can't be
+          labeled, raises TypeError.
+        '''
+        if finder.costs is None or finder.passable is not None:
+            raise TypeError('Regions need PathFinder with costs only, no callbacks.')
+        self.finder = finder
+        costs, neighbors = finder.costs, finder.neighbors
+        self.labels = labels = array.array('i', [-1]) * finder.cells
+        # Union find parent of each label, label is a root if its own parent.
+        self._root = array.array('i')
+        for index in range(finder.cells):
+            if labels[index] >= 0 or costs[index] < 0:
+                continue
+            label = self._new_label()
+            labels[index] = label
+            queue = collections.deque((index, ))
+            while queue:
+                current = queue.popleft()
+                for n in neighbors[current * 6:current * 6 + 6]:
+                    if n >= 0 and labels[n] < 0 and costs[n] >= 0:
+                        labels[n] = label
+                        queue.append(n)
+
+    def _new_label(self):
+        label = len(self._root)
+        self._root.append(label)
+        return label
+
+    def _find(self, label):
+        root = self._root
+        while root[label] != label:
+            root[label] = root[root[label]]  # Path halving.
+            label = root[label]
+        return label
+
+    def label(self, hex):
+        '''Region label of hex, -1 if impassable.'''
+        label = self.labels[hex.index]
+        return label if label < 0 else self._find(label)
+
+    def connected(self, a, b):
+        '''True if hexes a and b are both passable and in same region.'''
+        return self.can_reach(a.index, b.index) and self.finder.costs[a.index] >= 0
+
+    def can_reach(self, start, goal):
+        '''False if there is certainly no path from index start to goal.
+        Impassable start can still step out to its neighbors.
+        '''
+        if start == goal:
+            return True
+        labels = self.labels
+        if labels[goal] < 0:
+            return False
+        goal = self._find(labels[goal])
+        if labels[start] >= 0:
+            return self._find(labels[start]) == goal
+        for n in self.finder.neighbors[start * 6:start * 6 + 6]:
+            if n >= 0 and labels[n] >= 0 and self._find(labels[n]) == goal:
+                return True
+        return False
+
+    def update(self, index):
+        '''Bring index's region up to date after its cost changed.'''
+        passable = self.finder.costs[index] >= 0
+        if passable and self.labels[index] < 0:
+            self._open(index)
+        elif not passable and self.labels[index] >= 0:
+            self._close(index)
+
+    def _open(self, index):
+        labels, root = self.labels, self._root
+        roots = set(self._find(labels[n]) for n in self.finder.neighbors[index * 6:index * 6 + 6] if n >= 0 and labels[n] >= 0)
+        if not roots:
+            labels[index] = self._new_label()
+            return
+        label = roots.pop()
+        for other in roots:
+            root[other] = label
+        labels[index] = label
+
+    def _close(self, index):
+        labels, neighbors = self.labels, self.finder.neighbors
+        labels[index] = -1
+        # Neighbors in a row around index touch each other, each unbroken run
+        # is one piece.  Split only possible with more than one run.
+        around = neighbors[index * 6:index * 6 + 6]
+        starts = list()
+        for side in range(6):
+            n = around[side]
+            if n >= 0 and labels[n] >= 0:
+                before = around[side - 1]
+                if before < 0 or labels[before] < 0:
+                    starts.append(n)
+        if not starts and around[0] >= 0 and labels[around[0]] >= 0:
+            starts.append(around[0])  # All six passable.
+        if len(starts) < 2:
+            return
+        # Breadth first from every piece in lockstep.  Pieces that meet are
+        # merged, pieces that run out first are split off with a new label.
+        # Stops when one piece is left, it keeps the old label.
+        owner = dict((n, piece) for piece, n in enumerate(starts))
+        merged = list(range(len(starts)))
+        queues = dict((piece, collections.deque((n, ))) for piece, n in enumerate(starts))
+        members = dict((piece, [n]) for piece, n in enumerate(starts))
+
+        def find(piece):
+            while merged[piece] != piece:
+                piece = merged[piece]
+            return piece
+
+        while len(queues) > 1:
+            for piece in list(queues):
+                if piece not in queues:
+                    continue
+                queue = queues[piece]
+                if not queue:
+                    del queues[piece]
+                    label = self._new_label()
+                    for n in members.pop(piece):
+                        labels[n] = label
+                    if len(queues) == 1:
+                        break
+                    continue
+                current = queue.popleft()
+                for n in neighbors[current * 6:current * 6 + 6]:
+                    if n < 0 or labels[n] < 0:
+                        continue
+                    other = owner.get(n)
+                    if other is None:
+                        owner[n] = piece
+                        queue.append(n)
+                        members[piece].append(n)
+                        continue
+                    other = find(other)
+                    if other != piece:
+                        # Met another piece, fold it into this one.
+                        merged[other] = piece
+                        queue.extend(queues.pop(other))
+                        members[piece].extend(members.pop(other))
+                        if len(queues) == 1:
+                            break
+
+
+CacheInfo = collections.namedtuple('CacheInfo', 'hits misses maxsize currsize invalidated')
+
+
+class PathCache:
+    '''LRU cache of route() results in front of one or more PathFinders,
+    one per cost profile (unit type, weather, ...).
+
+        cache = PathCache({'foot': foot_finder, 'wheeled': road_finder})
+        path, cost = cache.route(depot, front, 'wheeled')
+        cache.set_cost(bridge, -1, 'wheeled')  # only paths over bridge dropped
+
+    Change costs through set_cost() and only cached paths that could be
+    affected are dropped.  Paths through a hex that got dearer, and paths a
+    hex that got cheaper could shorten, judged by the distance heuristic.
+    If a finder's version moves any other way all its profile's paths are
+    dropped.
+    '''
+    def __init__(self, finders, maxsize=1024):
+        '''
+        :param finders: {profile: PathFinder}, or one PathFinder for profile
+          None.
+        :param maxsize: most paths kept, least recently used dropped first.
+        '''
+        if isinstance(finders, PathFinder):
+            finders = {None: finders}
+        self.finders = dict(finders)
+        self.maxsize = maxsize
+        self._paths = collections.OrderedDict()  # (start, end, profile) -> (indexes, cost)
+        self._through = dict()  # (profile, index) -> set of keys whose path enters index
+        self._versions = dict((profile, finder.version) for profile, finder in self.finders.items())
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+
+    def cache_info(self):
+        '''(hits, misses, maxsize, currsize, invalidated).'''
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._paths), self.invalidated)
+
+    def hit_rate(self):
+        '''Hits / lookups, 0 before any.'''
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        '''Drop every cached path, stats are kept.'''
+        self._paths.clear()
+        self._through.clear()
+
+    def find(self, start, end, profile=None):
+        '''Cached PathFinder.find().'''
+        return self.route(start, end, profile)[0]
+
+    def route(self, start, end, profile=None):
+        '''Cached PathFinder.route() with profile's finder.'''
+        finder = self.finders[profile]
+        self._sync(profile)
+        key = (start.index, end.index, profile)
+        result = self._paths.get(key)
+        if result is None:
+            self.misses += 1
+            result = finder.search(key[0], key[1])
+            self._store(key, result)
+        else:
+            self.hits += 1
+            self._paths.move_to_end(key)
+        indexes, cost = result
+        return [finder.hex(i) for i in indexes], cost
+
+    def set_cost(self, hex, cost, profile=None):
+        '''Change cost to enter hex in profile's finder, see
+        PathFinder.set_cost(), dropping cached paths it affects.
+        '''
+        finder = self.finders[profile]
+        self._sync(profile)
+        index = hex.index
+        old = finder.costs[index]
+        finder.set_cost(hex, cost)
+        self._versions[profile] = finder.version
+        if cost == old or (cost < 0 and old < 0):
+            stale = list()
+        elif old >= 0 and (cost < 0 or cost > old):
+            # Dearer, only paths through it.
+            stale = list(self._through.get((profile, index), ()))
+        else:
+            # Cheaper or opened, paths through it and paths it could make
+            # cheaper.  No path is cheaper than stepping to the hex and on to
+            # end at min_cost per hex.
+            stale = list(self._through.get((profile, index), ()))
+            min_cost, distance = finder.min_cost, finder.distance
+            for key, (indexes, total) in self._paths.items():
+                start, end = key[0], key[1]
+                if key[2] != profile or start == index:
+                    continue
+                if total is None or (distance(start, index) - 1 + distance(index, end)) * min_cost + cost < total:
+                    stale.append(key)
+            stale = set(stale)
+        for key in stale:
+            self._drop(key)
+        self.invalidated += len(stale)
+
+    def _sync(self, profile):
+        # Finder changed behind our back, nothing of profile's can be trusted.
+        version = self.finders[profile].version
+        if self._versions[profile] != version:
+            stale = [key for key in self._paths if key[2] == profile]
+            for key in stale:
+                self._drop(key)
+            self.invalidated += len(stale)
+            self._versions[profile] = version
+
+    def _store(self, key, result):
+        self._paths[key] = result
+        profile = key[2]
+        for index in result[0][1:]:
+            self._through.setdefault((profile, index), set()).add(key)
+        while len(self._paths) > self.maxsize:
+            self._drop(next(iter(self._paths)))
+
+    def _drop(self, key):
+        indexes, cost = self._paths.pop(key)
+        profile = key[2]
+        for index in indexes[1:]:
+            keys = self._through.get((profile, index))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._through[(profile, index)]
+
+
+def reachable(origin, budget, cost=None):
+    '''Every hex reachable from origin spending at most budget, Dijkstra
+    flood fill over Hex.neighbors().  Works for unbounded Hex, for BoundedHex
+    maps PathFinder.reachable() is faster.
+    :param cost: callable(from_hex, to_hex) cost to enter to_hex, None is
+      impassable.  Default is 1 per hex.
+    :return: dict of {hex: (cost, predecessor hex)}, origin is (0, None).
+    '''
+    best = {origin: (0, None)}
+    done = set()
+    heap = [(0, 0, origin)]
+    tie = 0  # Hexes don't order, settle ties first come first served.
+    while heap:
+        base, _, current = heapq.heappop(heap)
+        if current in done:
+            continue
+        done.add(current)
+        for n in current.neighbors():
+            if n in done:
+                continue
+            step = 1 if cost is None else cost(current, n)
+            if step is None:
+                continue
+            total = base + step
+            if total > budget or (n in best and best[n][0] <= total):
+                continue
+            best[n] = (total, current)
+            tie += 1
+            heapq.heappush(heap, (total, tie, n))
+    return best
+
+
+def astar(start, end, costs=None, cost=None, passable=None, maxsteps=None):
+    '''One off A* path from start to end, both instances of same BoundedHex
+    class.  See PathFinder, reuse one of those for repeated searches.
+    :return: List of hexes, start to end inclusive.  Empty if no path.
+    '''
+    return PathFinder(start.__class__, costs, cost, passable).find(start, end, maxsteps)
@@ -1,8 +1,15 @@
+import os
 import sys
+import random
+import timeit
 import pstats
 import cProfile
+import tempfile
 
-from hexmap import Hex
+from hexmap import Hex, BoundedHex
+from hexmap.pathfinding import PathFinder
+from hexmap.los import LineOfSight
+from hexmap import mapfile
 
 
 def arc(count):
@@ -17,6 +24,129 @@ def fouronthefloor(count):
     sys.stderr.write('\n\n%s hexes\n\n' % len(foo))
 
 
-cProfile.run('fouronthefloor(200)', 'profile.stats')
-p = pstats.Stats('profile.stats')
-p.strip_dirs().sort_stats('time').print_stats(10)
+class OldHex(Hex):
+    '''Hex with __hash__ and __eq__ as they were before Hex was made
+    immutable, hash computed on every call, debug prints dropped.
+    '''
+    __slots__ = ()
+
+    def __hash__(self):
+        return hash((self.x, self.y))
+
+    def __eq__(self, other):
+        try:
+            if isinstance(other, self.__class__):
+                return self.x == other.x and self.y == other.y
+            elif isinstance(other, str):
+                x, y = self.split(other)
+            elif isinstance(other, int):
+                x, y = self.split(other)
+            elif len(other) == 2:
+                x, y = other[0], other[1]
+            return self.x == int(x) and self.y == int(y)
+        except (TypeError, IndexError, ValueError):
+            return False
+
+
+def sets(count, repeat=5):
+    '''Set insert and membership throughput, hexes per second, against the
+    old __hash__ and __eq__.
+    '''
+    for klas in (OldHex, Hex):
+        hexes = [klas(x, y) for x in range(count) for y in range(count)]
+        probes = [klas(x, y) for x in range(count) for y in range(count)]
+        full = set(hexes)
+        insert = min(timeit.repeat(lambda: set(hexes), number=1, repeat=repeat))
+        member = min(timeit.repeat(lambda: [h in full for h in probes], number=1, repeat=repeat))
+        sys.stderr.write('%-6s set insert %12.0f hexes/s, membership %12.0f hexes/s\n' % (klas.__name__, len(hexes) / insert, len(probes) / member))
+
+
+class Campaign(BoundedHex):
+    xmin = 1
+    xmax = 200
+    ymin = 1
+    ymax = 200
+
+
+def batch(count, klas=Campaign):
+    '''PathFinder.batch_paths() queries per second by number of workers.'''
+    rand = random.Random(1)
+    costs = [-1 if rand.random() < .2 else rand.choice((1, 2, 3)) for i in range(klas.cells())]
+    finder = PathFinder(klas, costs)
+    queries = [(klas.from_index(rand.randrange(klas.cells())), klas.from_index(rand.randrange(klas.cells()))) for i in range(count)]
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        took = min(timeit.repeat(lambda: finder.batch_paths(queries, workers), number=1, repeat=3))
+        sys.stderr.write('batch_paths %2i workers %8.0f queries/s\n' % (workers, count / took))
+        workers *= 2
+
+
+def sight(shooters, targets, klas=Campaign):
+    '''LineOfSight pairs per second.  First turn traces every line, later
+    turns reuse lines (cleared, blocking changed) or whole results.
+    '''
+    rand = random.Random(1)
+    blocking = [rand.random() < .1 for i in range(klas.cells())]
+    shooters = [klas.from_index(rand.randrange(klas.cells())) for i in range(shooters)]
+    targets = [klas.from_index(rand.randrange(klas.cells())) for i in range(targets)]
+    pairs = len(shooters) * len(targets)
+    los = LineOfSight(klas, blocking)
+    first = timeit.timeit(lambda: los.matrix(shooters, targets), number=1)
+    cached = min(timeit.repeat(lambda: los.matrix(shooters, targets), number=1, repeat=3))
+    lines = min(timeit.repeat(lambda: (los.clear(), los.matrix(shooters, targets)), number=1, repeat=3))
+    sys.stderr.write('line of sight %10.0f pairs/s first, %10.0f lines cached, %10.0f results cached\n' % (pairs / first, pairs / lines, pairs / cached))
+    try:
+        from hexmap.hexarray import visibility_matrix
+    except ImportError:
+        return
+    took = min(timeit.repeat(lambda: visibility_matrix(los, shooters, targets), number=1, repeat=3))
+    sys.stderr.write('visibility_matrix %10.0f pairs/s lines cached\n' % (pairs / took, ))
+
+
+def fog(units, radius, klas=Campaign):
+    '''LineOfSight.side_view() hexes per second, against visible() per hex.'''
+    rand = random.Random(1)
+    los = LineOfSight(klas, [rand.random() < .1 for i in range(klas.cells())])
+    units = [klas.from_index(rand.randrange(klas.cells())) for i in range(units)]
+    area = sum(len(u.sixpack(radius, include_self=True)) for u in units)
+    swept = min(timeit.repeat(lambda: (los.clear(), los.side_view(units, radius)), number=1, repeat=3))
+    walked = timeit.timeit(lambda: [los.visible(u, h) for u in units for h in u.sixpack(radius, include_self=True)], number=1)
+    sys.stderr.write('side_view %10.0f hexes/s, visible() %10.0f hexes/s\n' % (area / swept, area / walked))
+
+
+def scenario(klas=Campaign):
+    '''Loading every hex of a map, Hex per line, from_text(), mapfile.load().'''
+    rand = random.Random(1)
+    lines = ['%s %i\n' % (klas.format(x, y), rand.randrange(5)) for y in range(klas.ymin, klas.ymax + 1) for x in range(klas.xmin, klas.xmax + 1)]
+    hexes = min(timeit.repeat(lambda: [(klas(*line.split()[:1]), int(line.split()[1])) for line in lines], number=1, repeat=3))
+    text = min(timeit.repeat(lambda: mapfile.from_text(lines, klas, cost='B'), number=1, repeat=3))
+    with tempfile.TemporaryDirectory() as path:
+        path = os.path.join(path, 'map')
+        mapfile.save(mapfile.from_text(lines, klas, cost='B'), path)
+        loaded = min(timeit.repeat(lambda: mapfile.load(path, klas), number=1, repeat=3))
+    sys.stderr.write('%i hexes, Hex() %.3fs, from_text() %.3fs, mapfile.load() %.6fs\n' % (len(lines), hexes, text, loaded))
+
+
+def labels(count):
+    '''Hex values parsed and formatted per second, one at a time and bulk.'''
+    rand = random.Random(1)
+    values = ['%02d%02d' % (rand.randrange(100), rand.randrange(100)) for i in range(count)]
+    hexes = [Hex(v) for v in values]
+    one = min(timeit.repeat(lambda: [Hex(v) for v in values], number=1, repeat=3))
+    bulk = min(timeit.repeat(lambda: Hex.parse_many(values), number=1, repeat=3))
+    sys.stderr.write('parse Hex() %10.0f/s, parse_many() %10.0f/s\n' % (count / one, count / bulk))
+    one = min(timeit.repeat(lambda: [Hex.format(h.x, h.y) for h in hexes], number=1, repeat=3))
+    bulk = min(timeit.repeat(lambda: Hex.format_many(hexes), number=1, repeat=3))
+    sys.stderr.write('format() %10.0f/s, format_many() %10.0f/s\n' % (count / one, count / bulk))
+
+
+if __name__ == '__main__':
+    sets(300)
+    batch(500)
+    sight(50, 200)
+    fog(20, 15)
+    scenario()
+    labels(100000)
+    cProfile.run('fouronthefloor(200)', 'profile.stats')
+    p = pstats.Stats('profile.stats')
+    p.strip_dirs().sort_stats('time').print_stats(10)
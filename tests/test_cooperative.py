@@ -0,0 +1,112 @@
+import collections
+import random
+import unittest
+
+import hexmap
+from hexmap import pathfinding
+from hexmap.cooperative import CooperativePlanner, ReservationTable
+
+from test_pathfinding import Map, random_costs
+
+
+class CooperativeTestCase(unittest.TestCase):
+    longMessage = True
+
+    def assertNoCollisions(self, paths, units, limit):
+        for path, (start, goal) in zip(paths, units):
+            if path:
+                self.assertEqual(start, path[0])
+                self.assertEqual(goal, path[-1])
+                for a, b in zip(path, path[1:]):
+                    self.assertTrue(a == b or b in a.neighbors())
+        for time in range(max(len(p) for p in paths) + 2):
+            # Units stay on last hex, failed ones on start.
+            hexes = collections.Counter((p[min(time, len(p) - 1)] if p else s) for p, (s, g) in zip(paths, units))
+            self.assertLessEqual(max(hexes.values()), limit, 'impulse %s' % time)
+        if limit == 1:
+            for a in paths:
+                for b in paths:
+                    for t in range(min(len(a), len(b)) - 1):
+                        self.assertFalse(a is not b and a[t] == b[t + 1] and a[t + 1] == b[t], 'swap at %s' % t)
+
+    def test_random(self):
+        for seed in range(10):
+            rand = random.Random(seed)
+            costs = random_costs(seed, blocked=.15)
+            finder = pathfinding.PathFinder(Map, costs)
+            free = [i for i in range(Map.cells()) if costs[i] >= 0]
+            count = rand.randrange(5, 20)
+            units = list(zip([Map.from_index(i) for i in rand.sample(free, count)], [Map.from_index(i) for i in rand.sample(free, count)]))
+            for limit in (1, 2):
+                paths = CooperativePlanner(finder, limit).plan(units)
+                self.assertNoCollisions(paths, units, limit)
+
+    def test_corridor(self):
+        # One hex wide corridor along row 8 with a passing place at 0908.
+        costs = [-1] * Map.cells()
+        for x in range(3, 16):
+            costs[Map(x, 8).index] = 1
+        costs[Map(9, 9).index] = 1
+        finder = pathfinding.PathFinder(Map, costs)
+        units = [(Map(3, 8), Map(15, 8)), (Map(15, 8), Map(3, 8))]
+        planner = CooperativePlanner(finder)
+        paths = planner.plan(units)
+        self.assertTrue(all(paths))
+        self.assertNoCollisions(paths, units, 1)
+        self.assertIn(Map(9, 9), paths[0] + paths[1])
+        self.assertGreater(planner.expanded, 0)
+        # Stacked, units just walk through each other.
+        paths = CooperativePlanner(finder, limit=2).plan(units)
+        self.assertEqual([len(finder.find(*u)) for u in units], [len(p) for p in paths])
+
+    def test_failed_blocks(self):
+        # Second unit can't reach its goal and stays in the corridor, the
+        # first was routed through it.
+        class Strip(hexmap.BoundedHex):
+            xmax = 10
+            ymax = 5
+        costs = [-1] * Strip.cells()
+        for x in range(1, 10):
+            costs[Strip(x, 3).index] = 1
+        finder = pathfinding.PathFinder(Strip, costs)
+        units = [(Strip(1, 3), Strip(9, 3)), (Strip(5, 3), Strip(9, 3))]
+        paths = CooperativePlanner(finder).plan(units)
+        self.assertEqual([[], []], paths)
+        self.assertNoCollisions(paths, units, 1)
+        # Impassable goals.
+        for seed in range(20):
+            rand = random.Random(seed)
+            costs = random_costs(seed, blocked=.3)
+            finder = pathfinding.PathFinder(Map, costs)
+            free = [i for i in range(Map.cells()) if costs[i] >= 0]
+            blocked = [i for i in range(Map.cells()) if costs[i] < 0]
+            count = rand.randrange(5, 20)
+            goals = [rand.choice(blocked) if rand.random() < .3 else i for i in rand.sample(free, count)]
+            units = list(zip([Map.from_index(i) for i in rand.sample(free, count)], [Map.from_index(i) for i in goals]))
+            for limit in (1, 2):
+                paths = CooperativePlanner(finder, limit).plan(units)
+                self.assertNoCollisions(paths, units, limit)
+
+    def test_same_goal(self):
+        finder = pathfinding.PathFinder(Map)
+        goal = Map(10, 8)
+        units = [(Map(5, 8), goal), (Map(15, 8), goal)]
+        paths = CooperativePlanner(finder).plan(units)
+        self.assertEqual(goal, paths[0][-1])
+        self.assertEqual([], paths[1])
+        paths = CooperativePlanner(finder, limit=2).plan(units)
+        self.assertEqual([goal, goal], [p[-1] for p in paths])
+
+    def test_table(self):
+        table = ReservationTable(limit=2)
+        path = [Map(1, 1), Map(2, 1), Map(2, 1), Map(3, 2)]
+        table.reserve(path)
+        self.assertEqual(1, table.count(Map(2, 1), 1))
+        self.assertEqual(1, table.count(Map(2, 1), 2))
+        self.assertEqual(0, table.count(Map(2, 1), 3))
+        self.assertEqual(0, table.count(Map(3, 2), 2))
+        self.assertEqual(1, table.count(Map(3, 2), 3))
+        self.assertEqual(1, table.count(Map(3, 2), 300))
+        table.reserve(path, park=False)
+        self.assertFalse(table.is_free(Map(2, 1), 2))
+        self.assertTrue(table.is_free(Map(3, 2), 300))
@@ -0,0 +1,73 @@
+import random
+import unittest
+
+from hexmap import pathfinding
+from hexmap.dstar import DStarLite
+
+from test_pathfinding import Map, random_costs
+
+
+class DStarLiteTestCase(unittest.TestCase):
+    longMessage = True
+
+    def assertOptimal(self, planner, finder, start, goal, msg=None):
+        path = planner.next_path()
+        expected = finder.route(start, goal)[1]
+        self.assertEqual(expected, planner.cost(), msg)
+        if expected is None:
+            self.assertEqual([], path, msg)
+            return
+        self.assertEqual(start, path[0], msg)
+        self.assertEqual(goal, path[-1], msg)
+        self.assertEqual(expected, sum(finder.costs[h.index] for h in path[1:]), msg)
+        for a, b in zip(path, path[1:]):
+            self.assertIn(b, a.sixpack(), msg)
+
+    def test_changes(self):
+        for seed in range(6):
+            rand = random.Random(seed)
+            costs = random_costs(seed, blocked=.15)
+            start, goal = Map(1, 1), Map(20, 15)
+            costs[start.index] = costs[goal.index] = 1
+            planner = DStarLite(Map, start, goal, costs)
+            finder = pathfinding.PathFinder(Map, costs)
+            self.assertOptimal(planner, finder, start, goal, 'seed %s' % (seed, ))
+            for turn in range(15):
+                for i in range(4):
+                    h = Map.from_index(rand.randrange(Map.cells()))
+                    if h in (start, goal):
+                        continue
+                    cost = rand.choice((-1, 1, 2, 3))
+                    planner.update_cost(h, cost)
+                    finder.set_cost(h, cost)
+                path = planner.next_path()
+                if len(path) > 1 and rand.random() < .7:
+                    start = path[1]
+                    planner.move_to(start)
+                self.assertOptimal(planner, finder, start, goal, 'seed %s turn %s' % (seed, turn))
+
+    def test_incremental(self):
+        start, goal = Map(1, 8), Map(20, 8)
+        planner = DStarLite(Map, start, goal)
+        path = planner.next_path()
+        first = planner.expanded
+        self.assertEqual(start.distance_to(goal) + 1, len(path))
+        # Block a hex off to the side of the path, nothing to repair.
+        planner.update_cost(Map(10, 1), -1)
+        self.assertEqual(path, planner.next_path())
+        self.assertLess(planner.expanded, first)
+        # Block on the path, repaired around.
+        planner.update_cost(path[5], -1)
+        repaired = planner.next_path()
+        self.assertNotIn(path[5], repaired)
+        self.assertLess(planner.expanded, Map.cells())
+
+    def test_unreachable(self):
+        costs = [1] * Map.cells()
+        for y in range(1, 16):
+            costs[Map(10, y).index] = -1
+        planner = DStarLite(Map, Map(1, 1), Map(20, 15), costs)
+        self.assertEqual([], planner.next_path())
+        self.assertIsNone(planner.cost())
+        planner.update_cost(Map(10, 7), 0.5)
+        self.assertTrue(planner.next_path())
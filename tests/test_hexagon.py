@@ -59,6 +59,41 @@ class HexTestCase(BaseTestCase):
         self.assertEqual(t1, t2)
         self.assertEqual(hash(t1), hash(t2))
 
+    def test_interned(self):
+        H = hexmap.Hex
+        self.assertIs(H.interned(1, 2), H.interned('0102'))
+        self.assertIsNot(H.interned(1, 2), hexmap.BoundedHex.interned(1, 2))
+        self.assertEqual(H(), H.interned())
+        hits = H.intern_info().hits
+        H.interned(1, 2)
+        self.assertEqual(hits + 1, H.intern_info().hits)
+
+        class Interning(hexmap.Hex):
+            interning = True
+        t = Interning(11, 11)
+        self.assertIs(t.hex_in_direction(1), t.hex_in_direction(1))
+        self.assertIs(t + (1, 1), Interning.interned(12, 12))
+        self.assertEqual(t.sixpack(2), t.sixpack(2))
+        self.assertEqual(set(id(h) for h in t.sixpack(2)), set(id(h) for h in t.sixpack(2)))
+        self.assertIsNot(H(0, 1) + (1, 1), H(0, 1) + (1, 1))
+
+    def test_immutable(self):
+        t = hexmap.Hex(1, 2)
+        str(t)
+        for attr in ('x', 'y', '_value', '_hash'):
+            self.assertRaises(AttributeError, setattr, t, attr, 3)
+            self.assertRaises(AttributeError, delattr, t, attr)
+        self.assertEqual((1, 2), tuple(t))
+
+    def test_pickle(self):
+        import copy
+        import pickle
+        for t in (hexmap.Hex(-1, 2), hexmap.BoundedHex(3, 4)):
+            for result in (pickle.loads(pickle.dumps(t)), copy.copy(t), copy.deepcopy(t)):
+                self.assertIs(t.__class__, result.__class__)
+                self.assertEqual(t, result)
+                self.assertEqual(hash(t), hash(result))
+
     def test_hashable(self):
         ahex = hexmap.Hex()
         bhex = hexmap.Hex('0101')
@@ -81,6 +116,8 @@ class HexTestCase(BaseTestCase):
         self.assertEqual(2, len(t2))
         t2[chex] = 'boo'
         self.assertEqual(2, len(t2))
+        self.assertIn((1, 1), t2)
+        self.assertIn(hexmap.BoundedHex(1, 1), t2)
 
     def test_equality(self):
         t = hexmap.Hex(12, 34)
@@ -105,6 +142,11 @@ class HexTestCase(BaseTestCase):
         self.assertEqual('12-34', t)
         self.assertNotEqual((12, 34), t)
         self.assertNotEqual('1234', t)
+        # junk
+        self.assertNotEqual(None, t)
+        self.assertNotEqual('123', t)
+        self.assertNotEqual((1, 2, 3), t)
+        self.assertFalse(t != hexmap.Hex(12, -34))
 
     def test_str(self):
         tests = (
@@ -126,6 +168,26 @@ class HexTestCase(BaseTestCase):
         for (expected, args) in tests:
             self.assertEqual(expected, str(hexmap.Hex(*args)))
 
+    def test_parse_many(self):
+        values = ['0000', '0234', '002034', '24', '-24', '-02-04', '02-34', 5678, 567890, 2301, '-1010', '10-10', '-10-10', '101034']
+        expected = [tuple(int(v) for v in hexmap.Hex.split(value)) for value in values]
+        xs, ys = hexmap.Hex.parse_many(values)
+        self.assertEqual(expected, list(zip(xs, ys)))
+        self.assertEqual([hexmap.Hex.pack(x, y) for x, y in expected], list(hexmap.Hex.parse_many(iter(values), packed=True)))
+        self.assertRaises(ValueError, hexmap.Hex.parse_many, ['0101', '110'])
+        self.assertRaises(ValueError, hexmap.Hex.parse_many, ['01x1'])
+
+    def test_format_many(self):
+        xys = [(0, 0), (2, 34), (-2, 4), (2, -34), (-10, -10), (101, 34), (99, 99), (100, 1), (1, 10000)]
+        self.assertEqual([hexmap.Hex.format(x, y) for x, y in xys], hexmap.Hex.format_many(xys))
+        self.assertEqual(['0234', '101034'], hexmap.Hex.format_many([hexmap.Hex(2, 34), hexmap.Hex(101, 34)]))
+
+        class Wide(hexmap.Hex):
+            digits = 5
+        xys = [(2, 34), (-2, 4), (10, 1000000)]
+        self.assertEqual('0000200034', Wide.format_many(xys)[0])
+        self.assertEqual([Wide.format(x, y) for x, y in xys], Wide.format_many(xys))
+
     def test_sequence_stuff(self):
         # len() tuple() list() indexing
         self.assertEqual(2, len(hexmap.Hex()))
@@ -183,11 +245,20 @@ class HexTestCase(BaseTestCase):
                 ('5454', '5554', 1),
                 ('1111', '1113', 2),
                 ('5554', '5952', 4),
+                ('0304', '0601', 4),
+                ('-0304', '06-01', 9),
                 )
         for (from_hex, to_hex, expected) in tests:
             to = hexmap.Hex(to_hex)
             t = hexmap.Hex(from_hex)
             self.assertEqual(expected, t.distance_to(to))
+            self.assertEqual(expected, to.distance_to(t))
+            self.assertIsInstance(t.distance_to(to), int)
+        t = hexmap.Hex(-5, 7)
+        for radius in range(8):
+            for h in t.ring(radius):
+                self.assertEqual(radius, t.distance_to(h))
+                self.assertEqual(radius, t.distance_to(tuple(h)))
 
     def test_sixpack(self):
         expected = ['1110', '1210', '1211', '1112', '1011', '1010']
@@ -224,6 +295,42 @@ class HexTestCase(BaseTestCase):
         hexes = t.arc(5, 4, 0, True)
         self.assertHexesEqual(['5512', ], hexes)
 
+    def test_iter_arc(self):
+        t = hexmap.Hex(1117)
+        hexes = list(t.iter_arc(5, 2, 3))
+        self.assertEqual(len(hexes), len(set(hexes)))
+        self.assertEqual(t.arc(5, 2, 3), set(hexes))
+        self.assertEqual(t.arc(5, 2, 1), set(hexes[:len(t.arc(5, 2, 1))]))
+        self.assertEqual(set(tuple(h) for h in hexes), set(t.iter_arc(5, 2, 3, raw=True)))
+
+    def test_ring(self):
+        t = hexmap.Hex('1509')
+        self.assertEqual(['1509'], [str(h) for h in t.ring(0)])
+        self.assertEqual(['1508', '1608', '1609', '1510', '1409', '1408'], [str(h) for h in t.ring(1)])
+        self.assertEqual([(15, 7), (16, 7), (17, 8)], list(t.ring(2, raw=True))[:3])
+        for radius in (1, 2, 5, 12):
+            ring = list(t.ring(radius))
+            self.assertEqual(6 * radius, len(set(ring)))
+            self.assertEqual(t.sixpack(radius) - t.sixpack(radius - 1), set(ring))
+
+    def test_spiral(self):
+        t = hexmap.Hex(-3, 8)
+        spiral = list(t.spiral(4))
+        self.assertEqual(t, spiral[0])
+        self.assertEqual(t.sixpack(4, include_self=True), set(spiral))
+        self.assertEqual(len(spiral), len(set(spiral)))
+
+    def test_arc_template(self):
+        from hexmap.hexagon import arc_template
+        arc_template.cache_clear()
+        for x in range(-3, 5):
+            for y in (-7, 0, 12):
+                t = hexmap.Hex(x, y)
+                self.assertEqual(set(t + o for o in arc_template(2, 4, 3, x & 1, False, False)), t.arc(2, 4, 3))
+        info = arc_template.cache_info()
+        self.assertEqual(2, info.misses)
+        self.assertEqual(2, info.currsize)
+
     def test_half_arc(self):
         data = (
             (('0322',), 2, (2, 3, 4), ['0421', '0420', '0422', '0323', '0223', '0522', '0521', '0520', '0519', '0523', '0423', '0324', '0224', '0125']),
@@ -233,6 +340,8 @@ class HexTestCase(BaseTestCase):
             t = hexmap.Hex(*args)
             hexes = t.half_arc(directions, distance)
             self.assertHexesEqual(expected, hexes, msg='\nhex:%s %s, distance %s -> %s' % (t, directions, distance, sorted(str(h) for h in hexes)))
+        t = hexmap.Hex('0322')
+        self.assertHexesEqual(['0223', '0322', '0323', '0420', '0421', '0422'], t.half_arc((2, 3, 4), 1, include_self=True))
 
     def test_hexsides_to(self):
         tests = (
@@ -311,6 +420,11 @@ class HexTestCase(BaseTestCase):
                 ((55, -54), (55, -53), (4, )),
                 ((-55, 54), (-56, 54), (5, )),
                 ((-55, 54), (-56, 53), (6, )),
+                # exact way, way out
+                ((0, 0), (10 ** 7, -15 * 10 ** 6), (1, 2)),
+                ((0, 0), (10 ** 7, -15 * 10 ** 6 - 1), (1, )),
+                ((0, 0), (10 ** 7, -15 * 10 ** 6 + 1), (2, )),
+                ((0, 0), (-2 * 10 ** 7, 0), (5, 6)),
                 )
         for (from_args, to_args, expected) in tests:
             from_hex = hexmap.Hex(*from_args)
@@ -318,6 +432,37 @@ class HexTestCase(BaseTestCase):
             results = from_hex.hexsides_to(to_hex)
             if expected != results:
                 self.fail('Got %s not %s from %s to %s' % (results, expected, from_hex, to_hex))
+            self.assertEqual([results], from_hex.hexsides_to_many([to_hex]))
+        t = hexmap.Hex('5554')
+        targets = [hexmap.Hex(to_args[0]) for (from_args, to_args, expected) in tests[:50] if from_args == ('5554', )]
+        self.assertEqual([t.hexsides_to(h) for h in targets], t.hexsides_to_many(targets))
+
+    def test_line_to(self):
+        line = lambda a, b: [tuple(str(h) for h in step) for step in hexmap.Hex(a).line_to(hexmap.Hex(b))]
+        self.assertEqual([('0202', ), ('0203', ), ('0204', ), ('0205', )], line('0202', '0205'))
+        self.assertEqual([('0202', )], line('0202', '0202'))
+        # Along vertex between hexsides 3 and 4, runs along hexside between
+        # 0303 and 0203, in hexside order like hexsides_to().
+        self.assertEqual((3, 4), hexmap.Hex('0202').hexsides_to(hexmap.Hex('0304')))
+        self.assertEqual([('0202', ), ('0303', '0203'), ('0304', )], line('0202', '0304'))
+        self.assertEqual([('0304', ), ('0203', '0303'), ('0202', )], line('0304', '0202'))
+        self.assertEqual([('0501', ), ('0401', '0400'), ('0301', ), ('0201', '0200'), ('0101', )], line('0501', '0101'))
+        # Clips corners of 0103 and 0004, sampling at each hex distance misses them.
+        self.assertEqual(['0000', '0001', '0002', '0103', '0003', '0104', '0004', '0105', '0106', '0107'],
+                         [step[0] for step in line('0000', '0107')])
+        for a in ('0000', '0101', '5554'):
+            a = hexmap.Hex(a)
+            for b in a.sixpack(6):
+                steps = a.line_to(b)
+                msg = '%s to %s' % (a, b)
+                self.assertEqual(a, steps[0][0], msg)
+                self.assertEqual(b, steps[-1][0], msg)
+                self.assertGreaterEqual(len(steps), a.distance_to(b) + 1)
+                for step, after in zip(steps, steps[1:]):
+                    for h in step:
+                        self.assertTrue(all(h.distance_to(n) == 1 for n in after), msg)
+                # Same hexes either way.
+                self.assertEqual([set(s) for s in steps], [set(s) for s in reversed(b.line_to(a))], msg)
 
     def test_delta(self):
         tests = (
@@ -470,3 +615,44 @@ class BoundedHexTestCase(BaseTestCase):
         t = hexmap.BoundedHex('5512')
         hexes = t.arc(5, 4, 0, True)
         self.assertHexesEqual(['5512', ], hexes)
+
+    def test_neighbor_table(self):
+        class Small(hexmap.BoundedHex):
+            xmin = -2
+            xmax = 6
+            ymin = 4
+            ymax = 8
+        table = Small.neighbor_table()
+        self.assertIs(table, Small.neighbor_table())
+        self.assertEqual(6 * Small.cells(), len(table))
+        for i in range(Small.cells()):
+            t = Small.from_index(i)
+            for hexside in range(1, 7):
+                try:
+                    expected = t.hex_in_direction(hexside).index
+                except hexmap.OffMapError:
+                    expected = -1
+                self.assertEqual(expected, table[i * 6 + hexside - 1], '%s %s' % (t, hexside))
+        self.assertEqual(99 * 99 * 6, len(hexmap.BoundedHex.neighbor_table()))
+
+    def test_neighbors(self):
+        self.assertEqual(['0201', '0102'], [str(h) for h in hexmap.BoundedHex('0101').neighbors()])
+        self.assertEqual(['0221', '0322', '0323', '0223', '0123', '0122'], [str(h) for h in hexmap.BoundedHex('0222').neighbors()])
+        for h in hexmap.BoundedHex('0222').neighbors():
+            self.assertIsInstance(h, hexmap.BoundedHex)
+
+    def test_half_arc(self):
+        t = hexmap.BoundedHex('0101')
+        self.assertHexesEqual(['0102', '0201', '0301'], t.half_arc((3, 4, 5), 1))
+
+    def test_line_to(self):
+        # Grazes hexsides of off map 0200 and 0400.
+        self.assertEqual(
+                [('0101', ), ('0201', ), ('0301', ), ('0401', ), ('0501', )],
+                [tuple(str(h) for h in step) for step in hexmap.BoundedHex('0101').line_to(hexmap.BoundedHex('0501'))])
+        self.assertEqual(4, len(hexmap.Hex('0101').line_to(hexmap.Hex('0501'))) - 1)
+
+    def test_ring(self):
+        t = hexmap.BoundedHex('0101')
+        self.assertHexesEqual(['0301', '0302', '0202', '0103'], list(t.ring(2)))
+        self.assertHexesEqual(['0101', '0201', '0102'], list(t.spiral(1)))
@@ -0,0 +1,85 @@
+import unittest
+
+import hexmap
+try:
+    import numpy
+    from hexmap.hexarray import HexArray, distance_matrix
+except ImportError:
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, 'numpy not installed')
+class HexArrayTestCase(unittest.TestCase):
+    longMessage = True
+
+    def setUp(self):
+        self.hexes = [hexmap.Hex(*args) for args in ((5554, ), (5211, ), (0, 0), (-55, 54), (55, -54), (3, 4), (1117, ))]
+        self.array = HexArray.from_hexes(self.hexes)
+
+    def test_conversion(self):
+        self.assertEqual(len(self.hexes), len(self.array))
+        self.assertEqual(self.hexes, self.array.to_hexes())
+        self.assertEqual(self.hexes, list(self.array))
+        self.assertEqual([h.value for h in self.hexes], self.array.value)
+        self.assertEqual(self.hexes[2], self.array[2])
+        self.assertIsInstance(self.array[1:3], HexArray)
+        bounded = HexArray.from_hexes([hexmap.BoundedHex(1, 1), hexmap.BoundedHex(99, 99)])
+        self.assertIsInstance(bounded[0], hexmap.BoundedHex)
+        self.assertEqual([True, False], (bounded + (0, 1)).on_map().tolist())
+        self.assertRaises(hexmap.OffMapError, (bounded + (1, 0)).to_hexes)
+
+    def test_from_values(self):
+        values = [h.value for h in self.hexes]
+        self.assertEqual(self.hexes, HexArray.from_values(values).to_hexes())
+        self.assertEqual(self.hexes, HexArray.from_values(int(v) if v.isdigit() and v[0] != '0' else v for v in values).to_hexes())
+        # Same length strings are converted as one array.
+        same = ['0101', '9999', '0042', '1200']
+        result = HexArray.from_values(same, hexmap.BoundedHex)
+        self.assertEqual(same, result.value)
+        self.assertIs(hexmap.BoundedHex, result.hexclass)
+        self.assertEqual(0, len(HexArray.from_values([])))
+        self.assertRaises(ValueError, HexArray.from_values, ['01x1'])
+
+    def test_math(self):
+        other = HexArray.from_hexes([hexmap.Hex(1, 2)] * len(self.hexes))
+        self.assertEqual([h + (1, 2) for h in self.hexes], (self.array + other).to_hexes())
+        self.assertEqual([h + (1, 2) for h in self.hexes], (self.array + hexmap.Hex(1, 2)).to_hexes())
+        self.assertEqual([h - (1, 2) for h in self.hexes], (self.array - (1, 2)).to_hexes())
+        self.assertEqual([hexmap.Hex(1 - h.x, 2 - h.y) for h in self.hexes], ((1, 2) - self.array).to_hexes())
+        self.assertEqual([h + (3, -7) for h in self.hexes], (hexmap.Hex(3, -7) + self.array).to_hexes())
+        self.assertEqual([hexmap.Hex(3 - h.x, -7 - h.y) for h in self.hexes], (hexmap.Hex(3, -7) - self.array).to_hexes())
+
+    def test_hex_in_direction(self):
+        for direction in range(1, 7):
+            expected = [h.hex_in_direction(direction) for h in self.hexes]
+            self.assertEqual(expected, self.array.hex_in_direction(direction).to_hexes())
+        self.assertRaises(ValueError, self.array.hex_in_direction, 7)
+
+    def test_distance_to(self):
+        tests = (
+                ('5454', '5454', 0),
+                ('5454', '5455', 1),
+                ('5454', '5554', 1),
+                ('1111', '1113', 2),
+                ('5554', '5952', 4),
+                ('0304', '0601', 4),
+                )
+        a = HexArray.from_hexes(hexmap.Hex(f) for (f, t, d) in tests)
+        b = HexArray.from_hexes(hexmap.Hex(t) for (f, t, d) in tests)
+        self.assertEqual([d for (f, t, d) in tests], a.distance_to(b).tolist())
+        c = HexArray.from_hexes([hexmap.Hex('5454')] * len(tests))
+        self.assertEqual(a.distance_to(c).tolist(), a.distance_to(hexmap.Hex('5454')).tolist())
+
+    def test_hexsides_to(self):
+        origin = hexmap.Hex('5554')
+        targets = [hexmap.Hex(v) for v in ('5554', '5553', '5653', '5654', '5652', '5452', '5754', '00010001')]
+        result = HexArray.hexsides_tuples(HexArray.from_hexes([origin] * len(targets)).hexsides_to(HexArray.from_hexes(targets)))
+        self.assertEqual([origin.hexsides_to(t) for t in targets], result)
+
+    def test_distance_matrix(self):
+        targets = list(hexmap.Hex(2, 3).sixpack(3, include_self=True)) + [hexmap.Hex(-400, 900)]
+        result = distance_matrix(self.hexes, targets)
+        self.assertEqual((len(self.hexes), len(targets)), result.shape)
+        self.assertEqual(numpy.int32, result.dtype)
+        self.assertEqual([[a.distance_to(b) for b in targets] for a in self.hexes], result.tolist())
+        self.assertEqual(result.tolist(), distance_matrix(self.array, HexArray.from_hexes(targets), numpy.int16).tolist())
@@ -0,0 +1,139 @@
+import os
+import tempfile
+import unittest
+
+import hexmap
+from hexmap.hexmap import HexMap, ChunkedHexMap, ChunkDirectory
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from test_pathfinding import Map
+
+
+class HexMapTestCase(unittest.TestCase):
+    longMessage = True
+
+    def setUp(self):
+        self.board = HexMap(Map, cost=('d', 1), woods='B', owner='b')
+
+    def test_layers(self):
+        board = self.board
+        hex = Map(3, 4)
+        self.assertEqual({'cost': 1.0, 'woods': 0, 'owner': 0}, board[hex])
+        board[hex, 'cost'] = 2.5
+        board[hex] = {'woods': 1, 'owner': -1}
+        self.assertEqual({'cost': 2.5, 'woods': 1, 'owner': -1}, board[hex])
+        self.assertEqual(2.5, board[hexmap.Hex(3, 4), 'cost'])
+        self.assertEqual(2.5, board[(3, 4)]['cost'])
+        self.assertEqual(2.5, board.layers['cost'][hex.index])
+        self.assertEqual('B', board.add_layer('town', 'B').typecode)
+        self.assertEqual(0, board[hex, 'town'])
+        board.fill('cost', 3)
+        self.assertEqual([3.0] * Map.cells(), board.layers['cost'].tolist())
+        self.assertRaises(KeyError, board.__getitem__, (hex, 'river'))
+        self.assertRaises(KeyError, board.__setitem__, hex, {'river': 1})
+        self.assertRaises(ValueError, board.add_layer, 'town')
+        self.assertRaises(hexmap.OffMapError, board.__getitem__, hexmap.Hex(0, 4))
+        self.assertRaises(TypeError, HexMap, hexmap.Hex)
+
+    def test_many(self):
+        board = self.board
+        area = Map(10, 8).sixpack(2, include_self=True)
+        board[area, 'owner'] = 2
+        self.assertEqual([2] * 19, board[area, 'owner'])
+        self.assertEqual(38, sum(board.layers['owner']))
+        ring = Map(10, 8).sixpack(2, hexset=True)
+        board[ring, 'woods'] = 1
+        self.assertEqual(sorted(h.index for h in ring), board.indexes(ring))
+        line = [Map(x, 1) for x in range(1, 4)]
+        board[line, 'cost'] = [4, 5, 6]
+        self.assertEqual([4.0, 5.0, 6.0], board[line, 'cost'])
+        self.assertRaises(ValueError, board.__setitem__, (line, 'cost'), [1])
+
+    def test_feeds(self):
+        board = self.board
+        for y in range(1, 15):
+            board[Map(10, y), 'cost'] = -1
+            board[Map(10, y), 'woods'] = 1
+        finder = board.path_finder('cost')
+        path = finder.find(Map(1, 8), Map(20, 8))
+        self.assertIn(Map(10, 15), path)
+        los = board.line_of_sight('woods')
+        self.assertFalse(los.visible(Map(1, 8), Map(20, 8)))
+        self.assertTrue(los.visible(Map(1, 15), Map(20, 15)))
+
+    @unittest.skipIf(numpy is None, 'numpy not installed')
+    def test_array(self):
+        board = self.board
+        woods = board.array('woods')
+        self.assertEqual((15, 20), woods.shape)
+        woods[2:5, :] = 1
+        self.assertEqual(1, board[Map(1, 3), 'woods'])
+        cost = board.array('cost')
+        cost[woods == 1] = 3
+        self.assertEqual(3.0, board[Map(7, 5), 'cost'])
+        self.assertEqual(1.0, board[Map(7, 6), 'cost'])
+
+
+class ChunkedHexMapTestCase(unittest.TestCase):
+    longMessage = True
+
+    def test_get_set(self):
+        world = ChunkedHexMap(chunk_size=8, cost=('d', 1), explored='B')
+        far = hexmap.Hex(-1000001, 2 ** 40)
+        self.assertEqual({'cost': 1.0, 'explored': 0}, world[far])
+        self.assertEqual(0, len(world))
+        world[far, 'explored'] = 1
+        world[hexmap.Hex(-1, -1)] = {'cost': 2.5}
+        self.assertEqual({'cost': 1.0, 'explored': 1}, world[far])
+        self.assertEqual(2.5, world[(-1, -1), 'cost'])
+        self.assertEqual(1.0, world[(-2, -1), 'cost'])
+        self.assertEqual((-1, -1), world.key(hexmap.Hex(-1, -1)))
+        self.assertEqual((0, 0), world.key(hexmap.Hex(7, 0)))
+        self.assertEqual(set([(-125001, 2 ** 37), (-1, -1)]), world.chunk_keys())
+        self.assertRaises(KeyError, world.__getitem__, (far, 'river'))
+        self.assertRaises(KeyError, world.__setitem__, far, {'river': 1})
+        self.assertRaises(ValueError, ChunkedHexMap, chunk_size=6, cost='d')
+        self.assertRaises(ValueError, ChunkedHexMap, max_chunks=2, cost='d')
+
+    def test_chunks(self):
+        world = ChunkedHexMap(chunk_size=4, height='h')
+        for h in hexmap.Hex(5, 5).sixpack(3, include_self=True):
+            world[h, 'height'] = h.x * 100 + h.y
+        total = 0
+        for key, layers in world.iter_chunks():
+            for hex, height in zip(world.chunk_hexes(key), layers['height']):
+                self.assertEqual(world.key(hex), key)
+                if height:
+                    self.assertEqual(hex.x * 100 + hex.y, height)
+                    total += 1
+        self.assertEqual(37, total)
+        world.discard((1, 1))
+        self.assertEqual(0, world[(5, 5), 'height'])
+
+    def test_evict(self):
+        store = dict()
+        world = ChunkedHexMap(chunk_size=4, max_chunks=3, store=store, owner='b')
+        hexes = [hexmap.Hex(x * 4, -x * 4) for x in range(10)]
+        for i, h in enumerate(hexes):
+            world[h, 'owner'] = i
+        self.assertEqual(3, len(world.resident()))
+        self.assertEqual(7, world.evictions)
+        self.assertEqual(10, len(world))
+        self.assertEqual(list(range(10)), [world[h, 'owner'] for h in hexes])
+        self.assertEqual(10, world.loads)
+        self.assertLessEqual(len(world.resident()), 3)
+        with tempfile.TemporaryDirectory() as path:
+            world = ChunkedHexMap(chunk_size=4, max_chunks=1, store=ChunkDirectory(path), owner='b', cost='d')
+            world[hexes[0]] = {'owner': 5, 'cost': .5}
+            world[hexes[1], 'owner'] = 6
+            self.assertEqual(1, len(os.listdir(path)))
+            world.flush()
+            again = ChunkedHexMap(chunk_size=4, store=ChunkDirectory(path), owner='b', cost='d')
+            self.assertEqual({'owner': 5, 'cost': .5}, again[hexes[0]])
+            self.assertEqual(6, again[hexes[1], 'owner'])
+            again.discard(world.key(hexes[0]))
+            self.assertEqual(1, len(os.listdir(path)))
+            self.assertRaises(ValueError, again.unpack_chunk, b'1234')
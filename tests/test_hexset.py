@@ -0,0 +1,89 @@
+import unittest
+
+import hexmap
+from hexmap.hexset import HexSet
+
+
+class SmallHex(hexmap.BoundedHex):
+    xmin = -2
+    xmax = 10
+    ymin = 3
+    ymax = 7
+
+
+class HexSetTestCase(unittest.TestCase):
+    longMessage = True
+
+    def check(self, hexclass, a, b):
+        ha, hb = HexSet(a, hexclass), HexSet(b, hexclass)
+        self.assertEqual(len(set(a)), len(ha))
+        self.assertEqual(set(a), set(ha))
+        for h in a:
+            self.assertIn(h, ha)
+            self.assertIn(tuple(h), ha)
+        for op in ('__or__', '__and__', '__sub__', '__xor__'):
+            result = getattr(ha, op)(hb)
+            self.assertIsInstance(result, HexSet, op)
+            self.assertEqual(getattr(set(a), op)(set(b)), set(result), op)
+            self.assertEqual(getattr(set(a), op)(set(b)), getattr(ha, op)(set(b)), op)
+            inplace = ha.copy()
+            getattr(inplace, op.replace('__', '__i', 1))(hb)
+            self.assertEqual(result, inplace, op)
+        self.assertEqual(set(a) | set(b), set(b) | ha)
+        for h in ha:
+            self.assertIsInstance(h, hexclass)
+        ha.discard(a[0])
+        self.assertNotIn(a[0], ha)
+        self.assertEqual(len(set(a)) - 1, len(ha))
+        ha.clear()
+        self.assertEqual(0, len(ha))
+
+    def test_unbounded(self):
+        a = [hexmap.Hex(x, y) for x in range(-5, 5) for y in range(-7, 3)]
+        b = list(hexmap.Hex(2, -2).sixpack(4))
+        self.check(hexmap.Hex, a, b)
+        self.assertNotIn('junk', HexSet(a))
+        self.assertIn(hexmap.Hex(-(2 ** 40), -(2 ** 30)), HexSet([hexmap.Hex(-(2 ** 40), -(2 ** 30))]))
+
+    def test_bounded(self):
+        a = [SmallHex(x, y) for x in range(-2, 4) for y in range(3, 6)]
+        b = list(SmallHex(3, 5).sixpack(3))
+        self.check(SmallHex, a, b)
+        hexes = HexSet(hexclass=SmallHex)
+        self.assertRaises(hexmap.OffMapError, hexes.add, (11, 3))
+        self.assertNotIn((11, 3), hexes)
+        self.assertEqual(18, len(SmallHex(4, 5).sixpack(2, hexset=True)))
+        self.assertEqual(10, len(SmallHex(4, 7).sixpack(2, hexset=True)))
+        self.assertEqual(SmallHex(-2, 3).sixpack(4), set(SmallHex(-2, 3).sixpack(4, hexset=True)))
+        self.assertEqual(sorted(h.index for h in b), list(HexSet(b, SmallHex).iter_index()))
+        self.assertRaises(TypeError, list, HexSet().iter_index())
+
+    def test_arcs(self):
+        t = hexmap.Hex(1117)
+        self.assertEqual(t.arc(3, 5, 4), set(t.arc(3, 5, 4, hexset=True)))
+        self.assertEqual(t.sixpack(3, True), t.sixpack(3, True, hexset=True))
+        self.assertEqual(t.half_arc((6, 1, 2), 3), t.half_arc((6, 1, 2), 3, hexset=True))
+        t = hexmap.BoundedHex(1, 1)
+        self.assertEqual(t.arc(3, 5, 4), set(t.arc(3, 5, 4, hexset=True)))
+
+    def test_pack(self):
+        for x, y in ((0, 0), (1, -1), (-1, 1), (-(2 ** 40), 2 ** 31 - 1), (2 ** 40, -(2 ** 31))):
+            self.assertEqual((x, y), hexmap.Hex.unpack(hexmap.Hex.pack(x, y)))
+            self.assertEqual(hexmap.Hex.pack(x, y), hexmap.Hex(x, y).key)
+        for y in (2 ** 31, -(2 ** 31) - 1, 2 ** 32):
+            self.assertRaises(ValueError, hexmap.Hex.pack, 0, y)
+        hexes = HexSet([hexmap.Hex(0, 0)])
+        self.assertRaises(ValueError, hexes.add, hexmap.Hex(0, 2 ** 32))
+        self.assertRaises(ValueError, HexSet.from_xy, [(0, 0), (0, 2 ** 32)])
+        self.assertNotIn(hexmap.Hex(0, 2 ** 32), hexes)
+        hexes.discard(hexmap.Hex(0, 2 ** 32))
+        self.assertEqual([(0, 0)], list(hexes.iter_xy()))
+
+
+class BoundedIndexTestCase(unittest.TestCase):
+    def test_index(self):
+        self.assertEqual(13 * 5, SmallHex.cells())
+        indexes = [h.index for h in (SmallHex(x, y) for y in range(3, 8) for x in range(-2, 11))]
+        self.assertEqual(list(range(SmallHex.cells())), indexes)
+        for i in indexes:
+            self.assertEqual(i, SmallHex.from_index(i).index)
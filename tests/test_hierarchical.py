@@ -0,0 +1,80 @@
+import random
+import unittest
+
+from hexmap import pathfinding
+from hexmap.hierarchical import HierarchicalPathFinder
+
+from test_pathfinding import Map, random_costs, dijkstra
+
+
+class HierarchicalTestCase(unittest.TestCase):
+    longMessage = True
+
+    def assertPath(self, path, start, end, costs):
+        self.assertEqual(start, path[0])
+        self.assertEqual(end, path[-1])
+        for a, b in zip(path, path[1:]):
+            self.assertIn(b, a.sixpack())
+            self.assertGreaterEqual(costs[b.index], 0)
+
+    def test_open_map(self):
+        finder = HierarchicalPathFinder(Map, cluster_size=4, near=0)
+        start, end = Map(1, 1), Map(20, 15)
+        waypoints, cost = finder.abstract_path(start, end)
+        self.assertEqual(start.index, waypoints[0])
+        self.assertEqual(end.index, waypoints[-1])
+        path = finder.find(start, end)
+        self.assertPath(path, start, end, finder.costs)
+        self.assertEqual(cost, len(path) - 1)
+        self.assertLessEqual(cost, start.distance_to(end) * 1.5)
+        self.assertEqual([start], finder.find(start, start))
+
+    def test_complete(self):
+        for seed in range(10):
+            costs = random_costs(seed, blocked=.2)
+            finder = HierarchicalPathFinder(Map, costs, cluster_size=5, near=0)
+            rand = random.Random(seed)
+            for i in range(10):
+                start = Map.from_index(rand.randrange(Map.cells()))
+                end = Map.from_index(rand.randrange(Map.cells()))
+                best = dijkstra(Map, costs, start.index).get(end.index)
+                path = finder.find(start, end)
+                waypoints, cost = finder.abstract_path(start, end)
+                msg = 'seed %s %s -> %s' % (seed, start, end)
+                if best is None:
+                    self.assertEqual([], path, msg)
+                    self.assertIsNone(cost, msg)
+                else:
+                    self.assertPath(path, start, end, costs)
+                    self.assertEqual(cost, sum(costs[h.index] for h in path[1:]), msg)
+                    self.assertGreaterEqual(cost, best, msg)
+
+    def test_near_is_exact(self):
+        costs = random_costs(4)
+        finder = HierarchicalPathFinder(Map, costs, cluster_size=4)
+        exact = pathfinding.PathFinder(Map, costs)
+        start = Map(10, 8)
+        for end in start.sixpack(8):
+            self.assertEqual(exact.find(start, end), finder.find(start, end))
+        self.assertEqual(0, finder.expanded)
+
+    def test_update_cost(self):
+        costs = [1] * Map.cells()
+        finder = HierarchicalPathFinder(Map, costs, cluster_size=5, near=0)
+        start, end = Map(1, 8), Map(20, 8)
+        self.assertTrue(finder.find(start, end))
+        rebuilds = finder.rebuilds
+        self.assertEqual(12, rebuilds)
+        for y in range(1, 16):
+            finder.update_cost(Map(10, y), -1)
+        self.assertEqual([], finder.find(start, end))
+        # Column 10 is in cluster column 1, cluster column 3 is left alone.
+        self.assertEqual(rebuilds + 9, finder.rebuilds)
+        finder.update_cost(Map(10, 15), 1)
+        path = finder.find(start, end)
+        self.assertIn(Map(10, 15), path)
+        self.assertPath(path, start, end, finder.costs)
+
+    def test_errors(self):
+        self.assertRaises(TypeError, HierarchicalPathFinder, pathfinding.PathFinder)
+        self.assertRaises(ValueError, HierarchicalPathFinder, Map, [1, 2, 3])
@@ -0,0 +1,122 @@
+import random
+import unittest
+
+from hexmap.hexset import HexSet
+from hexmap.los import LineOfSight, line_offsets
+try:
+    import numpy
+    from hexmap.hexarray import visibility_matrix
+except ImportError:
+    numpy = None
+
+from test_pathfinding import Map
+
+
+def random_blocking(seed, blocked=.2):
+    rand = random.Random(seed)
+    return [rand.random() < blocked for i in range(Map.cells())]
+
+
+def visible(a, b, blocking, graze):
+    '''Straight from Hex.line_to().'''
+    for step in a.line_to(b)[1:-1]:
+        blocks = [blocking[h.index] for h in step]
+        if (any if graze == 'either' else all)(blocks):
+            return False
+    return True
+
+
+class LineOfSightTestCase(unittest.TestCase):
+    longMessage = True
+
+    def test_line_to(self):
+        for seed in range(3):
+            blocking = random_blocking(seed)
+            rand = random.Random(seed)
+            hexes = [Map.from_index(rand.randrange(Map.cells())) for i in range(25)]
+            for graze in ('both', 'either'):
+                los = LineOfSight(Map, blocking, graze)
+                for a in hexes:
+                    for b in hexes:
+                        self.assertEqual(visible(a, b, blocking, graze), los.visible(a, b), '%s to %s %s' % (a, b, graze))
+
+    def test_graze(self):
+        # 0302 to 0502 runs along hexside between 0401 and 0402.
+        a, b = Map(3, 2), Map(5, 2)
+        self.assertEqual(2, len(a.line_to(b)[1]))
+        blocking = [False] * Map.cells()
+        blocking[Map(4, 1).index] = True
+        self.assertTrue(LineOfSight(Map, blocking).visible(a, b))
+        self.assertFalse(LineOfSight(Map, blocking, graze='either').visible(a, b))
+        blocking[Map(4, 2).index] = True
+        self.assertFalse(LineOfSight(Map, blocking).visible(a, b))
+        # Map edge, off map hex beside hexside doesn't count.
+        los = LineOfSight(Map)
+        los.set_blocking(Map(2, 1), True)
+        self.assertFalse(los.visible(Map(1, 1), Map(3, 1)))
+
+    def test_cache(self):
+        los = LineOfSight(Map)
+        a, b, wall = Map(1, 8), Map(20, 8), Map(10, 8)
+        self.assertTrue(los.visible(a, b))
+        self.assertTrue(los.visible(b, a))
+        self.assertEqual(1, len(los._seen))
+        los.set_blocking(wall, True)
+        self.assertEqual(0, len(los._seen))
+        self.assertFalse(los.visible(a, b))
+        self.assertEqual([False, True], los.check([(a, b), (a, wall)]))
+        # Lines are shared by pairs the same delta and parity apart.
+        hits = line_offsets.cache_info().hits
+        self.assertTrue(los.visible(Map(1, 9), Map(20, 9)))
+        self.assertEqual(hits + 1, line_offsets.cache_info().hits)
+        # Bounded, least recently used dropped.
+        los = LineOfSight(Map, max_pairs=2)
+        los.visible(a, b)
+        los.visible(a, wall)
+        los.visible(a, b)
+        los.visible(b, wall)
+        self.assertEqual([(a.index, b.index), (wall.index, b.index)], list(los._seen))
+
+    def test_field_of_view(self):
+        for seed in range(3):
+            rand = random.Random(seed)
+            for graze in ('both', 'either'):
+                los = LineOfSight(Map, random_blocking(seed, .25), graze)
+                for i in range(10):
+                    hex = Map.from_index(rand.randrange(Map.cells()))
+                    radius = rand.randrange(1, 12)
+                    expected = set(h for h in hex.sixpack(radius, include_self=True) if los.visible(hex, h))
+                    self.assertEqual(expected, los.field_of_view(hex, radius), '%s %s %s' % (hex, radius, graze))
+        los = LineOfSight(Map)
+        view = los.field_of_view(Map(10, 8), 2, hexset=True)
+        self.assertIsInstance(view, HexSet)
+        self.assertEqual(Map(10, 8).sixpack(2, include_self=True), set(view))
+
+    def test_side_view(self):
+        los = LineOfSight(Map, random_blocking(1, .25))
+        units = [Map(3, 3), Map(3, 3), Map(15, 10), Map(8, 14)]
+        view = los.side_view(units, 6)
+        self.assertEqual(set().union(*(los.field_of_view(u, 6) for u in units)), set(view))
+        self.assertEqual(3, len(los._views))
+        los.set_blocking(Map(4, 4), not los.blocking[Map(4, 4).index])
+        self.assertEqual(0, len(los._views))
+        los = LineOfSight(Map, random_blocking(1, .25), max_views=2)
+        self.assertEqual(view, los.side_view(units, 6))
+        self.assertEqual(2, len(los._views))
+
+    def test_errors(self):
+        self.assertRaises(TypeError, LineOfSight, object)
+        self.assertRaises(ValueError, LineOfSight, Map, [True])
+        self.assertRaises(ValueError, LineOfSight, Map, graze='some')
+
+    @unittest.skipIf(numpy is None, 'numpy not installed')
+    def test_visibility_matrix(self):
+        for seed in range(3):
+            rand = random.Random(seed)
+            shooters = [Map.from_index(rand.randrange(Map.cells())) for i in range(20)]
+            targets = [Map.from_index(rand.randrange(Map.cells())) for i in range(30)]
+            for graze in ('both', 'either'):
+                los = LineOfSight(Map, random_blocking(seed), graze)
+                result = visibility_matrix(los, shooters, targets)
+                self.assertEqual((20, 30), result.shape)
+                self.assertEqual(los.matrix(shooters, targets), result.tolist())
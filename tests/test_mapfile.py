@@ -0,0 +1,123 @@
+import array
+import os
+import struct
+import tempfile
+import unittest
+
+import hexmap
+from hexmap import mapfile
+from hexmap.hexmap import HexMap
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from test_pathfinding import Map
+
+TERRAIN = ('clear', 'woods', 'town')
+TEXT = '''# scenario
+0101 1   clear
+0203 2.5 woods
+2015 -1  town
+
+1008 3   town
+'''
+
+
+class MapFileTestCase(unittest.TestCase):
+    longMessage = True
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'map.hexmap')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_from_text(self):
+        board = mapfile.from_text(TEXT.splitlines(), Map, cost=('d', 1), terrain=('B', 0, TERRAIN.index))
+        self.assertEqual({'cost': 2.5, 'terrain': 1}, board[Map(2, 3)])
+        self.assertEqual({'cost': -1, 'terrain': 2}, board[Map(20, 15)])
+        self.assertEqual({'cost': 1, 'terrain': 0}, board[Map(5, 5)])
+        self.assertRaises(ValueError, mapfile.from_text, ['0101 1'], Map, cost='d', terrain='B')
+        self.assertRaises(ValueError, mapfile.from_text, ['2101 1'], Map, cost='d')
+        self.assertRaises(ValueError, mapfile.from_text, ['0-101 1'], Map, cost='d')
+
+    def test_round_trip(self):
+        board = mapfile.from_text(TEXT.splitlines(), Map, cost=('d', 1), terrain=('B', 0, TERRAIN.index))
+        board.add_layer('owner', 'h', -3)
+        mapfile.save(board, self.path)
+        for mmap in (True, False):
+            loaded = mapfile.load(self.path, Map, mmap=mmap)
+            self.assertIs(Map, loaded.hexclass)
+            self.assertEqual(list(board.layers), list(loaded.layers))
+            for name in board.layers:
+                self.assertEqual(board.layers[name].tolist(), loaded.layers[name].tolist(), name)
+            self.assertEqual({'cost': 2.5, 'terrain': 1, 'owner': -3}, loaded[Map(2, 3)])
+            self.assertEqual(mmap, isinstance(loaded.layers['cost'], memoryview))
+        loaded = mapfile.load(self.path, Map)
+        for write in (lambda: loaded.__setitem__((Map(1, 1), 'cost'), 3),
+                      lambda: loaded.__setitem__(Map(1, 1), {'cost': 3}),
+                      lambda: loaded.__setitem__(([Map(1, 1)], 'cost'), 3),
+                      lambda: loaded.fill('cost', 3)):
+            self.assertRaises(TypeError, write)
+        self.assertEqual(1, loaded[Map(1, 1), 'cost'])
+        writable = mapfile.load(self.path, Map, mmap=False)
+        writable.fill('cost', 3)
+        writable[Map(1, 1)] = {'terrain': 2}
+        self.assertEqual({'cost': 3, 'terrain': 2, 'owner': -3}, writable[Map(1, 1)])
+        self.assertEqual(loaded.layers['cost'].tolist(), loaded.path_finder('cost').costs.tolist())
+        # Saved from memory mapped layers too.
+        again = os.path.join(self.dir.name, 'again.hexmap')
+        mapfile.save(loaded, again)
+        with open(self.path, 'rb') as a, open(again, 'rb') as b:
+            self.assertEqual(a.read(), b.read())
+
+    def test_convert(self):
+        text = os.path.join(self.dir.name, 'map.txt')
+        with open(text, 'w') as f:
+            f.write(TEXT)
+        mapfile.convert(text, self.path, Map, cost='d', terrain=('B', 0, TERRAIN.index))
+        self.assertEqual({'cost': 3, 'terrain': 2}, mapfile.load(self.path, Map)[Map(10, 8)])
+
+    def test_errors(self):
+        board = HexMap(Map, cost='d')
+        mapfile.save(board, self.path)
+
+        class Other(hexmap.BoundedHex):
+            xmax = 10
+        self.assertRaises(ValueError, mapfile.load, self.path, Other)
+
+        class Wide(Map):
+            digits = 3
+        self.assertRaises(ValueError, mapfile.load, self.path, Wide)
+        with open(self.path, 'rb') as f:
+            data = bytearray(f.read())
+        for bad in (b'junk' * 10, data[:len(data) - 8], data[:8] + struct.pack('<H', mapfile.VERSION + 1) + data[10:]):
+            with open(self.path, 'wb') as f:
+                f.write(bad)
+            self.assertRaises(ValueError, mapfile.load, self.path, Map)
+
+    def test_byte_order(self):
+        board = HexMap(Map, cost=('d', 1.5))
+        mapfile.save(board, self.path)
+        with open(self.path, 'rb') as f:
+            data = bytearray(f.read())
+        # Flip to the other byte order, swapped data.
+        data[10] ^= 1
+        layer = array.array('d', board.layers['cost'])
+        layer.byteswap()
+        offset = len(data) - len(layer) * layer.itemsize
+        data[offset:] = layer.tobytes()
+        with open(self.path, 'wb') as f:
+            f.write(data)
+        self.assertEqual([1.5] * Map.cells(), mapfile.load(self.path, Map).layers['cost'].tolist())
+
+    @unittest.skipIf(numpy is None, 'numpy not installed')
+    def test_numpy(self):
+        board = HexMap(Map, cost=('d', 1))
+        board[Map(3, 4), 'cost'] = 7
+        mapfile.save(board, self.path)
+        cost = mapfile.load(self.path, Map).array('cost')
+        self.assertEqual(7, cost[3, 2])
+        self.assertFalse(cost.flags.writeable)
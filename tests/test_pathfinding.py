@@ -0,0 +1,379 @@
+import heapq
+import random
+import unittest
+
+import hexmap
+from hexmap import pathfinding
+
+
+class Map(hexmap.BoundedHex):
+    xmin = 1
+    xmax = 20
+    ymin = 1
+    ymax = 15
+
+
+def random_costs(seed, hexclass=Map, blocked=.25):
+    rand = random.Random(seed)
+    return [-1 if rand.random() < blocked else rand.choice((1, 1, 2, 3)) for i in range(hexclass.cells())]
+
+
+def dijkstra(hexclass, costs, start):
+    '''Brute force cheapest cost from start to everywhere.'''
+    table = hexclass.neighbor_table()
+    best = {start: 0}
+    heap = [(0, start)]
+    while heap:
+        cost, i = heapq.heappop(heap)
+        if cost > best[i]:
+            continue
+        for n in table[i * 6:i * 6 + 6]:
+            if n >= 0 and costs[n] >= 0 and cost + costs[n] < best.get(n, float('inf')):
+                best[n] = cost + costs[n]
+                heapq.heappush(heap, (best[n], n))
+    return best
+
+
+class PathFinderTestCase(unittest.TestCase):
+    longMessage = True
+
+    def assertPath(self, path, start, end, costs=None):
+        self.assertEqual(start, path[0])
+        self.assertEqual(end, path[-1])
+        for a, b in zip(path, path[1:]):
+            self.assertIn(b, a.sixpack())
+            if costs is not None:
+                self.assertGreaterEqual(costs[b.index], 0)
+
+    def test_open_map(self):
+        finder = pathfinding.PathFinder(Map)
+        start, end = Map('0101'), Map('2015')
+        path, cost = finder.route(start, end)
+        self.assertPath(path, start, end)
+        self.assertEqual(start.distance_to(end), cost)
+        self.assertEqual(start.distance_to(end) + 1, len(path))
+        self.assertEqual(start.distance_to(end), finder.expanded)
+        self.assertEqual([start], finder.find(start, start))
+        for h in path:
+            self.assertIsInstance(h, Map)
+
+    def test_optimal(self):
+        for seed in range(8):
+            costs = random_costs(seed)
+            finder = pathfinding.PathFinder(Map, costs)
+            start = Map.from_index(random.Random(seed).randrange(Map.cells()))
+            best = dijkstra(Map, costs, start.index)
+            for end in (Map(1, 1), Map(20, 15), Map(10, 8), Map(20, 1)):
+                path, cost = finder.route(start, end)
+                self.assertEqual(best.get(end.index), cost, 'seed %s %s -> %s' % (seed, start, end))
+                if cost is None:
+                    self.assertEqual([], path)
+                else:
+                    self.assertPath(path, start, end, costs)
+                    self.assertEqual(cost, sum(costs[h.index] for h in path[1:]))
+
+    def test_deterministic(self):
+        costs = random_costs(3, blocked=.1)
+        paths = set()
+        for i in range(3):
+            finder = pathfinding.PathFinder(Map, costs)
+            paths.add(tuple(finder.find(Map(2, 2), Map(19, 14))))
+            paths.add(tuple(finder.find(Map(2, 2), Map(19, 14))))
+        self.assertEqual(1, len(paths))
+
+    def test_callbacks(self):
+        costs = random_costs(5)
+        by_index = pathfinding.PathFinder(Map, costs)
+        by_callback = pathfinding.PathFinder(Map, cost=lambda a, b: None if costs[b.index] < 0 else costs[b.index])
+        by_passable = pathfinding.PathFinder(Map, [abs(c) for c in costs], passable=lambda h: costs[h.index] >= 0)
+        for end in (Map(20, 15), Map(1, 15), Map(11, 3)):
+            expected = by_index.route(Map(1, 1), end)
+            self.assertEqual(expected, by_callback.route(Map(1, 1), end))
+            self.assertEqual(expected, by_passable.route(Map(1, 1), end))
+
+    def test_maxsteps_and_counters(self):
+        costs = [1] * Map.cells()
+        for y in range(1, 16):
+            costs[Map(10, y).index] = -1
+        finder = pathfinding.PathFinder(Map, costs)
+        self.assertEqual([], finder.find(Map(1, 1), Map(20, 15)))
+        self.assertEqual(9 * 15, finder.expanded)
+        self.assertEqual([], finder.find(Map(1, 1), Map(5, 5), maxsteps=2))
+        self.assertEqual(2, finder.expanded)
+        finder.set_cost(Map(10, 5), 1)
+        self.assertTrue(finder.find(Map(1, 1), Map(20, 15)))
+        self.assertEqual(3, finder.searches)
+
+    def test_astar(self):
+        path = pathfinding.astar(hexmap.BoundedHex('0608'), hexmap.BoundedHex('1112'))
+        self.assertEqual(7, len(path))
+        self.assertRaises(TypeError, pathfinding.PathFinder, hexmap.Hex)
+        self.assertRaises(ValueError, pathfinding.PathFinder, Map, [1, 2, 3])
+
+
+class ReachableTestCase(unittest.TestCase):
+    longMessage = True
+
+    def test_uniform(self):
+        origin = hexmap.Hex(3, -4)
+        reach = pathfinding.reachable(origin, 4)
+        self.assertEqual(origin.sixpack(4, include_self=True), set(reach))
+        self.assertEqual((0, None), reach[origin])
+        for h, (cost, parent) in reach.items():
+            self.assertEqual(origin.distance_to(h), cost)
+            if parent is not None:
+                self.assertEqual(cost - 1, reach[parent][0])
+                self.assertIn(parent, h.sixpack())
+
+    def test_bounded(self):
+        for seed in range(5):
+            costs = random_costs(seed)
+            origin = Map(10, 8)
+            best = dijkstra(Map, costs, origin.index)
+            finder = pathfinding.PathFinder(Map, costs)
+            for budget in (0, 3, 7.5, None):
+                expected = dict((i, c) for i, c in best.items() if budget is None or c <= budget)
+                reach = finder.reachable(origin, budget)
+                self.assertEqual(expected, dict((h.index, c) for h, (c, p) in reach.items()), 'seed %s budget %s' % (seed, budget))
+                for h, (cost, parent) in reach.items():
+                    if parent is not None:
+                        self.assertEqual(cost, reach[parent][0] + costs[h.index])
+                generic = pathfinding.reachable(origin, float('inf') if budget is None else budget, lambda a, b: None if costs[b.index] < 0 else costs[b.index])
+                self.assertEqual(dict((h, c) for h, (c, p) in reach.items()), dict((h, c) for h, (c, p) in generic.items()))
+            flood = finder.flood(origin.index)
+            self.assertEqual((origin.index, 0, -1), flood[0])
+            self.assertEqual(sorted(c for i, c, p in flood), [c for i, c, p in flood])
+
+
+class FlowFieldTestCase(unittest.TestCase):
+    longMessage = True
+
+    def test_single_goal(self):
+        for seed in range(5):
+            costs = random_costs(seed)
+            finder = pathfinding.PathFinder(Map, costs)
+            goal = Map(10, 8)
+            field = finder.flow_field([goal])
+            self.assertEqual(0, field.cost(goal))
+            self.assertEqual([goal], field.path(goal))
+            self.assertIsNone(field.next_hex(goal))
+            for i in range(Map.cells()):
+                start = Map.from_index(i)
+                expected = finder.route(start, goal)[1]
+                self.assertEqual(float('inf') if expected is None else expected, field.cost(start), '%s seed %s' % (start, seed))
+                path = field.path(start)
+                if expected is None:
+                    self.assertEqual([], path)
+                    self.assertIsNone(field.next_hex(start))
+                else:
+                    self.assertEqual(expected, sum(costs[h.index] for h in path[1:]))
+                    self.assertEqual(goal, path[-1])
+                    if len(path) > 1:
+                        self.assertEqual(path[1], field.next_hex(start))
+
+    def test_many_goals_and_cache(self):
+        costs = random_costs(9, blocked=.1)
+        finder = pathfinding.PathFinder(Map, costs)
+        goals = [Map(1, 1), Map(20, 15)]
+        field = finder.flow_field(goals)
+        self.assertIs(field, finder.flow_field(reversed(goals)))
+        fields = [finder.flow_field([g]) for g in goals]
+        for i in range(Map.cells()):
+            self.assertEqual(min(f.costs[i] for f in fields), field.costs[i])
+        finder.set_cost(Map(5, 5), 3)
+        self.assertIsNot(field, finder.flow_field(goals))
+        callback = pathfinding.PathFinder(Map, cost=lambda a, b: None if costs[b.index] < 0 else costs[b.index])
+        self.assertEqual(field.costs, callback.flow_field(goals).costs)
+
+
+class RegionsTestCase(unittest.TestCase):
+    longMessage = True
+
+    def assertSameRegions(self, regions, expected):
+        # Same partition, labels themselves may differ.
+        self.assertEqual([l < 0 for l in expected.labels], [l < 0 for l in regions.labels])
+        pairs = set()
+        for i in range(Map.cells()):
+            if expected.labels[i] >= 0:
+                pairs.add((expected._find(expected.labels[i]), regions._find(regions.labels[i])))
+        self.assertEqual(len(pairs), len(set(a for a, b in pairs)))
+        self.assertEqual(len(pairs), len(set(b for a, b in pairs)))
+
+    def test_labels(self):
+        for seed in range(5):
+            costs = random_costs(seed, blocked=.4)
+            regions = pathfinding.PathFinder(Map, costs).regions()
+            start = Map(10, 8)
+            best = dijkstra(Map, costs, start.index)
+            for i in range(Map.cells()):
+                end = Map.from_index(i)
+                self.assertEqual(i in best, regions.can_reach(start.index, i), 'seed %s %s' % (seed, end))
+                if costs[start.index] >= 0 and costs[i] >= 0:
+                    self.assertEqual(i in best, regions.connected(start, end))
+                    self.assertEqual(i in best, regions.label(start) == regions.label(end))
+                if costs[i] < 0:
+                    self.assertEqual(-1, regions.label(end))
+
+    def test_incremental(self):
+        rand = random.Random(1)
+        costs = random_costs(1, blocked=.4)
+        finder = pathfinding.PathFinder(Map, costs)
+        regions = finder.regions()
+        for i in range(300):
+            h = Map.from_index(rand.randrange(Map.cells()))
+            finder.set_cost(h, rand.choice((-1, 1)))
+            self.assertIs(regions, finder.regions())
+            self.assertSameRegions(regions, pathfinding.Regions(finder))
+        finder.changed()
+        self.assertIsNot(regions, finder.regions())
+        self.assertRaises(TypeError, pathfinding.Regions, pathfinding.PathFinder(Map, cost=lambda a, b: 1))
+
+    def test_search_rejected(self):
+        costs = [1] * Map.cells()
+        for y in range(1, 16):
+            costs[Map(10, y).index] = -1
+        finder = pathfinding.PathFinder(Map, costs)
+        finder.regions()
+        self.assertEqual([], finder.find(Map(1, 1), Map(20, 15)))
+        self.assertEqual(0, finder.expanded)
+        finder.set_cost(Map(10, 5), 1)
+        self.assertTrue(finder.find(Map(1, 1), Map(20, 15)))
+        finder.set_cost(Map(10, 5), -1)
+        self.assertEqual([], finder.find(Map(1, 1), Map(20, 15)))
+        self.assertEqual(0, finder.expanded)
+        self.assertEqual([Map(10, 5)], finder.find(Map(10, 5), Map(10, 5)))
+        self.assertTrue(finder.find(Map(10, 5), Map(11, 5)))
+
+
+class StrategyTestCase(unittest.TestCase):
+    longMessage = True
+
+    def assertOptimal(self, finder, costs, strategies, seed):
+        rand = random.Random(seed)
+        start = Map.from_index(rand.randrange(Map.cells()))
+        best = dijkstra(Map, costs, start.index)
+        for i in range(20):
+            end = Map.from_index(rand.randrange(Map.cells()))
+            for strategy in strategies:
+                msg = '%s seed %s %s -> %s' % (strategy, seed, start, end)
+                path, cost = finder.route(start, end, strategy=strategy)
+                self.assertEqual(best.get(end.index), cost, msg)
+                if cost is None:
+                    self.assertEqual([], path, msg)
+                else:
+                    self.assertEqual(start, path[0], msg)
+                    self.assertEqual(end, path[-1], msg)
+                    for a, b in zip(path, path[1:]):
+                        self.assertIn(b, a.sixpack(), msg)
+                    self.assertEqual(cost, sum(costs[h.index] for h in path[1:]), msg)
+
+    def test_mixed_costs(self):
+        for seed in range(10):
+            costs = random_costs(seed)
+            finder = pathfinding.PathFinder(Map, costs)
+            self.assertOptimal(finder, costs, ('astar', 'bidirectional'), seed)
+            callback = pathfinding.PathFinder(Map, cost=lambda a, b: None if costs[b.index] < 0 else costs[b.index])
+            self.assertOptimal(callback, costs, ('bidirectional', ), seed)
+            self.assertRaises(ValueError, finder.search, 0, 1, strategy='jump')
+            self.assertRaises(ValueError, callback.search, 0, 1, strategy='jump')
+
+    def test_uniform_costs(self):
+        for seed in range(30):
+            rand = random.Random(seed)
+            blocked = (0, .05, .1, .2, .4)[seed % 5]
+            costs = [-1 if rand.random() < blocked else 2 for i in range(Map.cells())]
+            finder = pathfinding.PathFinder(Map, costs)
+            self.assertOptimal(finder, costs, pathfinding.STRATEGIES, seed)
+
+    def test_jump_expands_less(self):
+        costs = [1] * Map.cells()
+        for y in range(3, 16):
+            costs[Map(10, y).index] = -1
+        astar = pathfinding.PathFinder(Map, costs)
+        jump = pathfinding.PathFinder(Map, costs, strategy='jump')
+        start, end = Map(5, 12), Map(15, 12)
+        self.assertEqual(astar.route(start, end)[1], jump.route(start, end)[1])
+        self.assertLess(jump.expanded * 10, astar.expanded)
+        jump.set_cost(Map(10, 12), 1)
+        self.assertEqual(10, jump.route(start, end)[1])
+
+    def test_options(self):
+        self.assertRaises(ValueError, pathfinding.PathFinder, Map, strategy='dfs')
+        finder = pathfinding.PathFinder(Map, strategy='bidirectional')
+        self.assertEqual([Map(3, 3)], finder.find(Map(3, 3), Map(3, 3)))
+        self.assertRaises(ValueError, finder.find, Map(3, 3), Map(3, 4), strategy='dfs')
+        self.assertEqual([], finder.find(Map(1, 1), Map(20, 15), maxsteps=5))
+        self.assertEqual(5, finder.expanded)
+        self.assertTrue(finder.find(Map(1, 1), Map(20, 15)))
+
+
+class BatchTestCase(unittest.TestCase):
+    def test_batch_paths(self):
+        costs = random_costs(6)
+        finder = pathfinding.PathFinder(Map, costs)
+        rand = random.Random(6)
+        queries = [(Map.from_index(rand.randrange(Map.cells())), Map.from_index(rand.randrange(Map.cells()))) for i in range(60)]
+        expected = [finder.route(start, end) for start, end in queries]
+        self.assertEqual(expected, finder.batch_paths(queries, workers=1))
+        self.assertEqual(expected, finder.batch_paths(queries, workers=2, chunksize=7))
+        self.assertEqual([], finder.batch_paths([], workers=2))
+        jump = pathfinding.PathFinder(Map, [1 if c >= 0 else -1 for c in costs])
+        self.assertEqual([jump.route(s, e, strategy='jump')[1] for s, e in queries], [c for p, c in jump.batch_paths(queries, workers=2, strategy='jump')])
+        callback = pathfinding.PathFinder(Map, cost=lambda a, b: 1)
+        self.assertRaises(TypeError, callback.batch_paths, queries)
+
+
+class PathCacheTestCase(unittest.TestCase):
+    longMessage = True
+
+    def test_hits_and_lru(self):
+        finder = pathfinding.PathFinder(Map, random_costs(2, blocked=.1))
+        cache = pathfinding.PathCache(finder, maxsize=2)
+        a, b, c = Map(1, 1), Map(20, 15), Map(10, 8)
+        self.assertEqual(finder.route(a, b), cache.route(a, b))
+        self.assertEqual(finder.find(a, b), cache.find(a, b))
+        self.assertEqual((1, 1, 2, 1, 0), cache.cache_info())
+        cache.route(a, c)
+        cache.route(a, b)
+        cache.route(b, c)  # Drops a -> c, least recently used.
+        self.assertEqual(2, cache.cache_info().currsize)
+        searches = finder.searches
+        cache.route(a, b)
+        self.assertEqual(searches, finder.searches)
+        cache.route(a, c)
+        self.assertEqual(searches + 1, finder.searches)
+        self.assertEqual(3 / 7, cache.hit_rate())
+        cache.clear()
+        self.assertEqual(0, cache.cache_info().currsize)
+
+    def test_targeted_invalidation(self):
+        rand = random.Random(3)
+        costs = random_costs(3, blocked=.15)
+        finder = pathfinding.PathFinder(Map, costs)
+        cache = pathfinding.PathCache(finder, maxsize=500)
+        queries = [(Map.from_index(rand.randrange(Map.cells())), Map.from_index(rand.randrange(Map.cells()))) for i in range(40)]
+        for i in range(60):
+            for start, end in queries:
+                fresh = pathfinding.PathFinder(Map, finder.costs).route(start, end)[1]
+                self.assertEqual(fresh, cache.route(start, end)[1], 'change %s %s -> %s' % (i, start, end))
+            cache.set_cost(Map.from_index(rand.randrange(Map.cells())), rand.choice((-1, 1, 2, 3)))
+        info = cache.cache_info()
+        self.assertGreater(info.hits, info.misses)
+        self.assertLess(info.invalidated, 60 * len(queries) / 2)
+
+    def test_profiles_and_version(self):
+        foot = pathfinding.PathFinder(Map)
+        wheeled = pathfinding.PathFinder(Map, random_costs(4, blocked=0))
+        cache = pathfinding.PathCache({'foot': foot, 'wheeled': wheeled})
+        a, b = Map(1, 1), Map(20, 15)
+        self.assertEqual(a.distance_to(b), cache.route(a, b, 'foot')[1])
+        self.assertEqual(wheeled.route(a, b)[1], cache.route(a, b, 'wheeled')[1])
+        cache.set_cost(cache.find(a, b, 'foot')[5], 100, 'foot')
+        self.assertEqual(1, cache.cache_info().invalidated)
+        self.assertEqual(a.distance_to(b), cache.route(a, b, 'foot')[1])
+        wheeled.set_cost(Map(5, 5), 9)  # Behind cache's back.
+        cache.route(a, b, 'foot')
+        self.assertEqual(1, cache.cache_info().invalidated)
+        cache.route(a, b, 'wheeled')
+        self.assertEqual(2, cache.cache_info().invalidated)
+        self.assertRaises(KeyError, cache.route, a, b)